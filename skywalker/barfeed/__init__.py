@@ -147,6 +147,11 @@ class BaseBarFeed(feed.BaseFeed):
             instrument = self.__defaultInstrument
         return self[instrument]
 
+    def getEquityEventCalendar(self):
+        """Override to return a :class:`skywalker.barfeed.equityevent.EquityEventCalendar` with the dividends and splits
+        for the instruments in the feed. Returns None if the feed has no equity events."""
+        return None
+
     def getDispatchPriority(self):
         return dispatchprio.BAR_FEED
 
@@ -0,0 +1,252 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+import skywalker.logger
+from skywalker.utils import dt
+
+logger = skywalker.logger.getLogger("barcache")
+
+# Columns returned by Database.getBarsColumns, besides the extra ones.
+BAR_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume", "adj_close")
+
+META_FILE = "meta.json"
+
+
+def missing_ranges(covered, fromTimestamp, toTimestamp):
+    """Returns the parts of [fromTimestamp, toTimestamp] not included in the covered ranges.
+
+    :param covered: A list of (from, to) tuples with inclusive integer timestamps.
+    :rtype: A list of (from, to) tuples with inclusive integer timestamps.
+    """
+    ret = []
+    begin = fromTimestamp
+    for rangeBegin, rangeEnd in sorted(covered):
+        if begin > toTimestamp:
+            break
+        if rangeBegin > begin:
+            ret.append((begin, min(rangeBegin - 1, toTimestamp)))
+        begin = max(begin, rangeEnd + 1)
+    if begin <= toTimestamp:
+        ret.append((begin, toTimestamp))
+    return ret
+
+
+def merge_ranges(covered):
+    """Merges overlapping and adjacent (from, to) ranges."""
+    ret = []
+    for rangeBegin, rangeEnd in sorted(covered):
+        if len(ret) and rangeBegin <= ret[-1][1] + 1:
+            ret[-1] = (ret[-1][0], max(ret[-1][1], rangeEnd))
+        else:
+            ret.append((rangeBegin, rangeEnd))
+    return ret
+
+
+def _is_int(value):
+    return isinstance(value, (int, long, np.integer)) and not isinstance(value, (bool, np.bool_))
+
+
+def _as_storable(values):
+    # Extra columns come from the database as Decimal/int/None objects. Store them as floats whenever possible so they
+    # can be memory mapped, and return the kind of values they had so they can be restored: "int" if they were all
+    # integers, "float" otherwise, or None if they were stored as they were.
+    kind = None
+    if values.dtype == object:
+        try:
+            storable = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        except (TypeError, ValueError):
+            pass
+        else:
+            kind = "int" if all(value is None or _is_int(value) for value in values) else "float"
+            values = storable
+    return values, kind
+
+
+def _from_storable(values, kind):
+    # Undo _as_storable, so cached extra columns have the same values as the ones from the database: None instead of
+    # NaN, and ints instead of floats for integer columns.
+    if kind is None:
+        return values
+    if kind == "int":
+        return np.array([None if value != value else int(value) for value in values], dtype=object)
+    ret = values.astype(object)
+    ret[np.isnan(values)] = None
+    return ret
+
+
+class BarCache(object):
+    """An on-disk cache for bars loaded from the database.
+
+    Bars are stored in columnar form, one .npy file per column, under a directory for each instrument, frequency and
+    set of extra columns. The date ranges already fetched are recorded, so only the missing ones are requested from
+    the database. Columns are memory mapped when loaded, except for extra columns with None values or integers, which
+    are turned back into those.
+
+    :param path: The directory where the cache is stored.
+    :param version: An optional version for the database contents. Entries stored with a different version are
+        discarded. Change it, or call :meth:`invalidate`, when the data in the database changes.
+
+    .. note::
+        Ranges are recorded up to the current time when they are fetched, so bars added later to the database for
+        dates already fetched will not be seen until the cache is invalidated.
+    """
+
+    def __init__(self, path, version=None):
+        self.__path = path
+        self.__version = version
+
+    def getPath(self):
+        return self.__path
+
+    def getVersion(self):
+        return self.__version
+
+    def __getEntryPath(self, instrument, frequency, extra):
+        extraKey = "-".join(sorted(extra)) if len(extra) else "_"
+        return os.path.join(self.__path, str(frequency), instrument, extraKey)
+
+    def __readMeta(self, entryPath):
+        try:
+            with open(os.path.join(entryPath, META_FILE)) as f:
+                meta = json.load(f)
+        except (IOError, ValueError):
+            return None
+        # Entries without kinds were stored before extra columns were restored on load.
+        if meta.get("version") != self.__version or "kinds" not in meta:
+            return None
+        return meta
+
+    def __writeMeta(self, entryPath, meta):
+        # Write the meta file last and atomically, so a partially written entry is never seen as valid.
+        tmpPath = os.path.join(entryPath, META_FILE + ".tmp")
+        with open(tmpPath, "w") as f:
+            json.dump(meta, f)
+        os.rename(tmpPath, os.path.join(entryPath, META_FILE))
+
+    def __loadColumns(self, entryPath, meta):
+        ret = {}
+        for name in meta["columns"]:
+            fileName = os.path.join(entryPath, name + ".npy")
+            if name in meta.get("pickled", []):
+                ret[name] = np.load(fileName, allow_pickle=True)
+            else:
+                ret[name] = _from_storable(np.load(fileName, mmap_mode="r"), meta["kinds"].get(name))
+        return ret
+
+    def __store(self, entryPath, columns, covered):
+        if not os.path.exists(entryPath):
+            os.makedirs(entryPath)
+        pickled = []
+        kinds = {}
+        for name, values in columns.items():
+            values, kind = _as_storable(values)
+            if kind is not None:
+                kinds[name] = kind
+            elif values.dtype == object:
+                pickled.append(name)
+            # Replace files instead of overwriting them, since they may be memory mapped.
+            fileName = os.path.join(entryPath, name + ".npy")
+            with open(fileName + ".tmp", "wb") as f:
+                np.save(f, values)
+            os.rename(fileName + ".tmp", fileName)
+        self.__writeMeta(entryPath, {
+            "version": self.__version,
+            "columns": sorted(columns.keys()),
+            "pickled": pickled,
+            "kinds": kinds,
+            "ranges": covered,
+        })
+
+    def invalidate(self, instrument=None, frequency=None):
+        """Removes cached bars.
+
+        :param instrument: The instrument to remove, or None to remove all of them.
+        :param frequency: The frequency to remove, or None to remove all of them.
+        """
+        if instrument is None and frequency is None:
+            paths = [self.__path]
+        else:
+            frequencies = [str(frequency)] if frequency is not None else \
+                os.listdir(self.__path) if os.path.exists(self.__path) else []
+            paths = []
+            for freq in frequencies:
+                if instrument is None:
+                    paths.append(os.path.join(self.__path, freq))
+                else:
+                    paths.append(os.path.join(self.__path, freq, instrument))
+        for path in paths:
+            if os.path.exists(path):
+                shutil.rmtree(path)
+
+    def getBarsColumns(self, db, instruments, frequency, fromDateTime, toDateTime, extra=None):
+        """Returns bars with the same format as :meth:`Database.getBarsColumns`, fetching from the database only the
+        date ranges that are not cached yet.
+
+        :param db: The database to fetch missing bars from. Must implement getBarsColumns.
+        """
+        if extra is None:
+            extra = []
+        fromTimestamp = int(dt.datetime_to_timestamp(fromDateTime))
+        toTimestamp = int(dt.datetime_to_timestamp(toDateTime))
+        # Don't record ranges in the future as fetched.
+        coveredTo = min(toTimestamp, int(time.time()))
+        columnNames = list(BAR_COLUMNS) + list(extra)
+
+        # Group instruments by the ranges they are missing, so each group is fetched with a single query.
+        entries = {}
+        toFetch = {}
+        for instrument in instruments:
+            entryPath = self.__getEntryPath(instrument, frequency, extra)
+            meta = self.__readMeta(entryPath)
+            covered = [] if meta is None else [tuple(r) for r in meta["ranges"]]
+            entries[instrument] = (entryPath, meta, covered)
+            for missing in missing_ranges(covered, fromTimestamp, toTimestamp):
+                toFetch.setdefault(missing, []).append(instrument)
+
+        fetched = {}
+        for (missingFrom, missingTo), group in toFetch.items():
+            columnsDict = db.getBarsColumns(
+                group, frequency, dt.timestamp_to_datetime(missingFrom), dt.timestamp_to_datetime(missingTo),
+                extra=extra
+            )
+            for instrument in group:
+                fetched.setdefault(instrument, []).append(((missingFrom, missingTo), columnsDict.get(instrument)))
+
+        ret = {}
+        for instrument in instruments:
+            entryPath, meta, covered = entries[instrument]
+            if instrument in fetched:
+                parts = []
+                if meta is not None:
+                    parts.append(self.__loadColumns(entryPath, meta))
+                for (missingFrom, missingTo), columns in fetched[instrument]:
+                    if missingFrom <= coveredTo:
+                        covered.append((missingFrom, min(missingTo, coveredTo)))
+                    if columns is not None:
+                        parts.append(columns)
+                merged = {}
+                if len(parts):
+                    order = np.argsort(np.concatenate([part["timestamp"] for part in parts]), kind="mergesort")
+                    for name in columnNames:
+                        merged[name] = np.concatenate([np.asarray(part[name]) for part in parts])[order]
+                else:
+                    merged = {name: np.empty(0) for name in columnNames}
+                    merged["timestamp"] = np.empty(0, dtype=np.int64)
+                self.__store(entryPath, merged, merge_ranges(covered))
+                meta = self.__readMeta(entryPath)
+
+            if meta is None:
+                continue
+            columns = self.__loadColumns(entryPath, meta)
+            timestamps = columns["timestamp"]
+            begin = np.searchsorted(timestamps, fromTimestamp, side="left")
+            end = np.searchsorted(timestamps, toTimestamp, side="right")
+            if end > begin:
+                ret[instrument] = {name: columns[name][begin:end] for name in columnNames}
+
+        logger.info("%d of %d instruments were fully cached" % (len(instruments) - len(fetched), len(instruments)))
+        return ret
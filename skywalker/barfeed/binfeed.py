@@ -0,0 +1,267 @@
+import json
+import os
+import struct
+
+import numpy as np
+import pytz
+
+from skywalker import dispatcher
+from skywalker.barfeed import columnar
+from skywalker.barfeed import membf
+from skywalker.dataseries import resampled
+
+# File layout:
+#   MAGIC, a little endian uint32 with the header length, the JSON header, padding up to a multiple of ALIGNMENT and
+#   then one contiguous little endian array per column, in the order given by the header.
+MAGIC = "SKWBARS\x00"
+FORMAT_VERSION = 1
+FILE_EXTENSION = ".swb"
+ALIGNMENT = 64
+
+_HEADER_LENGTH = struct.Struct("<I")
+_TIMESTAMP_DTYPE = np.dtype("<i8")
+_VALUE_DTYPE = np.dtype("<f8")
+
+
+def _timezone_name(tzinfo):
+    if tzinfo is None:
+        return None
+    ret = getattr(tzinfo, "zone", None)
+    if ret is None:
+        raise Exception("Only pytz timezones can be stored. Got %s" % (tzinfo))
+    return ret
+
+
+def _as_value_column(name, values):
+    values = np.asarray(values)
+    try:
+        if values.dtype == object:
+            return np.array([np.nan if value is None else value for value in values], dtype=_VALUE_DTYPE)
+        return values.astype(_VALUE_DTYPE)
+    except (TypeError, ValueError):
+        raise Exception("Only numeric extra columns can be stored. %s is not" % (name))
+
+
+def write_bars(path, bars):
+    """Writes bars to a binary bar file. The file is written to a temporary path and then renamed, so readers never
+    see a partially written file.
+
+    :param path: The path to the file.
+    :param bars: The bars to write.
+    :type bars: :class:`skywalker.barfeed.columnar.ColumnarBars`.
+    """
+    columns = [("timestamp", np.asarray(bars.getTimestamps(), dtype=_TIMESTAMP_DTYPE))]
+    for name in columnar.OHLCV_COLUMNS:
+        values = bars.getColumn(name)
+        if values is not None:
+            columns.append((name, np.asarray(values, dtype=_VALUE_DTYPE)))
+    extraNames = sorted(bars.getExtraColumnNames())
+    for name in extraNames:
+        columns.append((name, _as_value_column(name, bars.getColumn(name))))
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "frequency": bars.getFrequency(),
+        "timezone": _timezone_name(bars.getTimezone()),
+        "count": len(bars),
+        "columns": [[columnName, columnValues.dtype.str] for columnName, columnValues in columns],
+        "extra": extraNames,
+    })
+    dataOffset = len(MAGIC) + _HEADER_LENGTH.size + len(header)
+    padding = (ALIGNMENT - dataOffset % ALIGNMENT) % ALIGNMENT
+
+    tmpPath = path + ".tmp"
+    with open(tmpPath, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        f.write(" " * padding)
+        for name, values in columns:
+            f.write(np.ascontiguousarray(values).tostring())
+    os.rename(tmpPath, path)
+
+
+def read_header(path):
+    """Returns the header of a binary bar file as a dict, with the offset of the data in "offset"."""
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise Exception("%s is not a binary bar file" % (path))
+        headerLength = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))[0]
+        ret = json.loads(f.read(headerLength))
+    if ret["version"] != FORMAT_VERSION:
+        raise Exception("Unsupported binary bar file version %s" % (ret["version"]))
+    dataOffset = len(MAGIC) + _HEADER_LENGTH.size + headerLength
+    ret["offset"] = dataOffset + (ALIGNMENT - dataOffset % ALIGNMENT) % ALIGNMENT
+    return ret
+
+
+def open_bars(path, fromDateTime=None, toDateTime=None):
+    """Opens a binary bar file. Columns are memory mapped, so only the parts of the file that are used get read.
+
+    :param path: The path to the file.
+    :param fromDateTime: If not None, bars before this datetime are skipped.
+    :param toDateTime: If not None, bars after this datetime are skipped.
+    :rtype: :class:`skywalker.barfeed.columnar.ColumnarBars`.
+    """
+    header = read_header(path)
+    count = header["count"]
+    columns = {}
+    if count:
+        offset = header["offset"]
+        for name, dtype in header["columns"]:
+            dtype = np.dtype(str(dtype))
+            columns[name] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+            offset += dtype.itemsize * count
+    else:
+        for name, dtype in header["columns"]:
+            columns[name] = np.empty(0, dtype=np.dtype(str(dtype)))
+
+    # Binary search for the date range.
+    timestamps = columns["timestamp"]
+    begin = 0
+    end = count
+    if fromDateTime is not None:
+        begin = np.searchsorted(timestamps, columnar.datetimes_to_timestamps([fromDateTime])[0][0], side="left")
+    if toDateTime is not None:
+        end = np.searchsorted(timestamps, columnar.datetimes_to_timestamps([toDateTime])[0][0], side="right")
+    end = max(begin, end)
+
+    tzinfo = None
+    if header["timezone"] is not None:
+        tzinfo = pytz.timezone(header["timezone"])
+    adjClose = columns.get("adj_close")
+    if adjClose is not None:
+        adjClose = adjClose[begin:end]
+    # Bars were validated when they were written.
+    return columnar.ColumnarBars(
+        timestamps[begin:end], columns["open"][begin:end], columns["high"][begin:end], columns["low"][begin:end],
+        columns["close"][begin:end], columns["volume"][begin:end], adjClose, header["frequency"],
+        {name: columns[name][begin:end] for name in header["extra"]}, tzinfo, check=False
+    )
+
+
+class BinaryFileWriter(object):
+    """Writes bars, one at a time, to a binary bar file. Bars are kept in memory until :meth:`close` is called.
+
+    :param path: The path to the file.
+    :param frequency: The frequency of the bars, or None to take it from the first bar.
+    """
+
+    def __init__(self, path, frequency=None):
+        self.__path = path
+        self.__frequency = frequency
+        self.__bars = []
+
+    def writeBar(self, bar_):
+        self.__bars.append(bar_)
+
+    def close(self):
+        write_bars(self.__path, columnar.ColumnarBars.fromBars(self.__bars, self.__frequency))
+        self.__bars = []
+
+
+def get_file_path(directory, instrument):
+    return os.path.join(directory, instrument + FILE_EXTENSION)
+
+
+class Feed(membf.BarFeed):
+    """A :class:`skywalker.barfeed.membf.BarFeed` that loads bars from binary bar files.
+
+    Files are memory mapped, so opening them takes about the same time regardless of their size.
+
+    :param frequency: The frequency of the bars. Check :class:`skywalker.bar.Frequency`.
+    :param maxLen: The maximum number of values that the :class:`skywalker.dataseries.bards.BarDataSeries` will hold.
+        Once a bounded length is full, when new items are added, a corresponding number of items are discarded from the
+        opposite end. If None then dataseries.DEFAULT_MAX_LEN is used.
+    :type maxLen: int.
+    """
+
+    def __init__(self, frequency, maxLen=None):
+        super(Feed, self).__init__(frequency, maxLen)
+        self.__haveAdjClose = None
+
+    def barsHaveAdjClose(self):
+        return bool(self.__haveAdjClose)
+
+    def addBarsFromFile(self, instrument, path, fromDateTime=None, toDateTime=None):
+        """Loads bars for a given instrument from a binary bar file.
+
+        :param instrument: Instrument identifier.
+        :type instrument: string.
+        :param path: The path to the file.
+        :type path: string.
+        :param fromDateTime: If not None, bars before this datetime are skipped.
+        :param toDateTime: If not None, bars after this datetime are skipped.
+        """
+        bars = open_bars(path, fromDateTime, toDateTime)
+        if bars.getFrequency() != self.getFrequency():
+            raise Exception("%s has bars with frequency %s" % (path, bars.getFrequency()))
+
+        haveAdjClose = bars.getColumn("adj_close") is not None
+        if self.__haveAdjClose is None:
+            self.__haveAdjClose = haveAdjClose
+        elif self.__haveAdjClose != haveAdjClose:
+            raise Exception("Some of the files have adjusted close and some don't")
+        self.addColumnarBars(instrument, bars)
+
+    def addBarsFromDirectory(self, directory, instruments=None, fromDateTime=None, toDateTime=None):
+        """Loads bars from a directory with one binary bar file per instrument, named after the instrument.
+
+        :param directory: The directory with the files.
+        :param instruments: The instruments to load, or None to load all the files in the directory.
+        :param fromDateTime: If not None, bars before this datetime are skipped.
+        :param toDateTime: If not None, bars after this datetime are skipped.
+        """
+        if instruments is None:
+            instruments = sorted(
+                fileName[:-len(FILE_EXTENSION)] for fileName in os.listdir(directory)
+                if fileName.endswith(FILE_EXTENSION)
+            )
+        for instrument in instruments:
+            self.addBarsFromFile(instrument, get_file_path(directory, instrument), fromDateTime, toDateTime)
+
+
+def write_feed(barFeed, directory, frequency=None):
+    """Writes all the bars from a bar feed to a directory, one binary bar file per instrument.
+
+    :param barFeed: The bar feed that will provide the bars.
+    :type barFeed: :class:`skywalker.barfeed.BaseBarFeed`
+    :param directory: The directory where the files are written.
+    :param frequency: If not None, bars are resampled to this frequency, in seconds, before they are written.
+        Check :func:`skywalker.tools.resample.resample_to_csv` for the supported frequencies.
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    writers = {}
+
+    def get_writer(instrument):
+        ret = writers.get(instrument)
+        if ret is None:
+            ret = BinaryFileWriter(get_file_path(directory, instrument), frequency or barFeed.getFrequency())
+            writers[instrument] = ret
+        return ret
+
+    resampledDSs = []
+    if frequency is None:
+        def on_bars(dateTime, bars):
+            for instrument in bars.getInstruments():
+                get_writer(instrument).writeBar(bars[instrument])
+        barFeed.getNewValuesEvent().subscribe(on_bars)
+    else:
+        for instrument in barFeed.getRegisteredInstruments():
+            resampledDS = resampled.ResampledBarDataSeries(barFeed[instrument], frequency)
+            resampledDS.getNewValueEvent().subscribe(
+                lambda ds, dateTime, value, instrument=instrument: get_writer(instrument).writeBar(value)
+            )
+            resampledDSs.append(resampledDS)
+
+    disp = dispatcher.Dispatcher()
+    disp.addSubject(barFeed)
+    disp.run()
+    for resampledDS in resampledDSs:
+        resampledDS.pushLast()
+
+    for writer in writers.values():
+        writer.close()
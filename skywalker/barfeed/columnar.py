@@ -0,0 +1,258 @@
+import datetime
+
+import numpy as np
+
+from skywalker import bar
+from skywalker.utils import dt
+
+# Column names for the standard bar values.
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume", "adj_close")
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def datetimes_to_timestamps(dateTimes):
+    """Converts a sequence of datetimes to an int64 array of UTC microseconds since the epoch.
+
+    :param dateTimes: A sequence of :class:`datetime.datetime`, a numpy datetime64 array or an integer array that
+        already holds microseconds since the epoch.
+    :rtype: A tuple with the int64 array and the tzinfo of the datetimes (None if they were naive).
+    """
+    if isinstance(dateTimes, np.ndarray) and dateTimes.dtype.kind in "iu":
+        return dateTimes.astype(np.int64), None
+    if isinstance(dateTimes, np.ndarray) and dateTimes.dtype.kind == "M":
+        return dateTimes.astype("datetime64[us]").view(np.int64), None
+
+    tzinfo = None
+    ret = np.empty(len(dateTimes), dtype=np.int64)
+    for i, dateTime in enumerate(dateTimes):
+        if i == 0 and not dt.datetime_is_naive(dateTime):
+            tzinfo = dateTime.tzinfo
+        if tzinfo is not None:
+            dateTime = dt.unlocalize(dt.as_utc(dateTime))
+        diff = dateTime - _EPOCH
+        ret[i] = (diff.days * 86400 + diff.seconds) * 1000000 + diff.microseconds
+    return ret, tzinfo
+
+
+def timestamp_to_datetime(timestamp, tzinfo=None):
+    """Converts UTC microseconds since the epoch back to a :class:`datetime.datetime` in the given timezone."""
+    ret = _EPOCH + datetime.timedelta(microseconds=int(timestamp))
+    if tzinfo is not None:
+        ret = dt.localize(dt.as_utc(ret), tzinfo)
+    return ret
+
+
+def _as_float_array(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+# Bars for a single instrument held as contiguous numpy columns, sharing one int64 timestamp index.
+# :class:`skywalker.bar.BasicBar` instances are only built when a position is requested.
+class ColumnarBars(object):
+    """Bars for a single instrument stored in columns.
+
+    :param timestamps: int64 array with UTC microseconds since the epoch. Must be sorted.
+    :param open_: Open prices.
+    :param high: High prices.
+    :param low: Low prices.
+    :param close: Close prices.
+    :param volume: Volumes.
+    :param adjClose: Adjusted close prices, or None if not available. NaN values are returned as None.
+    :param frequency: The bars frequency. Valid values defined in :class:`skywalker.bar.Frequency`.
+    :param extra: A map of column name to a sequence of values.
+    :param tzinfo: Timezone used to build the datetimes, or None for naive datetimes.
+    :param check: True to validate the bars. Only skip it for bars that were validated before, since it reads every
+        value.
+    """
+
+    def __init__(self, timestamps, open_, high, low, close, volume, adjClose, frequency, extra=None, tzinfo=None,
+                 check=True):
+        self.__timestamps = np.ascontiguousarray(timestamps, dtype=np.int64)
+        self.__open = _as_float_array(open_)
+        self.__high = _as_float_array(high)
+        self.__low = _as_float_array(low)
+        self.__close = _as_float_array(close)
+        self.__volume = _as_float_array(volume)
+        self.__adjClose = None
+        if adjClose is not None:
+            self.__adjClose = _as_float_array(adjClose)
+        self.__frequency = frequency
+        self.__extra = {}
+        if extra is not None:
+            for name, values in extra.items():
+                self.__extra[name] = np.asarray(values)
+        self.__tzinfo = tzinfo
+
+        size = len(self.__timestamps)
+        for values in [self.__open, self.__high, self.__low, self.__close, self.__volume, self.__adjClose] + \
+                self.__extra.values():
+            if values is not None and len(values) != size:
+                raise Exception("All the columns must have the same length")
+        if check:
+            self.__check()
+
+    def __check(self):
+        # Same validations that bar.BasicBar does, but for all the bars at once.
+        checks = [
+            (self.__high < self.__low, "high < low on %s"),
+            (self.__high < self.__open, "high < open on %s"),
+            (self.__high < self.__close, "high < close on %s"),
+            (self.__low > self.__open, "low > open on %s"),
+            (self.__low > self.__close, "low > close on %s"),
+        ]
+        for mask, msg in checks:
+            invalid = np.flatnonzero(mask)
+            if len(invalid):
+                raise Exception(msg % (self.getDateTime(invalid[0])))
+        if len(self.__timestamps) > 1 and np.any(np.diff(self.__timestamps) < 0):
+            raise Exception("Timestamps must be sorted")
+
+    @classmethod
+    def fromBars(cls, bars, frequency=None):
+        """Builds a ColumnarBars from a sequence of :class:`skywalker.bar.Bar`."""
+        timestamps, tzinfo = datetimes_to_timestamps([bar_.getDateTime() for bar_ in bars])
+        order = np.argsort(timestamps, kind="mergesort")
+        adjClose = [bar_.getAdjClose() for bar_ in bars]
+        if len(adjClose) and all(value is None for value in adjClose):
+            adjClose = None
+        else:
+            adjClose = [np.nan if value is None else value for value in adjClose]
+            adjClose = np.asarray(adjClose, dtype=np.float64)[order]
+        extra = {}
+        if len(bars):
+            for name in bars[0].getExtraColumns().keys():
+                extra[name] = np.asarray([bar_.getExtraColumns()[name] for bar_ in bars])[order]
+            if frequency is None:
+                frequency = bars[0].getFrequency()
+        return cls(
+            timestamps[order],
+            np.asarray([bar_.getOpen() for bar_ in bars], dtype=np.float64)[order],
+            np.asarray([bar_.getHigh() for bar_ in bars], dtype=np.float64)[order],
+            np.asarray([bar_.getLow() for bar_ in bars], dtype=np.float64)[order],
+            np.asarray([bar_.getClose() for bar_ in bars], dtype=np.float64)[order],
+            np.asarray([bar_.getVolume() for bar_ in bars], dtype=np.float64)[order],
+            adjClose,
+            frequency,
+            extra,
+            tzinfo
+        )
+
+    def merge(self, other):
+        """Returns a new ColumnarBars with the bars from both, sorted by timestamp."""
+        if sorted(self.__extra.keys()) != sorted(other.getExtraColumnNames()):
+            raise Exception("Extra columns don't match")
+        if (self.__adjClose is None) != (other.getColumn("adj_close") is None):
+            raise Exception("Adjusted close is available in only one set of bars")
+
+        timestamps = np.concatenate([self.__timestamps, other.getTimestamps()])
+        order = np.argsort(timestamps, kind="mergesort")
+
+        def merged(name):
+            values = np.concatenate([self.getColumn(name), other.getColumn(name)])
+            return values[order]
+
+        adjClose = None
+        if self.__adjClose is not None:
+            adjClose = merged("adj_close")
+        extra = {name: merged(name) for name in self.__extra.keys()}
+        return ColumnarBars(
+            timestamps[order], merged("open"), merged("high"), merged("low"), merged("close"), merged("volume"),
+            adjClose, self.__frequency, extra, self.__tzinfo
+        )
+
+    def select(self, mask):
+        """Returns a new ColumnarBars with the bars selected by a boolean mask or an array of positions."""
+        adjClose = None
+        if self.__adjClose is not None:
+            adjClose = self.__adjClose[mask]
+        extra = {name: values[mask] for name, values in self.__extra.items()}
+        return ColumnarBars(
+            self.__timestamps[mask], self.__open[mask], self.__high[mask], self.__low[mask], self.__close[mask],
+            self.__volume[mask], adjClose, self.__frequency, extra, self.__tzinfo, check=False
+        )
+
+    def __len__(self):
+        return len(self.__timestamps)
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self.getBar(i) for i in xrange(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if pos < 0 or pos >= len(self):
+            raise IndexError("Index out of range")
+        return self.getBar(pos)
+
+    def getBar(self, pos, dateTime=None):
+        """Builds the :class:`skywalker.bar.BasicBar` at a given position.
+
+        :param dateTime: The bar datetime, if the caller already has it.
+        """
+        if dateTime is None:
+            dateTime = self.getDateTime(pos)
+        adjClose = None
+        if self.__adjClose is not None:
+            adjClose = self.__adjClose.item(pos)
+            if adjClose != adjClose:
+                adjClose = None
+        extra = {}
+        for name, values in self.__extra.items():
+            value = values[pos]
+            if isinstance(value, np.generic):
+                value = value.item()
+            extra[name] = value
+        return bar.BasicBar(
+            dateTime,
+            self.__open.item(pos),
+            self.__high.item(pos),
+            self.__low.item(pos),
+            self.__close.item(pos),
+            self.__volume.item(pos),
+            adjClose,
+            self.__frequency,
+            extra=extra
+        )
+
+    def getDateTime(self, pos):
+        return timestamp_to_datetime(self.__timestamps.item(pos), self.__tzinfo)
+
+    def getTimestamp(self, pos):
+        return self.__timestamps.item(pos)
+
+    def getTimestamps(self):
+        return self.__timestamps
+
+    def getTimezone(self):
+        return self.__tzinfo
+
+    def getFrequency(self):
+        return self.__frequency
+
+    def getExtraColumnNames(self):
+        return self.__extra.keys()
+
+    def getColumn(self, name):
+        """Returns the array for a column. Valid names are those in OHLCV_COLUMNS and the extra column names."""
+        if name == "open":
+            return self.__open
+        elif name == "high":
+            return self.__high
+        elif name == "low":
+            return self.__low
+        elif name == "close":
+            return self.__close
+        elif name == "volume":
+            return self.__volume
+        elif name == "adj_close":
+            return self.__adjClose
+        return self.__extra[name]
+
+    def getMemoryUsage(self):
+        """Returns the number of bytes used by the columns."""
+        ret = self.__timestamps.nbytes
+        for name in OHLCV_COLUMNS + tuple(self.__extra.keys()):
+            values = self.getColumn(name)
+            if values is not None:
+                ret += values.nbytes
+        return ret
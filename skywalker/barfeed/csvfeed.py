@@ -19,10 +19,14 @@
 """
 
 import datetime
+import multiprocessing
 
+import numpy as np
+import pandas as pd
 import pytz
 
 from skywalker import bar
+from skywalker.barfeed import columnar
 from skywalker.barfeed import membf
 from skywalker.utils import csvutils
 from skywalker.utils import dt
@@ -45,6 +49,19 @@ class BarFilter(object):
     def includeBar(self, bar_):
         raise NotImplementedError()
 
+    # Returns a boolean array with the bars to include from a :class:`skywalker.barfeed.columnar.ColumnarBars`.
+    # Subclasses should override this to work on the columns directly.
+    def includeBars(self, bars):
+        return np.array([self.includeBar(bars.getBar(i)) for i in xrange(len(bars))], dtype=bool)
+
+
+# Returns the datetimes for the bars as a pandas.DatetimeIndex, in the timezone of the bars.
+def _get_datetime_index(bars):
+    ret = pd.DatetimeIndex(bars.getTimestamps() * 1000)
+    if bars.getTimezone() is not None:
+        ret = ret.tz_localize(pytz.utc).tz_convert(bars.getTimezone())
+    return ret
+
 
 class DateRangeFilter(BarFilter):
     def __init__(self, fromDate=None, toDate=None):
@@ -58,6 +75,15 @@ class DateRangeFilter(BarFilter):
             return False
         return True
 
+    def includeBars(self, bars):
+        timestamps = bars.getTimestamps()
+        ret = np.ones(len(timestamps), dtype=bool)
+        if self.__toDate:
+            ret &= timestamps <= columnar.datetimes_to_timestamps([self.__toDate])[0][0]
+        if self.__fromDate:
+            ret &= timestamps >= columnar.datetimes_to_timestamps([self.__fromDate])[0][0]
+        return ret
+
 
 # US Equities Regular Trading Hours filter
 # Monday ~ Friday
@@ -87,6 +113,98 @@ class USEquitiesRTH(DateRangeFilter):
                 return False
         return ret
 
+    def includeBars(self, bars):
+        ret = super(USEquitiesRTH, self).includeBars(bars)
+        dateTimes = _get_datetime_index(bars)
+        ret &= np.asarray(dateTimes.weekday) <= 4
+
+        # Naive datetimes are taken as US/Eastern times, like dt.localize does.
+        if bars.getTimezone() is None:
+            localDateTimes = dateTimes
+        else:
+            localDateTimes = dateTimes.tz_convert(USEquitiesRTH.timezone)
+        seconds = np.asarray(localDateTimes.hour) * 3600 + np.asarray(localDateTimes.minute) * 60 + \
+            np.asarray(localDateTimes.second) + np.asarray(localDateTimes.microsecond) / 1e6
+        fromSeconds = self.__fromTime.hour * 3600 + self.__fromTime.minute * 60
+        toSeconds = self.__toTime.hour * 3600 + self.__toTime.minute * 60
+        ret &= (seconds >= fromSeconds) & (seconds <= toSeconds)
+        return ret
+
+
+def _localize_timestamps(dateTimes, timezone):
+    # Same as dt.localize for naive datetimes: the wall time is kept and ambiguous times are taken as standard time.
+    try:
+        return dateTimes.tz_localize(timezone, ambiguous=np.zeros(len(dateTimes), dtype=bool)).tz_convert(pytz.utc)
+    except Exception:
+        return pd.DatetimeIndex([dt.localize(dateTime, timezone) for dateTime in dateTimes.to_pydatetime()])
+
+
+def _as_extra_column(values):
+    # Bulk version of csvutils.float_or_string.
+    if values.dtype.kind in "iufb":
+        return values.values.astype(np.float64)
+    values = values.values
+    numeric = pd.to_numeric(values, errors="coerce")
+    if not np.any(np.isnan(numeric) & pd.notnull(values)):
+        return numeric.astype(np.float64)
+    return np.array([csvutils.float_or_string(value) for value in values], dtype=object)
+
+
+def load_csv_columns(path, columnNames, dateTimeFormat, dailyBarTime=None, timezone=None, delimiter=","):
+    """Parses a CSV file with bars into numpy arrays, without building a bar per row.
+
+    :param path: The path to the CSV file. The first row must have the column names.
+    :param columnNames: A dict that maps datetime, open, high, low, close, volume and adj_close to the column names in
+        the file. adj_close may be None.
+    :param dateTimeFormat: The strptime format for the datetime column.
+    :param dailyBarTime: If not None, the time to set in every datetime.
+    :param timezone: If not None, the timezone the datetimes in the file are in.
+    :rtype: A dict with a "timestamp" int64 array with UTC microseconds since the epoch, one float array for open,
+        high, low, close and volume, "adj_close" with a float array (NaN where empty) or None if there are no
+        adjusted values, "extra" with a dict of extra columns and "tzinfo" with the timezone for the datetimes.
+    """
+    dateTimeColName = columnNames["datetime"]
+    df = pd.read_csv(path, sep=delimiter, dtype={dateTimeColName: str}, skip_blank_lines=True, float_precision="high")
+
+    dateTimes = pd.to_datetime(df[dateTimeColName].values, format=dateTimeFormat)
+    if dailyBarTime is not None:
+        dateTimes = dateTimes.normalize() + pd.Timedelta(
+            hours=dailyBarTime.hour, minutes=dailyBarTime.minute, seconds=dailyBarTime.second,
+            microseconds=dailyBarTime.microsecond
+        )
+    if timezone:
+        dateTimes = _localize_timestamps(dateTimes, timezone)
+    ret = {
+        "timestamp": dateTimes.asi8 // 1000,
+        "tzinfo": timezone if timezone else None,
+    }
+    for name in ("open", "high", "low", "close", "volume"):
+        values = df[columnNames[name]].values.astype(np.float64)
+        # The row parser fails on empty values since float("") raises ValueError. read_csv turns them into NaN.
+        invalid = np.flatnonzero(np.isnan(values))
+        if len(invalid):
+            raise ValueError("Invalid %s value on %s" % (columnNames[name], df[dateTimeColName].values[invalid[0]]))
+        ret[name] = values
+
+    ret["adj_close"] = None
+    adjCloseColName = columnNames["adj_close"]
+    if adjCloseColName is not None and adjCloseColName in df:
+        adjClose = pd.to_numeric(df[adjCloseColName].values, errors="coerce").astype(np.float64)
+        if not np.all(np.isnan(adjClose)):
+            ret["adj_close"] = adjClose
+
+    ret["extra"] = {}
+    knownColNames = set(columnNames.values())
+    for name in df.columns:
+        if name not in knownColNames:
+            ret["extra"][name] = _as_extra_column(df[name])
+    return ret
+
+
+def _load_csv_columns_star(args):
+    instrument, path, loadArgs = args
+    return instrument, load_csv_columns(path, *loadArgs)
+
 
 class BarFeed(membf.BarFeed):
     """Base class for CSV file based :class:`pyalgotrade.barfeed.BarFeed`.
@@ -125,6 +243,34 @@ class BarFeed(membf.BarFeed):
 
         self.addBarsFromSequence(instrument, loadedBars)
 
+    def addBarsFromCSVColumns(self, instrument, csvColumns):
+        """Adds bars parsed with :func:`load_csv_columns`. The bar filter is applied to the columns as a whole."""
+        timestamps = csvColumns["timestamp"]
+        order = None
+        if len(timestamps) > 1 and np.any(np.diff(timestamps) < 0):
+            order = np.argsort(timestamps, kind="mergesort")
+
+        def sortedColumn(values):
+            if values is None or order is None:
+                return values
+            return values[order]
+
+        bars = columnar.ColumnarBars(
+            sortedColumn(timestamps),
+            sortedColumn(csvColumns["open"]),
+            sortedColumn(csvColumns["high"]),
+            sortedColumn(csvColumns["low"]),
+            sortedColumn(csvColumns["close"]),
+            sortedColumn(csvColumns["volume"]),
+            sortedColumn(csvColumns["adj_close"]),
+            self.getFrequency(),
+            {name: sortedColumn(values) for name, values in csvColumns["extra"].items()},
+            csvColumns["tzinfo"]
+        )
+        if self.__barFilter is not None:
+            bars = bars.select(self.__barFilter.includeBars(bars))
+        self.addColumnarBars(instrument, bars)
+
 
 class GenericRowParser(RowParser):
     def __init__(self, columnNames, dateTimeFormat, dailyBarTime, frequency, timezone, barClass=bar.BasicBar):
@@ -268,14 +414,60 @@ class GenericBarFeed(BarFeed):
         if timezone is None:
             timezone = self.__timezone
 
-        rowParser = GenericRowParser(
-            self.__columnNames, self.__dateTimeFormat, self.getDailyBarTime(), self.getFrequency(),
-            timezone, self.__barClass
-        )
+        # Custom bar classes need a bar built for every row.
+        if self.__barClass is not bar.BasicBar:
+            rowParser = GenericRowParser(
+                self.__columnNames, self.__dateTimeFormat, self.getDailyBarTime(), self.getFrequency(),
+                timezone, self.__barClass
+            )
+            super(GenericBarFeed, self).addBarsFromCSV(instrument, path, rowParser)
+            self.__checkAdjClose(rowParser.barsHaveAdjClose())
+        else:
+            self.__addCSVColumns(instrument, load_csv_columns(path, *self.__getLoadArgs(timezone)))
+
+    def addBarsFromCSVFiles(self, instrumentPaths, timezone=None, workerCount=None):
+        """Loads bars from many CSV formatted files, parsing them in parallel.
+
+        :param instrumentPaths: A sequence of (instrument, path) tuples.
+        :param timezone: The timezone to use to localize bars. Check :mod:`pyalgotrade.marketsession`.
+        :type timezone: A pytz timezone.
+        :param workerCount: The number of processes to use to parse the files. If None, the number of CPUs is used.
+            If 1, the files are parsed in this process.
+        :type workerCount: int.
 
-        super(GenericBarFeed, self).addBarsFromCSV(instrument, path, rowParser)
+        .. note::
+            Only :class:`pyalgotrade.bar.BasicBar` is supported as the bar class.
+        """
+        assert self.__barClass is bar.BasicBar, "Only BasicBar is supported when loading files in parallel"
 
-        if rowParser.barsHaveAdjClose():
+        if timezone is None:
+            timezone = self.__timezone
+        if workerCount is None:
+            workerCount = multiprocessing.cpu_count()
+        tasks = [(instrument, path, self.__getLoadArgs(timezone)) for instrument, path in instrumentPaths]
+
+        if workerCount == 1 or len(tasks) <= 1:
+            results = map(_load_csv_columns_star, tasks)
+        else:
+            pool = multiprocessing.Pool(min(workerCount, len(tasks)))
+            try:
+                results = pool.map(_load_csv_columns_star, tasks)
+            finally:
+                pool.close()
+                pool.join()
+
+        for instrument, csvColumns in results:
+            self.__addCSVColumns(instrument, csvColumns)
+
+    def __getLoadArgs(self, timezone):
+        return dict(self.__columnNames), self.__dateTimeFormat, self.getDailyBarTime(), timezone
+
+    def __addCSVColumns(self, instrument, csvColumns):
+        self.addBarsFromCSVColumns(instrument, csvColumns)
+        self.__checkAdjClose(csvColumns["adj_close"] is not None)
+
+    def __checkAdjClose(self, haveAdjClose):
+        if haveAdjClose:
             self.__haveAdjClose = True
         elif self.__haveAdjClose:
             raise Exception("Previous bars had adjusted close and these ones don't have.")
@@ -0,0 +1,85 @@
+# -*- coding:utf-8 -*-
+from skywalker.utils import dt
+
+
+class EquityEvent(object):
+    """A dividend or split for an instrument on its ex-date.
+
+    :param instrument: Instrument identifier.
+    :param capitalization: New shares per share from capital reserve (转增).
+    :param stock: New shares per share from stock dividends (送股).
+    :param cashAfterTax: Cash dividend per share, after taxes.
+    """
+
+    def __init__(self, instrument, capitalization, stock, cashAfterTax):
+        self.__instrument = instrument
+        self.__capitalization = capitalization
+        self.__stock = stock
+        self.__cashAfterTax = cashAfterTax
+        self.__shareRatio = float(1 + capitalization + stock)
+
+    def getInstrument(self):
+        return self.__instrument
+
+    def getCapitalization(self):
+        return self.__capitalization
+
+    def getStock(self):
+        return self.__stock
+
+    def getCashAfterTax(self):
+        return self.__cashAfterTax
+
+    def getShareRatio(self):
+        """Returns the number of shares held after the event for each share held before it."""
+        return self.__shareRatio
+
+
+class EquityEventCalendar(object):
+    """Equity events indexed by ex-date, so the events for a date are found in O(1) regardless of the number of
+    instruments.
+
+    :param events: A sequence of (ex-date, :class:`EquityEvent`) tuples.
+    """
+
+    def __init__(self, events=()):
+        self.__events = {}
+        for dateTime, event in events:
+            self.__events.setdefault(self.__getKey(dateTime), []).append(event)
+
+    @classmethod
+    def fromFrames(cls, frames):
+        """Builds the calendar from a dict of instrument -> DataFrame indexed by div_exdate, with div_capitalization,
+        div_stock and div_cashaftertax columns."""
+        events = []
+        for instrument, frame in frames.items():
+            if frame is None:
+                continue
+            for dateTime, capitalization, stock, cashAfterTax in zip(
+                frame.index, frame['div_capitalization'].values, frame['div_stock'].values,
+                frame['div_cashaftertax'].values
+            ):
+                events.append((dateTime, EquityEvent(instrument, capitalization, stock, cashAfterTax)))
+        return cls(events)
+
+    def __getKey(self, dateTime):
+        # Keys are UTC timestamps so that naive and localized datetimes for the same instant match.
+        return dt.datetime_to_timestamp(dateTime)
+
+    def __len__(self):
+        return len(self.__events)
+
+    def getEvents(self, dateTime):
+        """Returns a list with the :class:`EquityEvent` on a given date, which is empty if there are none."""
+        return self.__events.get(self.__getKey(dateTime), [])
+
+    def getEvent(self, instrument, dateTime):
+        """Returns the :class:`EquityEvent` for an instrument on a given date, or None."""
+        for event in self.getEvents(dateTime):
+            if event.getInstrument() == instrument:
+                return event
+        return None
+
+    def getTimestamps(self):
+        """Returns the sorted UTC timestamps of the dates with events."""
+        return sorted(self.__events.keys())
@@ -18,19 +18,32 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
+import heapq
+
+import numpy as np
+
 from skywalker import bar
 from skywalker import barfeed
-from skywalker import utils
+from skywalker.barfeed import columnar
 
 
 # A non real-time BarFeed responsible for:
 # - Holding bars in memory.
 # - Aligning them with respect to time.
 #
+# The next datetime for every instrument is kept in a priority queue that gets updated as bars are consumed, so
+# peeking and getting the next bars doesn't require scanning all the instruments.
+#
+# Bars for an instrument can be held either as a list of bar.BasicBar (addBarsFromSequence) or in columnar form
+# (addBarsFromColumns), where OHLCV values live in numpy arrays and bar.BasicBar instances are built only when the
+# bars get dispatched.
+#
 # Subclasses should:
 # - Forward the call to start() if they override it.
 
 class BarFeed(barfeed.BaseBarFeed):
+    DATETIME_CACHE_SIZE = 1024
+
     def __init__(self, frequency, maxLen=None):
         super(BarFeed, self).__init__(frequency, maxLen)
 
@@ -38,6 +51,10 @@ class BarFeed(barfeed.BaseBarFeed):
         self.__nextPos = {}
         self.__started = False
         self.__currDateTime = None
+        # Priority queue of (nextDateTime, instrument). Built lazily since bars can be added after reset.
+        self.__queue = None
+        # Datetimes built for columnar bars. Instruments usually share timestamps so this saves building them again.
+        self.__dateTimeCache = {}
 
     def getBars(self):
         return self.__bars
@@ -47,6 +64,7 @@ class BarFeed(barfeed.BaseBarFeed):
         for instrument in self.__bars.keys():
             self.__nextPos.setdefault(instrument, 0)
         self.__currDateTime = None
+        self.__queue = None
         super(BarFeed, self).reset()
 
     def getCurrentDateTime(self):
@@ -66,6 +84,11 @@ class BarFeed(barfeed.BaseBarFeed):
         if self.__started:
             raise Exception("Can't add more bars once you started consuming bars")
 
+        # If the instrument is already held in columnar form, keep it that way.
+        if isinstance(self.__bars.get(instrument), columnar.ColumnarBars):
+            self.addColumnarBars(instrument, columnar.ColumnarBars.fromBars(bars, self.getFrequency()))
+            return
+
         self.__bars.setdefault(instrument, [])
         self.__nextPos.setdefault(instrument, 0)
 
@@ -75,26 +98,88 @@ class BarFeed(barfeed.BaseBarFeed):
         # self.__bars[instrument].sort(barCmp)
         keyFun = lambda bars: bars.getDateTime()
         self.__bars[instrument].sort(key=keyFun)
+        self.__queue = None
 
         self.registerInstrument(instrument)
 
+    def addBarsFromColumns(self, instrument, dateTimes, open_, high, low, close, volume, adjClose=None, extra=None,
+                           timezone=None):
+        """Adds bars for an instrument in columnar form.
+
+        :param dateTimes: A sequence of :class:`datetime.datetime`, a numpy datetime64 array or an int64 array with
+            UTC microseconds since the epoch.
+        :param adjClose: Adjusted close prices or None.
+        :param extra: A map of extra column name to a sequence of values.
+        :param timezone: Timezone for the generated datetimes. If None, the one from dateTimes is used.
+        """
+        timestamps, tzinfo = columnar.datetimes_to_timestamps(dateTimes)
+        if timezone is not None:
+            tzinfo = timezone
+        # Only reorder when needed, since columns usually come sorted already.
+        if len(timestamps) > 1 and np.any(np.diff(timestamps) < 0):
+            order = np.argsort(timestamps, kind="mergesort")
+            timestamps = timestamps[order]
+            open_, high, low, close, volume = [np.asarray(values)[order] for values in (
+                open_, high, low, close, volume)]
+            if adjClose is not None:
+                adjClose = np.asarray(adjClose)[order]
+            if extra is not None:
+                extra = {name: np.asarray(values)[order] for name, values in extra.items()}
+        bars = columnar.ColumnarBars(
+            timestamps, open_, high, low, close, volume, adjClose, self.getFrequency(), extra, tzinfo
+        )
+        self.addColumnarBars(instrument, bars)
+
+    def addColumnarBars(self, instrument, bars):
+        """Adds a :class:`skywalker.barfeed.columnar.ColumnarBars` for an instrument."""
+        if self.__started:
+            raise Exception("Can't add more bars once you started consuming bars")
+
+        current = self.__bars.get(instrument)
+        if current is None or (isinstance(current, list) and len(current) == 0):
+            self.__bars[instrument] = bars
+        elif isinstance(current, list):
+            # Switch the instrument to columnar form.
+            self.__bars[instrument] = columnar.ColumnarBars.fromBars(current, self.getFrequency()).merge(bars)
+        else:
+            self.__bars[instrument] = current.merge(bars)
+        self.__nextPos.setdefault(instrument, 0)
+        self.__queue = None
+
+        self.registerInstrument(instrument)
+
+    def __getDateTime(self, bars, pos):
+        if not isinstance(bars, columnar.ColumnarBars):
+            return bars[pos].getDateTime()
+
+        key = (bars.getTimestamp(pos), bars.getTimezone())
+        ret = self.__dateTimeCache.get(key)
+        if ret is None:
+            if len(self.__dateTimeCache) >= BarFeed.DATETIME_CACHE_SIZE:
+                self.__dateTimeCache = {}
+            ret = bars.getDateTime(pos)
+            self.__dateTimeCache[key] = ret
+        return ret
+
+    def __getQueue(self):
+        if self.__queue is None:
+            self.__queue = []
+            for instrument, bars in self.__bars.items():
+                nextPos = self.__nextPos[instrument]
+                if nextPos < len(bars):
+                    self.__queue.append((self.__getDateTime(bars, nextPos), instrument))
+            heapq.heapify(self.__queue)
+        return self.__queue
+
     def eof(self):
-        ret = True
         # Check if there is at least one more bar to return.
-        for instrument, bars in self.__bars.items():
-            nextPos = self.__nextPos[instrument]
-            if nextPos < len(bars):
-                ret = False
-                break
-        return ret
+        return len(self.__getQueue()) == 0
 
     def peekDateTime(self):
         ret = None
-
-        for instrument, bars in self.__bars.items():
-            nextPos = self.__nextPos[instrument]
-            if nextPos < len(bars):
-                ret = utils.safe_min(ret, bars[nextPos].getDateTime())
+        queue = self.__getQueue()
+        if len(queue):
+            ret = queue[0][0]
         return ret
 
     def getNextBars(self):
@@ -104,13 +189,21 @@ class BarFeed(barfeed.BaseBarFeed):
         if smallestDateTime is None:
             return None
 
-        # Make a second pass to get all the bars that had the smallest datetime.
+        # Pop all the instruments that had the smallest datetime and schedule their following bar.
         ret = {}
-        for instrument, bars in self.__bars.items():
+        queue = self.__getQueue()
+        while len(queue) and queue[0][0] == smallestDateTime:
+            dateTime, instrument = heapq.heappop(queue)
+            bars = self.__bars[instrument]
             nextPos = self.__nextPos[instrument]
-            if nextPos < len(bars) and bars[nextPos].getDateTime() == smallestDateTime:
+            if isinstance(bars, columnar.ColumnarBars):
+                ret[instrument] = bars.getBar(nextPos, dateTime)
+            else:
                 ret[instrument] = bars[nextPos]
-                self.__nextPos[instrument] += 1
+            nextPos += 1
+            self.__nextPos[instrument] = nextPos
+            if nextPos < len(bars):
+                heapq.heappush(queue, (self.__getDateTime(bars, nextPos), instrument))
 
         if self.__currDateTime == smallestDateTime:
             raise Exception("Duplicate bars found for %s on %s" % (ret.keys(), smallestDateTime))
@@ -10,6 +10,7 @@ from WindPy import *
 
 from skywalker import bar
 from skywalker.barfeed import dbfeed
+from skywalker.barfeed import equityevent
 from skywalker.barfeed import membf
 from skywalker.utils import dt
 
@@ -339,6 +340,7 @@ class Feed(membf.BarFeed):
         super(Feed, self).__init__(frequency, maxLen)
         self.__db = Database(host=host, port=port, user=user, password=password, database=database)
         self.__equityEventsDict = None
+        self.__equityEventCalendar = None
 
     def barsHaveAdjClose(self):
         return True
@@ -353,6 +355,7 @@ class Feed(membf.BarFeed):
             bars = self.__db.getBars(instrument[i], self.getFrequency(), timezone, fd, td, extra=extra)
             self.addBarsFromSequence(instrument[i], bars)
         self.__equityEventsDict = {k: self.__getEquityEvent(k) for k in instrument}
+        self.__equityEventCalendar = equityevent.EquityEventCalendar.fromFrames(self.__equityEventsDict)
 
     def importBars(self, instrument, fromDateTime, toDateTime, extra=[]):
         self.__db.importBars(instrument, fromDateTime, toDateTime, extra)
@@ -368,10 +371,11 @@ class Feed(membf.BarFeed):
     def getEquityEvent(self, instrument):
         return self.__equityEventsDict[instrument]
 
+    def getEquityEventCalendar(self):
+        """Returns the :class:`skywalker.barfeed.equityevent.EquityEventCalendar` for the instruments loaded, or None if
+        no bars were loaded."""
+        return self.__equityEventCalendar
+
     def haveEquityEvent(self, instrument, date):
-        equityEvent = self.getEquityEvent(instrument)
-        if len(equityEvent[date:date]) > 0:
-            haveEE = True
-        else:
-            haveEE = False
-        return haveEE
+        return self.__equityEventCalendar is not None and \
+            self.__equityEventCalendar.getEvent(instrument, date) is not None
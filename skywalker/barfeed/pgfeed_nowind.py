@@ -1,25 +1,55 @@
 # -*- coding:utf-8 -*-
 # PyAlgoTrade_skysense
 
+import time
 from datetime import datetime
 from math import isnan
 
+import numpy as np
 import pandas as pd
 import psycopg2
+import pytz
 from sqlalchemy import create_engine
 
+import skywalker.logger
 from skywalker import bar
 from skywalker.barfeed import dbfeed
+from skywalker.barfeed import barcache
+from skywalker.barfeed import equityevent
 from skywalker.barfeed import membf
 from skywalker.utils import dt
 from skywalker.utils.dt import datetime_to_timestamp
 from skywalker.utils.dt import timestamp_to_datetime
 
 
+logger = skywalker.logger.getLogger("pgfeed")
+
+# Number of rows to fetch at a time from server side cursors.
+BULK_FETCH_SIZE = 100000
+
+
 def normalize_instrument(instrument):
     return instrument.upper()
 
 
+def build_equity_event_frame(name, div_exdate, div_capitalization, div_stock, div_cashaftertax):
+    keys = ['instrument', 'div_exdate', 'div_capitalization', 'div_stock', 'div_cashaftertax']
+    ret = pd.DataFrame(
+        {k: v for k, v in zip(keys, [name, div_exdate, div_capitalization, div_stock, div_cashaftertax])})
+    ret = ret.set_index('div_exdate')
+    return ret
+
+
+# Splits arrays sorted by instrument name into a dict of instrument -> slice.
+def split_by_instrument(names):
+    ret = {}
+    if len(names):
+        boundaries = np.concatenate([[0], np.flatnonzero(names[1:] != names[:-1]) + 1, [len(names)]])
+        for begin, end in zip(boundaries[:-1], boundaries[1:]):
+            ret[names[begin]] = slice(begin, end)
+    return ret
+
+
 class Database(dbfeed.Database):
     def __init__(self, host='localhost', port=5432, user='postgres', password='123456', database='Skywalker'):
         self.__instrumentIds = {}
@@ -120,10 +150,32 @@ class Database(dbfeed.Database):
             div_capitalization.append(row[2])
             div_stock.append(row[3])
             div_cashaftertax.append(row[4])
-        keys = ['instrument', 'div_exdate', 'div_capitalization', 'div_stock', 'div_cashaftertax']
-        ret = pd.DataFrame(
-            {k: v for k, v in zip(keys, [name, div_exdate, div_capitalization, div_stock, div_cashaftertax])})
-        ret = ret.set_index('div_exdate')
+        return build_equity_event_frame(name, div_exdate, div_capitalization, div_stock, div_cashaftertax)
+
+    def getEquityEvents(self, instruments):
+        """Returns a dict of instrument -> equity events DataFrame, loading all the instruments with one query."""
+        sql = """select instrument.name,equityevent.div_exdate,equityevent.div_capitalization,equityevent.div_stock,equityevent.div_cashaftertax
+        from equityevent join instrument on (equityevent.instrument_id = instrument.instrument_id)
+        where instrument.name = any(%s)
+        order by instrument.name, equityevent.div_exdate
+        """
+        cursor = self.__connection.cursor()
+        cursor.execute(sql, [list(instruments)])
+        self.__connection.commit()
+        rows = cursor.fetchall()
+        cursor.close()
+
+        events = {}
+        for row in rows:
+            event = events.setdefault(row[0], ([], [], [], [], []))
+            event[0].append(row[0])
+            event[1].append(dt.timestamp_to_datetime(row[1]))
+            event[2].append(row[2])
+            event[3].append(row[3])
+            event[4].append(row[4])
+        ret = {}
+        for instrument in instruments:
+            ret[instrument] = build_equity_event_frame(*events.get(instrument, ([], [], [], [], [])))
         return ret
 
     def createSchema(self):
@@ -333,6 +385,80 @@ class Database(dbfeed.Database):
         cursor.close()
         return ret
 
+    def getBarsColumns(self, instruments, frequency, fromDateTime=None, toDateTime=None, extra=None,
+                       fetchSize=BULK_FETCH_SIZE):
+        """Loads the bars for many instruments with a single query, using a server side cursor.
+
+        Returns a dict of normalized instrument -> dict of column name -> numpy.array. Columns are timestamp (UTC
+        seconds), open, high, low, close, volume, adj_close and the extra ones. Null values are returned as NaN,
+        except for extra columns that keep the values returned by the database.
+        """
+        if extra is None:
+            extra = []
+        sql = "select instrument.name, bar.timestamp, bar.open, bar.high, bar.low, bar.close, bar.volume, bar.adj_close{extra}" \
+              " from bar join instrument on (bar.instrument_id = instrument.instrument_id)" \
+              " where instrument.name = any(%s) and bar.frequency = %s"
+        extraFieldsString = ''.join([", bar." + field for field in extra])
+        args = [[normalize_instrument(instrument) for instrument in instruments], frequency]
+        if fromDateTime is not None:
+            sql += " and bar.timestamp >= %s"
+            args.append(dt.datetime_to_timestamp(fromDateTime))
+        if toDateTime is not None:
+            sql += " and bar.timestamp <= %s"
+            args.append(dt.datetime_to_timestamp(toDateTime))
+        sql += " order by instrument.name, bar.timestamp asc"
+
+        begin = time.time()
+        names = []
+        values = []
+        extraValues = []
+        # Named cursors are server side, so rows are transferred in batches instead of all at once.
+        cursor = self.__connection.cursor(name="skywalker_bars")
+        try:
+            cursor.itersize = fetchSize
+            cursor.execute(sql.format(extra=extraFieldsString), args)
+            while True:
+                rows = cursor.fetchmany(fetchSize)
+                if not rows:
+                    break
+                names.append(np.array([row[0] for row in rows], dtype=object))
+                values.append(np.array([row[1:8] for row in rows], dtype=float))
+                if len(extra):
+                    extraValues.append(np.array([row[8:] for row in rows], dtype=object))
+        except Exception:
+            # Ending the transaction drops the server side cursor, so the next call can use the same name.
+            self.__connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.__connection.commit()
+
+        ret = {}
+        if len(names):
+            names = np.concatenate(names)
+            values = np.concatenate(values)
+            if len(extra):
+                extraValues = np.concatenate(extraValues)
+            for instrument, rows in split_by_instrument(names).items():
+                columns = {
+                    "timestamp": values[rows, 0].astype(np.int64),
+                    "open": values[rows, 1],
+                    "high": values[rows, 2],
+                    "low": values[rows, 3],
+                    "close": values[rows, 4],
+                    "volume": values[rows, 5],
+                    "adj_close": values[rows, 6],
+                }
+                for i, field in enumerate(extra):
+                    columns[field] = extraValues[rows, i]
+                ret[instrument] = columns
+
+        elapsed = time.time() - begin
+        logger.info("Loaded %d bars for %d instruments in %.2f seconds (%d rows/s)" % (
+            len(names), len(ret), elapsed, len(names) / max(elapsed, 1e-6)
+        ))
+        return ret
+
     def disconnect(self):
         self.__connection.close()
         self.__connection = None
@@ -373,10 +499,14 @@ class Database(dbfeed.Database):
 
 class Feed(membf.BarFeed):
     def __init__(self, frequency=bar.Frequency.DAY, host='localhost', port=5432, user='postgres', password='123456',
-                 database='Skywalker', maxLen=None):
+                 database='Skywalker', maxLen=None, cacheDir=None, cacheVersion=None):
         super(Feed, self).__init__(frequency, maxLen)
         self.__db = Database(host=host, port=port, user=user, password=password, database=database)
         self.__equityEventsDict = None
+        self.__equityEventCalendar = None
+        self.__cache = None
+        if cacheDir is not None:
+            self.__cache = barcache.BarCache(cacheDir, cacheVersion)
 
     def barsHaveAdjClose(self):
         return True
@@ -384,15 +514,44 @@ class Feed(membf.BarFeed):
     def getDatabase(self):
         return self.__db
 
+    def getBarCache(self):
+        """Returns the :class:`skywalker.barfeed.barcache.BarCache` used, or None if bars are not cached."""
+        return self.__cache
+
     def loadBars(self, instrument, timezone=None, fromDateTime=None, toDateTime=None, extra=None):
         if extra is None:
             extra = []
         fd = datetime.strptime(fromDateTime, '%Y-%m-%d')
         td = datetime.strptime(toDateTime, '%Y-%m-%d')
+        if timezone is None:
+            timezone = pytz.utc
+        # Load the whole universe at once and keep the bars in columnar form.
+        if self.__cache is not None:
+            columnsDict = self.__cache.getBarsColumns(
+                self.__db, [normalize_instrument(inst) for inst in instrument], self.getFrequency(), fd, td,
+                extra=extra
+            )
+        else:
+            columnsDict = self.__db.getBarsColumns(instrument, self.getFrequency(), fd, td, extra=extra)
         for i in range(0, len(instrument)):
-            bars = self.__db.getBars(instrument[i], self.getFrequency(), timezone, fd, td, extra=extra)
-            self.addBarsFromSequence(instrument[i], bars)
-        self.__equityEventsDict = {k: self.__getEquityEvent(k) for k in instrument}
+            columns = columnsDict.get(normalize_instrument(instrument[i]))
+            if columns is None:
+                self.addBarsFromSequence(instrument[i], [])
+                continue
+            self.addBarsFromColumns(
+                instrument[i],
+                columns["timestamp"] * 1000000,
+                columns["open"],
+                columns["high"],
+                columns["low"],
+                columns["close"],
+                columns["volume"],
+                columns["adj_close"],
+                {field: columns[field] for field in extra},
+                timezone
+            )
+        self.__equityEventsDict = self.__db.getEquityEvents(instrument)
+        self.__equityEventCalendar = equityevent.EquityEventCalendar.fromFrames(self.__equityEventsDict)
 
     # def importBars(self, instrument, fromDateTime, toDateTime, extra=[]):
     #     self.__db.importBars(instrument, fromDateTime, toDateTime, extra)
@@ -415,10 +574,11 @@ class Feed(membf.BarFeed):
         except TypeError:
             return None
 
+    def getEquityEventCalendar(self):
+        """Returns the :class:`skywalker.barfeed.equityevent.EquityEventCalendar` for the instruments loaded, or None if
+        no bars were loaded."""
+        return self.__equityEventCalendar
+
     def haveEquityEvent(self, instrument, date):
-        equityEvent = self.getEquityEvent(instrument)
-        if equityEvent is None or len(equityEvent[date:date]) <= 0:
-            haveEE = False
-        else:
-            haveEE = True
-        return haveEE
+        return self.__equityEventCalendar is not None and \
+            self.__equityEventCalendar.getEvent(instrument, date) is not None
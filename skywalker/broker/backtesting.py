@@ -481,16 +481,16 @@ class Broker(broker.Broker):
         pass
 
     def __fixPostionsAndCash(self, datetime):
+        # Only the instruments with an equity event on this date need to be checked.
+        calendar = self.__barFeed.getEquityEventCalendar()
+        if calendar is None:
+            return
         pos = self.getPositions()
-        for instrument in pos.keys():
-            if self.__barFeed.haveEquityEvent(instrument, datetime):
-                equityEvent = self.__barFeed.getEquityEvent(instrument)
-                event = equityEvent[datetime:datetime]
-                div_capitalization = event['div_capitalization'].iloc[0]
-                div_stock = event['div_stock'].iloc[0]
-                div_cashaftertax = event['div_cashaftertax'].iloc[0]
-                self.fixPositions(instrument, pos[instrument] * float(1 + div_capitalization + div_stock))
-                self.setCash(self.getCash() + pos[instrument] * div_cashaftertax)
+        for event in calendar.getEvents(datetime):
+            instrument = event.getInstrument()
+            if instrument in pos:
+                self.fixPositions(instrument, pos[instrument] * event.getShareRatio())
+                self.setCash(self.getCash() + pos[instrument] * event.getCashAfterTax())
 
     def peekDateTime(self):
         return None
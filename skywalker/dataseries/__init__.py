@@ -105,6 +105,9 @@ class SequenceDataSeries(DataSeries):
         self.__newValueEvent = observer.Event()
         self.__values = collections.ListDeque(maxLen)
         self.__dateTimes = collections.ListDeque(maxLen)
+        # Maps datetimes to the number of values appended before them. Built on the first call to getPosition.
+        self.__dateTimePositions = None
+        self.__appendCount = 0
 
     def __len__(self):
         return len(self.__values)
@@ -116,6 +119,7 @@ class SequenceDataSeries(DataSeries):
         """Sets the maximum number of values to hold and resizes accordingly if necessary."""
         self.__values.resize(maxLen)
         self.__dateTimes.resize(maxLen)
+        self.__dateTimePositions = None
 
     def getMaxLen(self):
         """Returns the maximum number of values to hold."""
@@ -150,14 +154,37 @@ class SequenceDataSeries(DataSeries):
             raise Exception("Invalid datetime. It must be bigger than that last one")
 
         assert (len(self.__values) == len(self.__dateTimes))
+        if self.__dateTimePositions is not None:
+            if len(self.__dateTimes) == self.__dateTimes.getMaxLen():
+                self.__dateTimePositions.pop(self.__dateTimes[0], None)
+            if dateTime is not None:
+                self.__dateTimePositions[dateTime] = self.__appendCount
         self.__dateTimes.append(dateTime)
         self.__values.append(value)
+        self.__appendCount += 1
 
         self.getNewValueEvent().emit(self, dateTime, value)
 
     def getDateTimes(self):
         return self.__dateTimes.data()
 
+    def getDateTimeIndex(self, dateTime):
+        """Returns the position of the value for a given datetime, or None if there is no such value.
+
+        Unlike getDateTimes().index(dateTime) this takes constant time. The index is built on the first call and
+        updated as values are appended.
+        """
+        if self.__dateTimePositions is None:
+            dateTimes = self.__dateTimes.data()
+            first = self.__appendCount - len(dateTimes)
+            self.__dateTimePositions = {
+                dateTime_: first + i for i, dateTime_ in enumerate(dateTimes) if dateTime_ is not None
+            }
+        ret = self.__dateTimePositions.get(dateTime)
+        if ret is not None:
+            ret -= self.__appendCount - len(self.__dateTimes)
+        return ret
+
     def getPandasSeries(self):
         values = self.__values[0:]
         datetime = self.getDateTimes()
@@ -18,9 +18,10 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
+import heapq
+
 from skywalker import dispatchprio
 from skywalker import observer
-from skywalker import utils
 
 
 # This class is responsible for dispatching events from multiple subjects, synchronizing them if necessary.
@@ -31,6 +32,10 @@ class Dispatcher(object):
         self.__startEvent = observer.Event()
         self.__idleEvent = observer.Event()
         self.__currDateTime = None
+        # Priority queue of (nextDateTime, subjectIdx) for non-realtime subjects and the indices of the subjects
+        # that have no scheduled datetime (realtime subjects or ones that are not known yet).
+        self.__queue = []
+        self.__unscheduled = []
 
     # Returns the current event datetime. It may be None for events from realtime subjects.
     def getCurrentDateTime(self):
@@ -75,27 +80,64 @@ class Dispatcher(object):
             ret = subject.dispatch() is True
         return ret
 
+    # Puts the subject either in the priority queue, if it has a next datetime, or with the unscheduled ones.
+    def __schedule(self, subjectIdx):
+        subject = self.__subjects[subjectIdx]
+        nextDateTime = None
+        if not subject.eof():
+            nextDateTime = subject.peekDateTime()
+        if nextDateTime is None:
+            self.__unscheduled.append(subjectIdx)
+        else:
+            heapq.heappush(self.__queue, (nextDateTime, subjectIdx))
+
+    def __initQueue(self):
+        self.__queue = []
+        self.__unscheduled = []
+        for subjectIdx in xrange(len(self.__subjects)):
+            self.__schedule(subjectIdx)
+
     # Returns a tuple with booleans
     # 1: True if all subjects hit eof
     # 2: True if at least one subject dispatched events.
+    #
+    # Non-realtime subjects are kept in a priority queue keyed by their next datetime, and they are only peeked again
+    # after they get dispatched, since that is the only time their next datetime can change. Unscheduled subjects
+    # (realtime ones, or those that returned None from peekDateTime) are checked on every call.
     def __dispatch(self):
-        smallestDateTime = None
-        eof = True
-        eventsDispatched = False
-
-        # Scan for the lowest datetime.
-        for subject in self.__subjects:
-            if not subject.eof():
-                eof = False
-                smallestDateTime = utils.safe_min(smallestDateTime, subject.peekDateTime())
+        eof = len(self.__queue) == 0
+        realtime = []
+        unscheduled = self.__unscheduled
+        self.__unscheduled = []
+        for subjectIdx in unscheduled:
+            subject = self.__subjects[subjectIdx]
+            if subject.eof():
+                self.__unscheduled.append(subjectIdx)
+                continue
+            eof = False
+            nextDateTime = subject.peekDateTime()
+            if nextDateTime is None:
+                realtime.append(subjectIdx)
+            else:
+                heapq.heappush(self.__queue, (nextDateTime, subjectIdx))
 
-        # Dispatch realtime subjects and those subjects with the lowest datetime.
+        eventsDispatched = False
         if not eof:
+            # Pop every subject scheduled for the lowest datetime.
+            smallestDateTime = None
+            toDispatch = realtime
+            if len(self.__queue):
+                smallestDateTime = self.__queue[0][0]
+                while len(self.__queue) and self.__queue[0][0] == smallestDateTime:
+                    toDispatch.append(heapq.heappop(self.__queue)[1])
             self.__currDateTime = smallestDateTime
 
-            for subject in self.__subjects:
-                if self.__dispatchSubject(subject, smallestDateTime):
+            # Dispatch realtime subjects and those subjects with the lowest datetime, respecting the priority order.
+            toDispatch.sort()
+            for subjectIdx in toDispatch:
+                if self.__dispatchSubject(self.__subjects[subjectIdx], smallestDateTime):
                     eventsDispatched = True
+                self.__schedule(subjectIdx)
         return eof, eventsDispatched
 
     def run(self):
@@ -104,6 +146,7 @@ class Dispatcher(object):
                 subject.start()
 
             self.__startEvent.emit()
+            self.__initQueue()
 
             while not self.__stop:
                 eof, eventsDispatched = self.__dispatch()
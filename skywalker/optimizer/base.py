@@ -18,8 +18,14 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
+import csv
+import heapq
+import json
+import os
 import threading
 
+from skywalker import observer
+
 
 class Parameters(object):
     def __init__(self, *args, **kwargs):
@@ -32,9 +38,27 @@ class ParameterSource(object):
     Source for backtesting parameters. This class is thread safe.
     """
 
-    def __init__(self, params):
+    def __init__(self, params, exclude=None):
         self.__iter = iter(params)
         self.__lock = threading.Lock()
+        # Keys (see parameters_key) of parameters that should be skipped, for example because they were already run.
+        self.__exclude = set(exclude) if exclude else set()
+        try:
+            self.__total = len(params)
+        except TypeError:
+            self.__total = None
+
+    def getTotal(self):
+        """Returns an estimate of the number of parameters to run, or None if it is not known."""
+        if self.__total is None:
+            return None
+        with self.__lock:
+            return max(0, self.__total - len(self.__exclude))
+
+    def exclude(self, keys):
+        """Skips the parameters with the given keys (see parameters_key)."""
+        with self.__lock:
+            self.__exclude.update(keys)
 
     def getNext(self, count):
         """
@@ -57,6 +81,8 @@ class ParameterSource(object):
                         # Backward compatibility when parameters don't yield Parameters.
                         if not isinstance(params, Parameters):
                             params = Parameters(*params)
+                        if self.__exclude and parameters_key(params.args) in self.__exclude:
+                            continue
                         ret.append(params)
                         count -= 1
                 except StopIteration:
@@ -67,6 +93,15 @@ class ParameterSource(object):
         with self.__lock:
             return self.__iter is None
 
+    def onResult(self, result, parameters):
+        """Called with the results obtained for the parameters. Override to adapt the parameters to return."""
+        pass
+
+    def getBest(self):
+        """Returns the best result and parameters if the source picks them, or (None, None) to use the ones from the
+        result sinc."""
+        return None, None
+
 
 class ResultSinc(object):
     """
@@ -77,8 +112,13 @@ class ResultSinc(object):
         self.__lock = threading.Lock()
         self.__bestResult = None
         self.__bestParameters = None
+        self.__newResultEvent = observer.Event()
+
+    def getNewResultEvent(self):
+        """Returns the event emitted with (result, parameters) every time a result is pushed."""
+        return self.__newResultEvent
 
-    def push(self, result, parameters):
+    def push(self, result, parameters, runtime=None):
         """
         Push strategy results obtained by running the strategy with the given parameters.
 
@@ -86,13 +126,129 @@ class ResultSinc(object):
         :type result: float
         :param parameters: The parameters that yield the given result.
         :type parameters: Parameters
+        :param runtime: The number of seconds it took to run the strategy, if available.
+        :type runtime: float
         """
         with self.__lock:
             if result is not None and (self.__bestResult is None or result > self.__bestResult):
                 self.__bestResult = result
                 self.__bestParameters = parameters
+        self.__newResultEvent.emit(result, parameters)
 
     def getBest(self):
         with self.__lock:
             ret = self.__bestResult, self.__bestParameters
         return ret
+
+
+def parameters_key(args):
+    """Returns a string that identifies a set of parameter values."""
+    return json.dumps(list(args))
+
+
+class FileResultSinc(ResultSinc):
+    """
+    Sinc that appends every backtest result to a CSV file and keeps the best N results in memory.
+    This class is thread safe.
+
+    Each row holds the result, the runtime in seconds and the parameter values encoded as JSON, so parameter values
+    must be JSON serializable. Rows are flushed as they are written. If the file already exists, the results in it
+    are loaded so an interrupted optimization can be resumed by skipping the parameters in :meth:`getCompleted`.
+
+    :param path: The path to the CSV file.
+    :type path: string
+    :param topN: The number of results to keep in memory.
+    :type topN: int
+    """
+
+    def __init__(self, path, topN=10):
+        super(FileResultSinc, self).__init__()
+        assert topN > 0, "Invalid number of results to keep"
+        self.__lock = threading.Lock()
+        self.__path = path
+        self.__topN = topN
+        # Min-heap with (result, sequence number, Parameters), so the worst of the best results is at the top.
+        self.__top = []
+        self.__count = 0
+        self.__completed = set()
+
+        for result, parameters, runtime in self.getRecords():
+            self.__add(result, parameters)
+            super(FileResultSinc, self).push(result, parameters, runtime)
+
+        writeHeader = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.__file = open(path, "ab")
+        self.__writer = csv.writer(self.__file)
+        if not writeHeader:
+            # Terminate a row that was partially written, if any.
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != "\n":
+                    self.__file.write("\r\n")
+        if writeHeader:
+            self.__writer.writerow(["result", "runtime", "parameters"])
+            self.__file.flush()
+
+    def __add(self, result, parameters):
+        self.__count += 1
+        self.__completed.add(parameters_key(parameters.args))
+        if result is None:
+            return
+        item = (result, self.__count, parameters)
+        if len(self.__top) < self.__topN:
+            heapq.heappush(self.__top, item)
+        elif result > self.__top[0][0]:
+            heapq.heapreplace(self.__top, item)
+
+    def push(self, result, parameters, runtime=None):
+        with self.__lock:
+            self.__writer.writerow([
+                "" if result is None else repr(result),
+                "" if runtime is None else repr(runtime),
+                parameters_key(parameters.args)
+            ])
+            self.__file.flush()
+            self.__add(result, parameters)
+        super(FileResultSinc, self).push(result, parameters, runtime)
+
+    def getPath(self):
+        return self.__path
+
+    def getTop(self):
+        """Returns a list of (result, Parameters) tuples with the best results, sorted from best to worst."""
+        with self.__lock:
+            ret = [(result, parameters) for result, _, parameters in sorted(self.__top, reverse=True)]
+        return ret
+
+    def getCompleted(self):
+        """Returns the keys (see parameters_key) of the parameters that have results."""
+        with self.__lock:
+            ret = set(self.__completed)
+        return ret
+
+    def getCount(self):
+        """Returns the number of results pushed, including the ones loaded from the file."""
+        with self.__lock:
+            return self.__count
+
+    def getRecords(self):
+        """Reads the results from the file and returns a list of (result, Parameters, runtime) tuples."""
+        ret = []
+        if not os.path.exists(self.__path):
+            return ret
+        with open(self.__path, "rb") as f:
+            reader = csv.reader(f)
+            for row in reader:
+                # Skip the header and rows partially written if the process was killed.
+                try:
+                    result = None if row[0] == "" else float(row[0])
+                    runtime = None if row[1] == "" else float(row[1])
+                    parameters = Parameters(*json.loads(row[2]))
+                except (IndexError, ValueError):
+                    continue
+                ret.append((result, parameters, runtime))
+        return ret
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
@@ -24,7 +24,9 @@ import os
 import random
 import socket
 import threading
+import time
 
+from skywalker import barfeed
 from skywalker.optimizer import base
 from skywalker.optimizer import server
 from skywalker.optimizer import worker
@@ -32,6 +34,14 @@ from skywalker.optimizer import xmlrpcserver
 
 logger = logging.getLogger(__name__)
 
+# Chunks of parameters are sized so that each one takes about this many seconds to run.
+CHUNK_TARGET_SECONDS = 1.0
+MAX_CHUNK_SIZE = xmlrpcserver.Server.defaultBatchSize
+# Number of workers that may die while running some parameters before giving up on them.
+MAX_WORKER_FAILURES = 2
+# Seconds to wait between checks for results from the workers.
+RESULT_POLL_SECONDS = 0.01
+
 
 class ServerThread(threading.Thread):
     def __init__(self, server):
@@ -59,6 +69,207 @@ def worker_process(strategyClass, port, logLevel):
         w.getLogger().exception("Failed to run worker: %s" % (e))
 
 
+def pool_worker_process(strategyClass, barsFreq, instruments, bars, taskQueue, resultConnection, logLevel):
+    # The bars are inherited from the parent process when forking, so they are shared copy-on-write instead of being
+    # serialized for every worker.
+    # Results are sent through a pipe instead of a queue because sending is synchronous, so results that were sent
+    # are not lost if the process is killed afterwards.
+    workerLogger = logging.getLogger("worker-%s" % (os.getpid()))
+    workerLogger.setLevel(logLevel)
+    try:
+        chunk = taskQueue.get()
+        while chunk is not None:
+            chunkId, chunkParameters = chunk
+            begin = time.time()
+            results = []
+            for parameters in chunkParameters:
+                runBegin = time.time()
+                feed = barfeed.OptimizerBarFeed(barsFreq, instruments, bars)
+                workerLogger.info("Running strategy with parameters %s" % (str(parameters)))
+                result = None
+                try:
+                    strat = strategyClass(feed, *parameters)
+                    strat.run()
+                    result = strat.getResult()
+                except Exception, e:
+                    workerLogger.exception("Error running strategy with parameters %s: %s" % (str(parameters), e))
+                workerLogger.info("Result %s" % result)
+                results.append((result, parameters, time.time() - runBegin))
+            resultConnection.send((chunkId, results, time.time() - begin))
+            chunk = taskQueue.get()
+    except Exception, e:
+        workerLogger.exception("Failed to run worker: %s" % (e))
+
+
+class ChunkSizer(object):
+    """Sizes the chunks of parameters sent to the workers, based on how long each strategy run takes."""
+
+    def __init__(self, targetSeconds=CHUNK_TARGET_SECONDS, maxSize=MAX_CHUNK_SIZE):
+        self.__targetSeconds = targetSeconds
+        self.__maxSize = maxSize
+        self.__runs = 0
+        self.__seconds = 0.0
+
+    def update(self, runs, seconds):
+        self.__runs += runs
+        self.__seconds += seconds
+
+    def getSize(self):
+        # Start with single parameter chunks until there is an estimate.
+        if self.__runs == 0:
+            return 1
+        if self.__seconds <= 0:
+            return self.__maxSize
+        secondsPerRun = self.__seconds / self.__runs
+        return max(1, min(self.__maxSize, int(self.__targetSeconds / secondsPerRun)))
+
+
+class WorkerPool(object):
+    """Worker processes that run chunks of parameters.
+
+    Each worker has its own task queue, so if a worker dies the chunks that it held are known. The oldest of them is
+    the one it was running, and its parameters are sent again one at a time. The rest are sent again as they were.
+    Parameters that were running when :data:`MAX_WORKER_FAILURES` workers died get a None result.
+
+    :param strategyClass: The strategy class.
+    :param barsFreq: The bars frequency.
+    :param instruments: The instruments.
+    :param bars: The bars, shared with the workers when forking.
+    :param workerCount: The number of worker processes.
+    :param logLevel: The log level for the workers.
+    :param resultSinc: The sinc for the results.
+    :type resultSinc: :class:`skywalker.optimizer.base.ResultSinc`.
+    """
+
+    def __init__(self, strategyClass, barsFreq, instruments, bars, workerCount, logLevel, resultSinc):
+        self.__resultSinc = resultSinc
+        self.__chunkSizer = ChunkSizer()
+        self.__workers = []
+        self.__taskQueues = []
+        self.__resultConnections = []
+        for i in range(workerCount):
+            taskQueue = multiprocessing.Queue()
+            resultConnection, workerConnection = multiprocessing.Pipe(duplex=False)
+            self.__workers.append(multiprocessing.Process(
+                target=pool_worker_process,
+                args=(strategyClass, barsFreq, instruments, bars, taskQueue, workerConnection, logLevel))
+            )
+            self.__taskQueues.append(taskQueue)
+            self.__resultConnections.append((resultConnection, workerConnection))
+        self.__aliveWorkers = set()
+        # Chunk id -> (worker index, parameters, worker failures) for the chunks sent and not finished yet.
+        self.__pending = {}
+        # Chunk ids sent to each worker, oldest first.
+        self.__workerChunks = [[] for i in range(workerCount)]
+        self.__retryChunks = []
+        self.__nextChunkId = 0
+
+    def start(self):
+        for index, process in enumerate(self.__workers):
+            process.start()
+            # Only the worker writes to the pipe.
+            self.__resultConnections[index][1].close()
+            self.__resultConnections[index] = self.__resultConnections[index][0]
+            self.__aliveWorkers.add(index)
+
+    def getAliveCount(self):
+        return len(self.__aliveWorkers)
+
+    def getPendingCount(self):
+        return len(self.__pending)
+
+    def getChunkSize(self):
+        return self.__chunkSizer.getSize()
+
+    def send(self, parameters, failures=0):
+        """Sends a chunk of parameters to the worker with fewer chunks in flight."""
+        index = min(self.__aliveWorkers, key=lambda i: (len(self.__workerChunks[i]), i))
+        chunkId = self.__nextChunkId
+        self.__nextChunkId += 1
+        self.__pending[chunkId] = (index, parameters, failures)
+        self.__workerChunks[index].append(chunkId)
+        self.__taskQueues[index].put((chunkId, parameters))
+
+    def sendRetries(self):
+        while len(self.__retryChunks) and len(self.__aliveWorkers):
+            self.send(*self.__retryChunks.pop(0))
+
+    def __pushResults(self, chunkId, results, seconds):
+        index = self.__pending.pop(chunkId)[0]
+        self.__workerChunks[index].remove(chunkId)
+        self.__chunkSizer.update(len(results), seconds)
+        for result, parameters, runtime in results:
+            self.__resultSinc.push(result, base.Parameters(*parameters), runtime)
+
+    def __receive(self, index):
+        ret = False
+        connection = self.__resultConnections[index]
+        try:
+            while connection.poll():
+                self.__pushResults(*connection.recv())
+                ret = True
+        except EOFError:
+            pass
+        return ret
+
+    def __onWorkerDied(self, index, exitCode):
+        # Take the results it sent before dying, so the chunks left are the ones it didn't finish.
+        self.__receive(index)
+        self.__aliveWorkers.remove(index)
+        lostChunks = self.__workerChunks[index]
+        self.__workerChunks[index] = []
+        logger.error("Worker %d exited with code %s holding %d chunks" % (index, exitCode, len(lostChunks)))
+
+        for i, chunkId in enumerate(lostChunks):
+            parameters, failures = self.__pending.pop(chunkId)[1:]
+            if i > 0:
+                self.__retryChunks.append((parameters, failures))
+                continue
+            failures += 1
+            if failures >= MAX_WORKER_FAILURES:
+                logger.error("Giving up on %s after %d workers died running them" % (str(parameters), failures))
+                for chunkParameters in parameters:
+                    self.__resultSinc.push(None, base.Parameters(*chunkParameters))
+            else:
+                # Send them one at a time, so that only the parameters that kill workers are given up.
+                for chunkParameters in parameters:
+                    self.__retryChunks.append(([chunkParameters], failures))
+
+    def checkWorkers(self):
+        # Workers only exit after being told to, so one that exited before that died while running.
+        for index in sorted(self.__aliveWorkers):
+            exitCode = self.__workers[index].exitcode
+            if exitCode is not None:
+                self.__onWorkerDied(index, exitCode)
+
+    def receive(self):
+        """Pushes the results sent by the workers to the result sinc, waiting a bit if there are none yet."""
+        received = False
+        for index in sorted(self.__aliveWorkers):
+            received = self.__receive(index) or received
+        if not received:
+            time.sleep(RESULT_POLL_SECONDS)
+
+    def stop(self):
+        """Tells the workers there is nothing else to do and waits for them."""
+        for taskQueue in self.__taskQueues:
+            taskQueue.put(None)
+        for process in self.__workers:
+            wait_process(process)
+
+    def terminate(self):
+        for process in self.__workers:
+            if process.is_alive():
+                process.terminate()
+
+
+def load_bars(barFeed):
+    loadedBars = []
+    for dateTime, bars in barFeed:
+        loadedBars.append(bars)
+    return barFeed.getRegisteredInstruments(), loadedBars
+
+
 def find_port():
     while True:
         ret = random.randint(1025, 65536)
@@ -78,17 +289,88 @@ def wait_process(p):
         p.join(timeout)
 
 
-def run(strategyClass, barFeed, strategyParameters, workerCount=None, logLevel=logging.ERROR):
+def run(strategyClass, barFeed, strategyParameters, workerCount=None, logLevel=logging.ERROR, resultSinc=None):
     """Executes many instances of a strategy in parallel and finds the parameters that yield the best results.
 
+    Bars are loaded once and shared with the worker processes, and parameters are sent to them through queues in
+    chunks sized according to how long each strategy run takes.
+
+    :param strategyClass: The strategy class.
+    :param barFeed: The bar feed to use to backtest the strategy.
+    :type barFeed: :class:`pyalgotrade.barfeed.BarFeed`.
+    :param strategyParameters: The set of parameters to use for backtesting. An iterable object where **each element is
+        a tuple that holds parameter values**, or a :class:`skywalker.optimizer.base.ParameterSource` such as the
+        search drivers in :mod:`skywalker.optimizer.search`.
+    :param workerCount: The number of strategies to run in parallel. If None then as many workers as CPUs are used.
+    :type workerCount: int.
+    :param logLevel: The log level. Defaults to **logging.ERROR**.
+    :param resultSinc: The sinc for the results. If None, a :class:`skywalker.optimizer.base.ResultSinc` is used.
+        If a :class:`skywalker.optimizer.base.FileResultSinc` is used, parameters that already have results in it are
+        skipped and the best results are included in the returned value.
+    :rtype: A :class:`Results` instance with the best results found.
+    """
+
+    assert (workerCount is None or workerCount > 0)
+    if workerCount is None:
+        workerCount = multiprocessing.cpu_count()
+
+    ret = None
+    if resultSinc is None:
+        resultSinc = base.ResultSinc()
+    paramSource = server.build_parameter_source(strategyParameters, resultSinc)
+
+    logger.info("Loading bars")
+    instruments, bars = load_bars(barFeed)
+    barsFreq = barFeed.getFrequency()
+
+    pool = WorkerPool(strategyClass, barsFreq, instruments, bars, workerCount, logLevel, resultSinc)
+    try:
+        logger.info("Executing workers")
+        pool.start()
+
+        while True:
+            pool.checkWorkers()
+            if pool.getAliveCount() == 0:
+                logger.error("All workers finished with %d chunks pending" % (pool.getPendingCount()))
+                break
+
+            pool.sendRetries()
+            # Keep a couple of chunks per worker in flight so workers don't wait for the next one.
+            while pool.getPendingCount() < pool.getAliveCount() * 2 and not paramSource.eof():
+                params = paramSource.getNext(pool.getChunkSize())
+                # The source may be waiting for results to decide what to run next.
+                if not len(params):
+                    break
+                pool.send(map(lambda p: p.args, params))
+            if pool.getPendingCount() == 0:
+                break
+
+            pool.receive()
+
+        pool.stop()
+        logger.info("All workers finished")
+    finally:
+        pool.terminate()
+
+        ret = server.build_results(resultSinc, paramSource)
+
+    return ret
+
+
+def run_xmlrpc(strategyClass, barFeed, strategyParameters, workerCount=None, logLevel=logging.ERROR, resultSinc=None):
+    """Executes many instances of a strategy in parallel using a local XML-RPC server to distribute the bars and
+    parameters, and finds the parameters that yield the best results.
+
     :param strategyClass: The strategy class.
     :param barFeed: The bar feed to use to backtest the strategy.
     :type barFeed: :class:`pyalgotrade.barfeed.BarFeed`.
     :param strategyParameters: The set of parameters to use for backtesting. An iterable object where **each element is
-        a tuple that holds parameter values**.
+        a tuple that holds parameter values**, or a :class:`skywalker.optimizer.base.ParameterSource` such as the
+        search drivers in :mod:`skywalker.optimizer.search`.
     :param workerCount: The number of strategies to run in parallel. If None then as many workers as CPUs are used.
     :type workerCount: int.
     :param logLevel: The log level. Defaults to **logging.ERROR**.
+    :param resultSinc: The sinc for the results. See :func:`run`.
     :rtype: A :class:`Results` instance with the best results found.
     """
 
@@ -104,8 +386,9 @@ def run(strategyClass, barFeed, strategyParameters, workerCount=None, logLevel=l
 
     # Build and start the server thread before the worker processes.
     # We'll manually stop the server once workers have finished.
-    paramSource = base.ParameterSource(strategyParameters)
-    resultSinc = base.ResultSinc()
+    if resultSinc is None:
+        resultSinc = base.ResultSinc()
+    paramSource = server.build_parameter_source(strategyParameters, resultSinc)
     srv = xmlrpcserver.Server(paramSource, resultSinc, barFeed, "localhost", port, False)
     serverThread = ServerThread(srv)
     serverThread.start()
@@ -134,8 +417,6 @@ def run(strategyClass, barFeed, strategyParameters, workerCount=None, logLevel=l
         srv.stop()
         serverThread.join()
 
-        bestResult, bestParameters = resultSinc.getBest()
-        if bestResult is not None:
-            ret = server.Results(bestParameters.args, bestResult)
+        ret = server.build_results(resultSinc, paramSource)
 
     return ret
@@ -0,0 +1,367 @@
+import math
+import random
+import threading
+
+import numpy as np
+
+from skywalker.optimizer import base
+
+
+def _args_key(args):
+    """Returns a key that identifies a tuple of parameter values, like a budget date, for the search drivers.
+    Unlike :func:`skywalker.optimizer.base.parameters_key`, values don't have to be JSON serializable."""
+    ret = tuple(args)
+    try:
+        hash(ret)
+    except TypeError:
+        ret = repr(ret)
+    return ret
+
+
+class ParameterSpace(object):
+    """The set of parameter values to search.
+
+    :param values: A sequence with the candidate values for each parameter, in the same order the strategy takes
+        them. For example [range(5, 50), [0.01, 0.02, 0.05]].
+    """
+
+    def __init__(self, values):
+        self.__values = [list(parameterValues) for parameterValues in values]
+        assert len(self.__values) > 0, "No parameters"
+        for parameterValues in self.__values:
+            assert len(parameterValues) > 0, "No values for parameter"
+        self.__sizes = [len(parameterValues) for parameterValues in self.__values]
+
+    def getSize(self):
+        """Returns the number of parameter combinations."""
+        ret = 1
+        for size in self.__sizes:
+            ret *= size
+        return ret
+
+    def getDimensions(self):
+        return len(self.__values)
+
+    def getIndices(self, position):
+        """Returns the indices of the values for the combination at a given position."""
+        ret = []
+        for size in reversed(self.__sizes):
+            ret.append(position % size)
+            position //= size
+        return tuple(reversed(ret))
+
+    def getArgs(self, indices):
+        """Returns the parameter values for a tuple of indices."""
+        return tuple(self.__values[i][index] for i, index in enumerate(indices))
+
+    def normalize(self, indices):
+        """Maps a tuple of indices into the [0, 1] hypercube."""
+        return np.array([
+            index / float(size - 1) if size > 1 else 0.5 for index, size in zip(indices, self.__sizes)
+        ])
+
+    def sample(self, rand, count, exclude=None):
+        """Returns up to count distinct tuples of indices, picked at random and not in exclude."""
+        size = self.getSize()
+        exclude = exclude if exclude is not None else set()
+        count = min(count, size - len(exclude))
+        ret = []
+        picked = set()
+        # Small spaces are sampled without replacement from the remaining positions.
+        if size <= count * 4:
+            positions = [position for position in xrange(size) if self.getIndices(position) not in exclude]
+            for position in rand.sample(positions, count):
+                ret.append(self.getIndices(position))
+            return ret
+        while len(ret) < count:
+            indices = self.getIndices(rand.randrange(size))
+            if indices not in exclude and indices not in picked:
+                picked.add(indices)
+                ret.append(indices)
+        return ret
+
+
+class SearchDriver(base.ParameterSource):
+    """Base class for parameter sources that decide which parameters to try next based on the results obtained.
+
+    Results reach the driver through :meth:`onResult` once it is subscribed to a result sinc. If the driver has to
+    wait for results before generating more parameters, :meth:`getNext` returns an empty list while :meth:`eof`
+    returns False.
+
+    Drivers don't skip parameters passed to :meth:`exclude`, like the ones in a server checkpoint, because they need
+    the result of every run they generate to decide what to run next. Resuming a search runs it from the start.
+    """
+
+    def __init__(self):
+        super(SearchDriver, self).__init__([])
+        self.__lock = threading.Lock()
+        self.__pending = set()
+        self.__eof = False
+
+    def getLock(self):
+        return self.__lock
+
+    def getPendingCount(self):
+        return len(self.__pending)
+
+    def exclude(self, keys):
+        # See the class docstring.
+        pass
+
+    def getNext(self, count):
+        assert count > 0, "Invalid number of parameters"
+
+        with self.__lock:
+            ret = []
+            if not self.__eof:
+                ret = self.nextArgs(count)
+                for args in ret:
+                    self.__pending.add(_args_key(args))
+                if not len(ret) and not len(self.__pending) and self.done():
+                    self.__eof = True
+            return [base.Parameters(*args) for args in ret]
+
+    def eof(self):
+        with self.__lock:
+            if not self.__eof and not len(self.__pending) and self.done():
+                self.__eof = True
+            return self.__eof
+
+    def onResult(self, result, parameters):
+        with self.__lock:
+            key = _args_key(parameters.args)
+            if key in self.__pending:
+                self.__pending.remove(key)
+                self.addResult(result, parameters.args)
+
+    # Returns up to count parameter tuples to run. Called with the lock held.
+    def nextArgs(self, count):
+        raise NotImplementedError()
+
+    # Processes a result. Called with the lock held.
+    def addResult(self, result, args):
+        raise NotImplementedError()
+
+    # Returns True if no more parameters will be generated. Called with the lock held.
+    def done(self):
+        raise NotImplementedError()
+
+
+class RandomSearch(SearchDriver):
+    """Tries a number of distinct parameter combinations picked at random.
+
+    :param space: The parameters to search.
+    :type space: :class:`ParameterSpace`.
+    :param count: The number of combinations to try.
+    :type count: int.
+    :param seed: The seed for the random number generator.
+    """
+
+    def __init__(self, space, count, seed=None):
+        super(RandomSearch, self).__init__()
+        self.__space = space
+        self.__count = min(count, space.getSize())
+        self.__random = random.Random(seed)
+        self.__tried = set()
+
+    def getTotal(self):
+        return self.__count
+
+    def nextArgs(self, count):
+        count = min(count, self.__count - len(self.__tried))
+        ret = []
+        if count > 0:
+            for indices in self.__space.sample(self.__random, count, self.__tried):
+                self.__tried.add(indices)
+                ret.append(self.__space.getArgs(indices))
+        return ret
+
+    def addResult(self, result, args):
+        pass
+
+    def done(self):
+        return len(self.__tried) >= self.__count
+
+
+class SuccessiveHalving(SearchDriver):
+    """Runs many combinations on a small budget, and only the best ones on larger budgets.
+
+    The budget is passed to the strategy as an extra, last, parameter. It can be anything the strategy understands,
+    for example the number of days to backtest or the first date to use. Every combination in a rung is run with
+    the same budget, and the best 1/eta of them move on to the next rung.
+
+    :param space: The parameters to search.
+    :type space: :class:`ParameterSpace`.
+    :param budgets: The budget for each rung, from the smallest to the full one.
+    :param count: The number of combinations, picked at random, to run in the first rung.
+    :type count: int.
+    :param eta: The reduction factor between rungs.
+    :type eta: int.
+    :param seed: The seed for the random number generator.
+    """
+
+    def __init__(self, space, budgets, count, eta=3, seed=None):
+        super(SuccessiveHalving, self).__init__()
+        assert len(budgets) > 0, "No budgets"
+        assert eta > 1, "Invalid reduction factor"
+        self.__budgets = list(budgets)
+        self.__eta = eta
+        self.__rung = 0
+        # Parameter values (without the budget) to run in the current rung, and the results for it.
+        self.__toRun = [space.getArgs(indices) for indices in space.sample(random.Random(seed), count)]
+        self.__rungSize = len(self.__toRun)
+        self.__rungResults = []
+        self.__bestResult = None
+        self.__bestArgs = None
+
+    def getTotal(self):
+        ret = 0
+        size = self.__rungSize
+        for i in xrange(self.__rung, len(self.__budgets)):
+            ret += size
+            size = max(1, size // self.__eta)
+        return ret
+
+    def getRung(self):
+        return self.__rung
+
+    def nextArgs(self, count):
+        ret = []
+        budget = self.__budgets[self.__rung]
+        while len(ret) < count and len(self.__toRun):
+            ret.append(self.__toRun.pop() + (budget,))
+        return ret
+
+    def addResult(self, result, args):
+        if result is not None:
+            self.__rungResults.append((result, args[:-1]))
+            if self.__rung == len(self.__budgets) - 1 and (self.__bestResult is None or result > self.__bestResult):
+                self.__bestResult = result
+                self.__bestArgs = args
+        if not len(self.__toRun) and not self.getPendingCount():
+            self.__promote()
+
+    def __promote(self):
+        if self.__rung == len(self.__budgets) - 1:
+            return
+        self.__rung += 1
+        self.__rungResults.sort(key=lambda item: item[0], reverse=True)
+        keep = max(1, self.__rungSize // self.__eta)
+        self.__toRun = [args for result, args in self.__rungResults[:keep]]
+        self.__rungSize = len(self.__toRun)
+        self.__rungResults = []
+        # Every run in the rung failed, so there is nothing to promote.
+        if not len(self.__toRun):
+            self.__rung = len(self.__budgets) - 1
+
+    def done(self):
+        return self.__rung == len(self.__budgets) - 1 and not len(self.__toRun)
+
+    def getBest(self):
+        """Returns the best result and parameters obtained with the full budget."""
+        with self.getLock():
+            if self.__bestArgs is None:
+                return None, None
+            return self.__bestResult, base.Parameters(*self.__bestArgs)
+
+
+class SurrogateSearch(SearchDriver):
+    """Picks parameters using a gaussian process fitted to the results obtained so far.
+
+    After a first batch of random combinations, each new combination is the one with the highest upper confidence
+    bound among a random sample of the ones not tried yet.
+
+    :param space: The parameters to search.
+    :type space: :class:`ParameterSpace`.
+    :param count: The number of combinations to try.
+    :type count: int.
+    :param initialCount: The number of random combinations to try before using the model.
+    :type initialCount: int.
+    :param candidates: The number of combinations to evaluate with the model on every step.
+    :type candidates: int.
+    :param kappa: How much to favor uncertain combinations over ones with a good predicted result.
+    :type kappa: float.
+    :param lengthScale: The length scale of the kernel, in the normalized [0, 1] space.
+    :type lengthScale: float.
+    :param seed: The seed for the random number generator.
+    """
+
+    def __init__(self, space, count, initialCount=20, candidates=1000, kappa=2.0, lengthScale=0.2, seed=None):
+        super(SurrogateSearch, self).__init__()
+        self.__space = space
+        self.__count = min(count, space.getSize())
+        self.__initialCount = min(initialCount, self.__count)
+        self.__candidates = candidates
+        self.__kappa = kappa
+        self.__lengthScale = lengthScale
+        self.__random = random.Random(seed)
+        self.__tried = set()
+        self.__indices = {}
+        self.__x = []
+        self.__y = []
+
+    def getTotal(self):
+        return self.__count
+
+    def __kernel(self, a, b):
+        sqDist = np.sum(a ** 2, 1).reshape(-1, 1) + np.sum(b ** 2, 1) - 2 * np.dot(a, b.T)
+        return np.exp(-0.5 * np.maximum(sqDist, 0) / self.__lengthScale ** 2)
+
+    def __predict(self, candidates):
+        x = np.array(self.__x)
+        y = np.array(self.__y)
+        mean = y.mean()
+        std = y.std()
+        if std == 0:
+            std = 1
+        y = (y - mean) / std
+
+        k = self.__kernel(x, x) + np.eye(len(x)) * 1e-6
+        chol = np.linalg.cholesky(k)
+        alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, y))
+        kStar = self.__kernel(candidates, x)
+        mu = np.dot(kStar, alpha)
+        v = np.linalg.solve(chol, kStar.T)
+        sigma = np.sqrt(np.maximum(1 - np.sum(v ** 2, 0), 0))
+        return mu, sigma
+
+    def __pick(self, count):
+        # Wait for the results of the random combinations before fitting the model.
+        if len(self.__tried) < self.__initialCount:
+            return self.__space.sample(self.__random, min(count, self.__initialCount - len(self.__tried)), self.__tried)
+        if len(self.__y) < 2:
+            # Keep picking at random if there are not enough successful runs to fit the model.
+            if self.getPendingCount():
+                return []
+            return self.__space.sample(self.__random, 1, self.__tried)
+
+        candidates = self.__space.sample(self.__random, self.__candidates, self.__tried)
+        if not len(candidates):
+            return []
+        mu, sigma = self.__predict(np.array([self.__space.normalize(indices) for indices in candidates]))
+        ucb = mu + self.__kappa * sigma
+        order = np.argsort(-ucb)
+        # Only a few combinations per step, so the model sees the results before picking more.
+        count = min(count, max(1, int(math.ceil(self.__initialCount / 4.0))))
+        return [candidates[i] for i in order[:count]]
+
+    def nextArgs(self, count):
+        count = min(count, self.__count - len(self.__tried))
+        ret = []
+        if count > 0:
+            for indices in self.__pick(count):
+                self.__tried.add(indices)
+                args = self.__space.getArgs(indices)
+                self.__indices[_args_key(args)] = indices
+                ret.append(args)
+        return ret
+
+    def addResult(self, result, args):
+        indices = self.__indices.pop(_args_key(args), None)
+        # Failed runs are not used to fit the model.
+        if indices is not None and result is not None:
+            self.__x.append(self.__space.normalize(indices))
+            self.__y.append(float(result))
+
+    def done(self):
+        return len(self.__tried) >= self.__count or len(self.__tried) >= self.__space.getSize()
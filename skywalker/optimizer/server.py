@@ -28,9 +28,10 @@ logger = skywalker.logger.getLogger(__name__)
 class Results(object):
     """The results of the strategy executions."""
 
-    def __init__(self, parameters, result):
+    def __init__(self, parameters, result, topResults=None):
         self.__parameters = parameters
         self.__result = result
+        self.__topResults = topResults
 
     def getParameters(self):
         """Returns a sequence of parameter values."""
@@ -40,32 +41,78 @@ class Results(object):
         """Returns the result for a given set of parameters."""
         return self.__result
 
+    def getTopResults(self):
+        """Returns a list of (parameter values, result) tuples with the best results, sorted from best to worst,
+        or None if the result sinc used doesn't keep them."""
+        return self.__topResults
 
-def serve(barFeed, strategyParameters, address, port):
+
+def build_results(resultSinc, paramSource=None):
+    """Builds a :class:`Results` instance out of a result sinc, or returns None if there are no results."""
+    ret = None
+    bestResult, bestParameters = None, None
+    if paramSource is not None:
+        bestResult, bestParameters = paramSource.getBest()
+    if bestResult is None:
+        bestResult, bestParameters = resultSinc.getBest()
+    if bestResult is not None:
+        topResults = None
+        if isinstance(resultSinc, base.FileResultSinc):
+            topResults = [(parameters.args, result) for result, parameters in resultSinc.getTop()]
+        ret = Results(bestParameters.args, bestResult, topResults)
+    return ret
+
+
+def build_parameter_source(strategyParameters, resultSinc):
+    # Parameter sources, like the ones in skywalker.optimizer.search, get the results to decide what to run next.
+    if isinstance(strategyParameters, base.ParameterSource):
+        ret = strategyParameters
+    else:
+        # Skip the parameters that already have results when resuming an optimization.
+        exclude = None
+        if isinstance(resultSinc, base.FileResultSinc):
+            exclude = resultSinc.getCompleted()
+        ret = base.ParameterSource(strategyParameters, exclude)
+    resultSinc.getNewResultEvent().subscribe(ret.onResult)
+    return ret
+
+
+def serve(barFeed, strategyParameters, address, port, resultSinc=None, checkpointPath=None, leaseTimeout=None):
     """Executes a server that will provide bars and strategy parameters for workers to use.
 
     :param barFeed: The bar feed that each worker will use to backtest the strategy.
     :type barFeed: :class:`pyalgotrade.barfeed.BarFeed`.
-    :param strategyParameters: The set of parameters to use for backtesting. An iterable object where **each element is a tuple that holds parameter values**.
+    :param strategyParameters: The set of parameters to use for backtesting. An iterable object where **each element is a tuple that holds parameter values**,
+        or a :class:`skywalker.optimizer.base.ParameterSource` such as the search drivers in :mod:`skywalker.optimizer.search`.
     :param address: The address to listen for incoming worker connections.
     :type address: string.
     :param port: The port to listen for incoming worker connections.
     :type port: int.
+    :param resultSinc: The sinc for the results. If None, a :class:`skywalker.optimizer.base.ResultSinc` is used.
+        If a :class:`skywalker.optimizer.base.FileResultSinc` is used, parameters that already have results in it are
+        skipped and the best results are included in the returned value.
+    :param checkpointPath: If not None, the keys of the parameters already processed are saved to this file from time to
+        time, and parameters found in it are skipped when the server is restarted.
+    :type checkpointPath: string.
+    :param leaseTimeout: Seconds without heartbeats after which a job is given to another worker. If None,
+        :attr:`skywalker.optimizer.xmlrpcserver.Server.defaultLeaseTimeout` is used.
+    :type leaseTimeout: int.
     :rtype: A :class:`Results` instance with the best results found or None if no results were obtained.
     """
 
-    paramSource = base.ParameterSource(strategyParameters)
-    resultSinc = base.ResultSinc()
-    s = xmlrpcserver.Server(paramSource, resultSinc, barFeed, address, port)
+    if resultSinc is None:
+        resultSinc = base.ResultSinc()
+    paramSource = build_parameter_source(strategyParameters, resultSinc)
+    s = xmlrpcserver.Server(
+        paramSource, resultSinc, barFeed, address, port, checkpointPath=checkpointPath, leaseTimeout=leaseTimeout
+    )
     logger.info("Starting server")
     s.serve()
     logger.info("Server finished")
 
-    ret = None
-    bestResult, bestParameters = resultSinc.getBest()
-    if bestResult is not None:
-        logger.info("Best final result %s with parameters %s" % (bestResult, bestParameters.args))
-        ret = Results(bestParameters.args, bestResult)
+    ret = build_results(resultSinc, paramSource)
+    if ret is not None:
+        logger.info("Best final result %s with parameters %s" % (ret.getResult(), ret.getParameters()))
     else:
         logger.error("No results. All jobs failed or no jobs were processed.")
     return ret
@@ -22,6 +22,7 @@ import multiprocessing
 import pickle
 import random
 import socket
+import threading
 import time
 
 import xmlrpclib
@@ -47,10 +48,50 @@ def call_and_retry_on_network_error(function, retryCount, *args, **kwargs):
     return ret
 
 
+class HeartbeatThread(threading.Thread):
+    """Renews the lease for a job while it is processed, including while a strategy is running.
+
+    :param worker: The worker processing the job.
+    :param jobId: The job id.
+    :param records: The list where the job results are appended, to report how many were processed.
+    """
+
+    def __init__(self, worker, jobId, records):
+        super(HeartbeatThread, self).__init__()
+        self.daemon = True
+        self.__worker = worker
+        self.__jobId = jobId
+        self.__records = records
+        self.__stopEvent = threading.Event()
+        self.__expired = False
+
+    def expired(self):
+        """Returns True if the server assigned the job to another worker."""
+        return self.__expired
+
+    def run(self):
+        while not self.__stopEvent.wait(self.__worker.heartbeatInterval):
+            try:
+                if not self.__worker.heartbeat(self.__jobId, len(self.__records)):
+                    self.__expired = True
+                    break
+            except Exception, e:
+                self.__worker.getLogger().error("Failed to send heartbeat for job %s: %s" % (self.__jobId, e))
+
+    def stop(self):
+        self.__stopEvent.set()
+        self.join()
+
+
 class Worker(object):
+    # Seconds between heartbeats sent while processing a job. Must be lower than the server lease timeout.
+    heartbeatInterval = 30
+
     def __init__(self, address, port, workerName=None):
         url = "http://%s:%s/PyAlgoTradeRPC" % (address, port)
         self.__server = xmlrpclib.ServerProxy(url, allow_none=True)
+        # Heartbeats are sent from another thread, and proxies can't be shared between threads.
+        self.__heartbeatServer = xmlrpclib.ServerProxy(url, allow_none=True)
         self.__logger = skywalker.logger.getLogger(workerName)
         if workerName is None:
             self.__workerName = socket.gethostname()
@@ -71,10 +112,17 @@ class Worker(object):
         return ret
 
     def getNextJob(self):
-        ret = call_and_retry_on_network_error(self.__server.getNextJob, 10)
+        workerName = pickle.dumps(self.__workerName)
+        ret = call_and_retry_on_network_error(self.__server.getNextJob, 10, workerName)
         ret = pickle.loads(ret)
         return ret
 
+    def heartbeat(self, jobId, processed):
+        """Renews the lease for a job. Returns False if the server assigned the job to another worker."""
+        jobId = pickle.dumps(jobId)
+        workerName = pickle.dumps(self.__workerName)
+        return call_and_retry_on_network_error(self.__heartbeatServer.heartbeat, 10, jobId, processed, workerName)
+
     def pushJobResults(self, jobId, result, parameters):
         jobId = pickle.dumps(jobId)
         result = pickle.dumps(result)
@@ -82,11 +130,32 @@ class Worker(object):
         workerName = pickle.dumps(self.__workerName)
         call_and_retry_on_network_error(self.__server.pushJobResults, 10, jobId, result, parameters, workerName)
 
+    def pushJobRecords(self, jobId, records):
+        jobId = pickle.dumps(jobId)
+        records = pickle.dumps(records)
+        workerName = pickle.dumps(self.__workerName)
+        call_and_retry_on_network_error(self.__server.pushJobRecords, 10, jobId, records, workerName)
+
     def __processJob(self, job, barsFreq, instruments, bars):
-        bestResult = None
+        # (result, parameters, runtime) for every set of parameters in the job.
+        records = []
+        heartbeatThread = HeartbeatThread(self, job.getId(), records)
+        heartbeatThread.start()
+        try:
+            self.__runJob(job, barsFreq, instruments, bars, records, heartbeatThread)
+        finally:
+            heartbeatThread.stop()
+
+        if heartbeatThread.expired():
+            self.getLogger().warning("Job %s lease expired. Dropping it." % (job.getId()))
+            return
+        assert (len(records) > 0)
+        self.pushJobRecords(job.getId(), records)
+
+    def __runJob(self, job, barsFreq, instruments, bars, records, heartbeatThread):
         parameters = job.getNextParameters()
-        bestParams = parameters
-        while parameters is not None:
+        while parameters is not None and not heartbeatThread.expired():
+            begin = time.time()
             # Wrap the bars into a feed.
             feed = barfeed.OptimizerBarFeed(barsFreq, instruments, bars)
             # Run the strategy.
@@ -97,15 +166,10 @@ class Worker(object):
             except Exception, e:
                 self.getLogger().exception("Error running strategy with parameters %s: %s" % (str(parameters), e))
             self.getLogger().info("Result %s" % result)
-            if bestResult is None or result > bestResult:
-                bestResult = result
-                bestParams = parameters
+            records.append((result, parameters, time.time() - begin))
             # Run with the next set of parameters.
             parameters = job.getNextParameters()
 
-        assert (bestParams is not None)
-        self.pushJobResults(job.getId(), bestResult, bestParams)
-
     # Run the strategy and return the result.
     def runStrategy(self, feed, parameters):
         raise Exception("Not implemented")
@@ -120,7 +184,10 @@ class Worker(object):
             # Process jobs
             job = self.getNextJob()
             while job is not None:
-                self.__processJob(job, barsFreq, instruments, bars)
+                if job.isEmpty():
+                    time.sleep(1)
+                else:
+                    self.__processJob(job, barsFreq, instruments, bars)
                 job = self.getNextJob()
             self.getLogger().info("Finished running")
         except Exception, e:
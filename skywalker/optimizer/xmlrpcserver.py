@@ -18,6 +18,9 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
+import itertools
+import json
+import os
 import pickle
 import threading
 import time
@@ -42,15 +45,24 @@ class AutoStopThread(threading.Thread):
 
 
 class Job(object):
+    # Ids are never reused, so results for an expired job can't be taken as results for a new one.
+    nextId = itertools.count(1)
+
     def __init__(self, strategyParameters):
         self.__strategyParameters = strategyParameters
         self.__bestResult = None
         self.__bestParameters = None
-        self.__id = id(self)
+        self.__id = next(Job.nextId)
 
     def getId(self):
         return self.__id
 
+    def getParameters(self):
+        return self.__strategyParameters
+
+    def isEmpty(self):
+        return len(self.__strategyParameters) == 0
+
     def getNextParameters(self):
         ret = None
         if len(self.__strategyParameters):
@@ -63,10 +75,68 @@ class RequestHandler(SimpleXMLRPCServer.SimpleXMLRPCRequestHandler):
     rpc_paths = ('/PyAlgoTradeRPC',)
 
 
+class JobLease(object):
+    """A job handed to a worker. The lease is renewed with every heartbeat, and the job is requeued if it expires."""
+
+    def __init__(self, job, workerName, timeout):
+        self.__job = job
+        self.__workerName = workerName
+        self.__timeout = timeout
+        self.__processed = 0
+        self.renew(0)
+
+    def getJob(self):
+        return self.__job
+
+    def getWorkerName(self):
+        return self.__workerName
+
+    def getProcessed(self):
+        return self.__processed
+
+    def renew(self, processed):
+        self.__processed = processed
+        self.__expiration = time.time() + self.__timeout
+
+    def expired(self, now):
+        return now > self.__expiration
+
+
+class Progress(object):
+    """Keeps track of the number of parameter sets processed, to report throughput and ETA."""
+
+    def __init__(self, total):
+        self.__total = total
+        self.__begin = time.time()
+        self.__done = 0
+
+    def add(self, count):
+        self.__done += count
+
+    def getDone(self):
+        return self.__done
+
+    def getReport(self, inProgress=0):
+        elapsed = time.time() - self.__begin
+        done = self.__done + inProgress
+        throughput = done / elapsed if elapsed > 0 else 0
+        ret = "%d parameter sets done in %d seconds (%.2f/s)" % (done, elapsed, throughput)
+        if self.__total is not None and throughput > 0:
+            ret += ". %d pending. ETA %d seconds" % (
+                self.__total - done, max(0, self.__total - done) / throughput
+            )
+        return ret
+
+
 class Server(SimpleXMLRPCServer.SimpleXMLRPCServer):
     defaultBatchSize = 200
+    # Seconds without heartbeats after which a job is given to another worker.
+    defaultLeaseTimeout = 300
+    checkpointInterval = 60
+    reportInterval = 60
 
-    def __init__(self, paramSource, resultSinc, barFeed, address, port, autoStop=True):
+    def __init__(self, paramSource, resultSinc, barFeed, address, port, autoStop=True, checkpointPath=None,
+                 leaseTimeout=None):
         SimpleXMLRPCServer.SimpleXMLRPCServer.__init__(self, (address, port), requestHandler=RequestHandler,
                                                        logRequests=False, allow_none=True)
         # super(Server, self).__init__((address, port), requestHandler=RequestHandler, logRequests=False, allow_none=True)
@@ -76,10 +146,26 @@ class Server(SimpleXMLRPCServer.SimpleXMLRPCServer):
         self.__barFeed = barFeed
         self.__instrumentsAndBars = None  # Pickle'd instruments and bars for faster retrieval.
         self.__barsFreq = None
+        # Job id -> JobLease
         self.__activeJobs = {}
         self.__activeJobsLock = threading.Lock()
+        # Parameters from expired jobs that have to be handed out again.
+        self.__requeued = []
         self.__forcedStop = False
         self.__bestResult = None
+        self.__leaseTimeout = leaseTimeout if leaseTimeout is not None else self.defaultLeaseTimeout
+        self.__lastReport = time.time()
+
+        # Checkpoints hold the keys of the parameters already processed, so a restarted server skips them.
+        self.__checkpointPath = checkpointPath
+        self.__completed = set()
+        self.__lastCheckpoint = time.time()
+        if checkpointPath is not None and os.path.exists(checkpointPath):
+            with open(checkpointPath) as f:
+                self.__completed = set(json.load(f))
+            logger.info("Skipping %d parameter sets from checkpoint" % (len(self.__completed)))
+            paramSource.exclude(self.__completed)
+        self.__progress = Progress(paramSource.getTotal())
         if autoStop:
             self.__autoStopThread = AutoStopThread(self)
         else:
@@ -90,6 +176,8 @@ class Server(SimpleXMLRPCServer.SimpleXMLRPCServer):
         self.register_function(self.getBarsFrequency, 'getBarsFrequency')
         self.register_function(self.getNextJob, 'getNextJob')
         self.register_function(self.pushJobResults, 'pushJobResults')
+        self.register_function(self.pushJobRecords, 'pushJobRecords')
+        self.register_function(self.heartbeat, 'heartbeat')
 
     def getInstrumentsAndBars(self):
         return self.__instrumentsAndBars
@@ -97,29 +185,90 @@ class Server(SimpleXMLRPCServer.SimpleXMLRPCServer):
     def getBarsFrequency(self):
         return str(self.__barsFreq)
 
-    def getNextJob(self):
+    def getNextJob(self, workerName=None):
         ret = None
+        if workerName is not None:
+            workerName = pickle.loads(workerName)
 
-        # Get the next set of parameters.
-        params = self.__paramSource.getNext(self.defaultBatchSize)
-        params = map(lambda p: p.args, params)
+        self.__requeueExpiredJobs()
+
+        # Get the next set of parameters, giving priority to the ones from expired jobs.
+        with self.__activeJobsLock:
+            params = self.__requeued.pop() if len(self.__requeued) else None
+        if params is None:
+            params = self.__paramSource.getNext(self.defaultBatchSize)
+            params = map(lambda p: p.args, params)
 
         # Map the active job
         if len(params):
             ret = Job(params)
             with self.__activeJobsLock:
-                self.__activeJobs[ret.getId()] = ret
+                self.__activeJobs[ret.getId()] = JobLease(ret, workerName, self.__leaseTimeout)
+        elif not self.__paramSource.eof():
+            # The parameter source is waiting for results to generate more parameters. Workers will ask again.
+            ret = Job([])
 
         return pickle.dumps(ret)
 
+    def heartbeat(self, jobId, processed, workerName):
+        """Renews the lease for a job. Returns False if the job is no longer assigned to the worker."""
+        jobId = pickle.loads(jobId)
+        with self.__activeJobsLock:
+            lease = self.__activeJobs.get(jobId)
+            if lease is None:
+                return False
+            lease.renew(processed)
+        self.__report()
+        return True
+
+    def __requeueExpiredJobs(self):
+        now = time.time()
+        with self.__activeJobsLock:
+            for jobId, lease in self.__activeJobs.items():
+                if lease.expired(now):
+                    logger.warning("Lease for job %s assigned to %s expired. Requeueing it." % (
+                        jobId, lease.getWorkerName())
+                    )
+                    del self.__activeJobs[jobId]
+                    self.__requeued.append(lease.getJob().getParameters())
+
+    def __report(self, force=False):
+        now = time.time()
+        if force or now - self.__lastReport >= self.reportInterval:
+            self.__lastReport = now
+            with self.__activeJobsLock:
+                inProgress = sum(lease.getProcessed() for lease in self.__activeJobs.values())
+                workers = len(set(lease.getWorkerName() for lease in self.__activeJobs.values()))
+            logger.info("%s. %d active jobs on %d workers" % (
+                self.__progress.getReport(inProgress), len(self.__activeJobs), workers)
+            )
+
+    def __markCompleted(self, parameters, force=False):
+        if self.__checkpointPath is None:
+            return
+        with self.__activeJobsLock:
+            self.__completed.update(base.parameters_key(args) for args in parameters)
+            now = time.time()
+            if force or now - self.__lastCheckpoint >= self.checkpointInterval:
+                self.__lastCheckpoint = now
+                # Write the checkpoint atomically.
+                tmpPath = self.__checkpointPath + ".tmp"
+                with open(tmpPath, "w") as f:
+                    json.dump(list(self.__completed), f)
+                os.rename(tmpPath, self.__checkpointPath)
+
+    def getProgress(self):
+        return self.__progress
+
     def jobsPending(self):
         if self.__forcedStop:
             return False
 
+        self.__requeueExpiredJobs()
         jobsPending = not self.__paramSource.eof()
 
         with self.__activeJobsLock:
-            activeJobs = len(self.__activeJobs) > 0
+            activeJobs = len(self.__activeJobs) > 0 or len(self.__requeued) > 0
 
         return jobsPending or activeJobs
 
@@ -141,6 +290,29 @@ class Server(SimpleXMLRPCServer.SimpleXMLRPCServer):
             self.__bestResult = result
 
         self.__resultSinc.push(result, base.Parameters(*parameters))
+        self.__progress.add(1)
+        self.__markCompleted([parameters])
+
+    def pushJobRecords(self, jobId, records, workerName):
+        jobId = pickle.loads(jobId)
+        records = pickle.loads(records)
+
+        # Remove the job mapping.
+        with self.__activeJobsLock:
+            try:
+                del self.__activeJobs[jobId]
+            except KeyError:
+                # The job's results were already submitted.
+                return
+
+        for result, parameters, runtime in records:
+            if result is not None and result > self.__bestResult:
+                logger.info("Best result so far %s with parameters %s" % (result, parameters))
+                self.__bestResult = result
+            self.__resultSinc.push(result, base.Parameters(*parameters), runtime)
+        self.__progress.add(len(records))
+        self.__markCompleted([parameters for result, parameters, runtime in records])
+        self.__report()
 
     def stop(self):
         self.shutdown()
@@ -166,3 +338,5 @@ class Server(SimpleXMLRPCServer.SimpleXMLRPCServer):
                 self.__autoStopThread.join()
         finally:
             self.__forcedStop = True
+            self.__markCompleted([], True)
+            self.__report(True)
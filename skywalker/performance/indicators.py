@@ -0,0 +1,272 @@
+import datetime
+import random
+import timeit
+
+import numpy as np
+
+from skywalker import bar
+from skywalker import dataseries
+from skywalker import technical
+from skywalker.dataseries import bards
+from skywalker.technical import highlow
+from skywalker.technical import hurst
+from skywalker.technical import linreg
+from skywalker.technical import stoch
+from skywalker.utils import collections
+from skywalker.utils import dt
+
+# Micro-benchmarks for the technical filters. Each one feeds the same values to the current filter and to a reference
+# implementation that recalculates everything over the full window, checks that both return the same values and
+# prints the time each one took.
+#
+#   python -m skywalker.performance.indicators
+
+
+class FullHighLowEventWindow(technical.EventWindow):
+    """Reference :class:`skywalker.technical.highlow.HighLowEventWindow` that scans the full window."""
+
+    def __init__(self, windowSize, useMin):
+        super(FullHighLowEventWindow, self).__init__(windowSize)
+        self.__useMin = useMin
+
+    def getValue(self):
+        ret = None
+        if self.windowFull():
+            values = self.getValues()
+            if self.__useMin:
+                ret = values.min()
+            else:
+                ret = values.max()
+        return ret
+
+
+class FullSOEventWindow(technical.EventWindow):
+    """Reference :class:`skywalker.technical.stoch.SOEventWindow` that scans the full window."""
+
+    def __init__(self, period, useAdjustedValues):
+        super(FullSOEventWindow, self).__init__(period, dtype=object)
+        self.__useAdjusted = useAdjustedValues
+
+    def getValue(self):
+        ret = None
+        if self.windowFull():
+            lowestLow, highestHigh = stoch.get_low_high_values(self.__useAdjusted, self.getValues())
+            currentClose = self.getValues()[-1].getClose(self.__useAdjusted)
+            closeDelta = currentClose - lowestLow
+            if closeDelta:
+                ret = closeDelta / float(highestHigh - lowestLow) * 100
+            else:
+                ret = 0.0
+        return ret
+
+
+class FullLeastSquaresRegressionWindow(technical.EventWindow):
+    """Reference :class:`skywalker.technical.linreg.LeastSquaresRegressionWindow` that runs scipy.stats.linregress
+    over the full window."""
+
+    def __init__(self, windowSize):
+        super(FullLeastSquaresRegressionWindow, self).__init__(windowSize)
+        self.__timestamps = collections.NumPyDeque(windowSize)
+
+    def onNewValue(self, dateTime, value):
+        super(FullLeastSquaresRegressionWindow, self).onNewValue(dateTime, value)
+        if value is not None:
+            self.__timestamps.append(dt.datetime_to_timestamp(dateTime))
+
+    def getValue(self):
+        ret = None
+        if self.windowFull():
+            a, b = linreg.lsreg(self.__timestamps.data(), self.getValues())
+            ret = a * self.__timestamps[-1] + b
+        return ret
+
+
+class FullSlopeEventWindow(technical.EventWindow):
+    """Reference :class:`skywalker.technical.linreg.SlopeEventWindow` that runs scipy.stats.linregress over the full
+    window."""
+
+    def __init__(self, windowSize):
+        super(FullSlopeEventWindow, self).__init__(windowSize)
+        self.__x = np.arange(windowSize)
+
+    def getValue(self):
+        ret = None
+        if self.windowFull():
+            ret = linreg.lsreg(self.__x, self.getValues())[0]
+        return ret
+
+
+def hurst_exp_loop(p, minLags, maxLags):
+    """Reference :func:`skywalker.technical.hurst.hurst_exp` that calculates each lag at a time and fits a line with
+    numpy.polyfit."""
+    tau = []
+    lagvec = []
+    for lag in range(minLags, maxLags):
+        pp = np.subtract(p[lag:], p[:-lag])
+        lagvec.append(lag)
+        tau.append(np.sqrt(np.std(pp)))
+    m = np.polyfit(np.log10(lagvec), np.log10(tau), 1)
+    return m[0] * 2
+
+
+class FullHurstExponentEventWindow(technical.EventWindow):
+    """Reference :class:`skywalker.technical.hurst.HurstExponentEventWindow` that uses :func:`hurst_exp_loop`."""
+
+    def __init__(self, period, minLags, maxLags):
+        super(FullHurstExponentEventWindow, self).__init__(period)
+        self.__minLags = minLags
+        self.__maxLags = maxLags
+
+    def onNewValue(self, dateTime, value):
+        if value is not None:
+            value = np.log10(value)
+        super(FullHurstExponentEventWindow, self).onNewValue(dateTime, value)
+
+    def getValue(self):
+        ret = None
+        if self.windowFull():
+            ret = hurst_exp_loop(self.getValues(), self.__minLags, self.__maxLags)
+        return ret
+
+
+def random_values(count, noneRatio=0.01, nanRatio=0.0, seed=0):
+    """Returns a random walk with some None and NaN values."""
+    rnd = random.Random(seed)
+    ret = []
+    value = 100.0
+    for i in xrange(count):
+        value = max(1.0, value + rnd.gauss(0, 1))
+        r = rnd.random()
+        if r < noneRatio:
+            ret.append(None)
+        elif r < noneRatio + nanRatio:
+            ret.append(float("nan"))
+        else:
+            ret.append(value)
+    return ret
+
+
+def random_bars(count, seed=0):
+    """Returns random daily bars."""
+    rnd = random.Random(seed)
+    ret = []
+    dateTime = datetime.datetime(2000, 1, 1)
+    close = 100.0
+    for i in xrange(count):
+        open_ = close
+        close = max(1.0, open_ + rnd.gauss(0, 1))
+        high = max(open_, close) + rnd.random()
+        low = max(0.5, min(open_, close) - rnd.random())
+        ret.append(bar.BasicBar(dateTime, open_, high, low, close, 1000, None, bar.Frequency.DAY))
+        dateTime += datetime.timedelta(days=1)
+    return ret
+
+
+def run_filter(buildFilter, values, newDataSeries=dataseries.SequenceDataSeries):
+    """Feeds values to a filter and returns the values it calculated and the time it took."""
+    ds = newDataSeries(len(values))
+    filter_ = buildFilter(ds)
+    dateTime = datetime.datetime(2000, 1, 1)
+    begin = timeit.default_timer()
+    for value in values:
+        if isinstance(value, bar.Bar):
+            ds.appendWithDateTime(value.getDateTime(), value)
+        else:
+            ds.appendWithDateTime(dateTime, value)
+            dateTime += datetime.timedelta(minutes=1)
+    elapsed = timeit.default_timer() - begin
+    return filter_[:], elapsed
+
+
+def _matches(values, expected, tolerance):
+    if tolerance is None:
+        return values == expected
+    if len(values) != len(expected):
+        return False
+    for value, expectedValue in zip(values, expected):
+        if value is None or expectedValue is None:
+            if value is not expectedValue:
+                return False
+        elif not np.allclose(value, expectedValue, rtol=tolerance, atol=tolerance, equal_nan=True):
+            return False
+    return True
+
+
+def compare(name, buildFilter, buildReference, values, newDataSeries=dataseries.SequenceDataSeries, tolerance=None):
+    """Runs a filter and its reference implementation over the same values and prints the time each one took.
+
+    :param tolerance: The relative and absolute tolerance to compare the values, or None if they must be equal.
+    :raises Exception: If the values don't match.
+    """
+    values_, elapsed = run_filter(buildFilter, values, newDataSeries)
+    expected, expectedElapsed = run_filter(buildReference, values, newDataSeries)
+    if not _matches(values_, expected, tolerance):
+        raise Exception("%s returned different values than the reference implementation" % (name))
+    print "%-40s %10.4fs %10.4fs %8.1fx" % (name, expectedElapsed, elapsed, expectedElapsed / max(elapsed, 1e-9))
+
+
+def main(count=20000, periods=(20, 250)):
+    print "%-40s %11s %11s %9s" % ("", "reference", "current", "speedup")
+    values = random_values(count)
+    nanValues = random_values(count, nanRatio=0.001, seed=1)
+    bars = random_bars(count)
+    for period in periods:
+        compare(
+            "High(%d)" % (period),
+            lambda ds: highlow.High(ds, period),
+            lambda ds: technical.EventBasedFilter(ds, FullHighLowEventWindow(period, False)),
+            values
+        )
+        compare(
+            "Low(%d)" % (period),
+            lambda ds: highlow.Low(ds, period),
+            lambda ds: technical.EventBasedFilter(ds, FullHighLowEventWindow(period, True)),
+            values
+        )
+        compare(
+            "StochasticOscillator(%d)" % (period),
+            lambda ds: stoch.StochasticOscillator(ds, period),
+            lambda ds: technical.EventBasedFilter(ds, FullSOEventWindow(period, False)),
+            bars,
+            bards.BarDataSeries
+        )
+        compare(
+            "Slope(%d)" % (period),
+            lambda ds: linreg.Slope(ds, period),
+            lambda ds: technical.EventBasedFilter(ds, FullSlopeEventWindow(period)),
+            values,
+            tolerance=1e-9
+        )
+        # scipy.stats.linregress loses some precision when evaluating the line at big timestamps.
+        compare(
+            "LeastSquaresRegression(%d)" % (period),
+            lambda ds: linreg.LeastSquaresRegression(ds, period),
+            lambda ds: technical.EventBasedFilter(ds, FullLeastSquaresRegressionWindow(period)),
+            values,
+            tolerance=1e-4
+        )
+        compare(
+            "Slope(%d) with NaN" % (period),
+            lambda ds: linreg.Slope(ds, period),
+            lambda ds: technical.EventBasedFilter(ds, FullSlopeEventWindow(period)),
+            nanValues,
+            tolerance=1e-9
+        )
+        compare(
+            "LeastSquaresRegression(%d) with NaN" % (period),
+            lambda ds: linreg.LeastSquaresRegression(ds, period),
+            lambda ds: technical.EventBasedFilter(ds, FullLeastSquaresRegressionWindow(period)),
+            nanValues,
+            tolerance=1e-4
+        )
+        compare(
+            "HurstExponent(%d)" % (period),
+            lambda ds: hurst.HurstExponent(ds, period),
+            lambda ds: technical.EventBasedFilter(ds, FullHurstExponentEventWindow(period, 2, 20)),
+            values,
+            tolerance=1e-9
+        )
+
+
+if __name__ == "__main__":
+    main()
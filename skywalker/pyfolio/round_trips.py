@@ -112,42 +112,123 @@ def _groupby_consecutive(txn, max_delta=pd.Timedelta('8h')):
 
     """
 
-    def vwap(transaction):
-        if transaction.amount.sum() == 0:
-            warnings.warn('Zero transacted shares, setting vwap to nan.')
-            return np.nan
-        return (transaction.amount * transaction.price).sum() / \
-               transaction.amount.sum()
-
-    out = []
-    for sym, t in txn.groupby('symbol'):
-        t = t.sort_index()
-        t.index.name = 'dt'
-        t = t.reset_index()
-
-        t['order_sign'] = t.amount > 0
-        t['block_dir'] = (t.order_sign.shift(
-            1) != t.order_sign).astype(int).cumsum()
-        t['block_time'] = ((t.dt - t.dt.shift(1)) >
-                           max_delta).astype(int).cumsum()
-        grouped_price = (t.groupby(('block_dir',
-                                    'block_time'))
-                         .apply(vwap))
-        grouped_price.name = 'price'
-        grouped_rest = t.groupby(('block_dir', 'block_time')).agg({
-            'amount': 'sum',
-            'symbol': 'first',
-            'dt': 'first'})
-
-        grouped = grouped_rest.join(grouped_price)
-
-        out.append(grouped)
-
-    out = pd.concat(out)
-    out = out.set_index('dt')
+    if len(txn) == 0:
+        raise ValueError('No transactions to group.')
+
+    # Sort by symbol and then by time, keeping the order of transactions
+    # at the same time.
+    symbol_codes, symbols = pd.factorize(txn.symbol.values, sort=True)
+    dts = txn.index.values
+    order = np.lexsort((dts, symbol_codes))
+    symbol_codes = symbol_codes[order]
+    dts = dts[order]
+    amounts = txn.amount.values[order]
+    prices = txn.price.values[order]
+
+    # A block starts at a new symbol, a change of direction or a gap of
+    # more than max_delta.
+    order_sign = amounts > 0
+    block_start = np.ones(len(txn), dtype=bool)
+    block_start[1:] = ((symbol_codes[1:] != symbol_codes[:-1]) |
+                       (order_sign[1:] != order_sign[:-1]) |
+                       ((dts[1:] - dts[:-1]) >
+                        np.timedelta64(max_delta.value, 'ns')))
+    starts = np.flatnonzero(block_start)
+
+    amount = np.add.reduceat(amounts, starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price = np.add.reduceat(amounts * prices, starts) / amount
+    if (amount == 0).any():
+        warnings.warn('Zero transacted shares, setting vwap to nan.')
+        price[amount == 0] = np.nan
+
+    out = pd.DataFrame({'amount': amount,
+                        'price': price,
+                        'symbol': symbols.take(symbol_codes[starts])},
+                       index=txn.index[order[starts]])
+    out.index.name = 'dt'
     return out
 
 
+def _match_round_trips(transactions):
+    """Match closing transactions against the open lots of each symbol in
+    FIFO order.
+
+    Lots are kept as [quantity, signed price, dt] and split when a
+    transaction only closes part of them.
+
+    Parameters
+    ----------
+    transactions : pd.DataFrame
+        Prices and amounts of executed round_trips, sorted by symbol and
+        then by time.
+
+    Returns
+    -------
+    round_trips : list of dict
+        One round trip per transaction that closed shares.
+    """
+
+    amounts = transactions.amount.values
+    prices = transactions.price.values
+    signed_prices = prices * np.sign(amounts)
+    abs_amounts = np.abs(amounts).astype(int)
+
+    roundtrips = []
+    lots = deque()
+    cur_sym = None
+    for sym, dt, amount, price, signed_price, abs_amount in zip(
+            transactions.symbol.values, transactions.index, amounts.tolist(),
+            prices.tolist(), signed_prices.tolist(), abs_amounts.tolist()):
+        if sym != cur_sym:
+            cur_sym = sym
+            lots.clear()
+
+        if price < 0:
+            warnings.warn('Negative price detected, ignoring for'
+                          'round-trip.')
+            continue
+
+        if (len(lots) == 0) or \
+                (copysign(1, lots[-1][1]) == copysign(1, amount)):
+            if abs_amount:
+                lots.append([abs_amount, signed_price, dt])
+            continue
+
+        # Close round-trip
+        pnl = 0.
+        invested = 0.
+        open_dt = None
+        remaining = abs_amount
+        while remaining and lots:
+            lot = lots[0]
+            matched = min(remaining, lot[0])
+            pnl += -(signed_price + lot[1]) * matched
+            invested += abs(lot[1]) * matched
+            if open_dt is None:
+                open_dt = lot[2]
+            remaining -= matched
+            if matched == lot[0]:
+                lots.popleft()
+            else:
+                lot[0] -= matched
+
+        if remaining:
+            # The transaction crossed 0, so the rest opens a new position.
+            lots.append([remaining, signed_price, dt])
+
+        if open_dt is not None:
+            roundtrips.append({'pnl': pnl,
+                               'open_dt': open_dt,
+                               'close_dt': dt,
+                               'long': signed_price < 0,
+                               'rt_returns': np.true_divide(pnl, invested),
+                               'symbol': sym,
+                               })
+
+    return roundtrips
+
+
 def extract_round_trips(transactions,
                         portfolio_value=None):
     """Group transactions into "round trips". First, transactions are
@@ -156,8 +237,9 @@ def extract_round_trips(transactions,
     PnL, duration and returns are computed. Crossings where a position
     changes from long to short and vice-versa are handled correctly.
 
-    Under the hood, we reconstruct the individual shares in a
-    portfolio over time and match round_trips in a FIFO-order.
+    Under the hood, we keep the open lots of shares in a portfolio over
+    time and match round_trips in a FIFO-order, splitting lots when a
+    transaction only closes part of them.
 
     For example, the following transactions would constitute one round trip:
     index                  amount   price    symbol
@@ -199,56 +281,7 @@ def extract_round_trips(transactions,
     """
 
     transactions = _groupby_consecutive(transactions)
-    roundtrips = []
-
-    for sym, trans_sym in transactions.groupby('symbol'):
-        trans_sym = trans_sym.sort_index()
-        price_stack = deque()
-        dt_stack = deque()
-        trans_sym['signed_price'] = trans_sym.price * \
-                                    np.sign(trans_sym.amount)
-        trans_sym['abs_amount'] = trans_sym.amount.abs().astype(int)
-        for dt, t in trans_sym.iterrows():
-            if t.price < 0:
-                warnings.warn('Negative price detected, ignoring for'
-                              'round-trip.')
-                continue
-
-            indiv_prices = [t.signed_price] * t.abs_amount
-            if (len(price_stack) == 0) or \
-                    (copysign(1, price_stack[-1]) == copysign(1, t.amount)):
-                price_stack.extend(indiv_prices)
-                dt_stack.extend([dt] * len(indiv_prices))
-            else:
-                # Close round-trip
-                pnl = 0
-                invested = 0
-                cur_open_dts = []
-
-                for price in indiv_prices:
-                    if len(price_stack) != 0 and \
-                            (copysign(1, price_stack[-1]) != copysign(1, price)):
-                        # Retrieve first dt, stock-price pair from
-                        # stack
-                        prev_price = price_stack.popleft()
-                        prev_dt = dt_stack.popleft()
-
-                        pnl += -(price + prev_price)
-                        cur_open_dts.append(prev_dt)
-                        invested += abs(prev_price)
-
-                    else:
-                        # Push additional stock-prices onto stack
-                        price_stack.append(price)
-                        dt_stack.append(dt)
-
-                roundtrips.append({'pnl': pnl,
-                                   'open_dt': cur_open_dts[0],
-                                   'close_dt': dt,
-                                   'long': price < 0,
-                                   'rt_returns': pnl / invested,
-                                   'symbol': sym,
-                                   })
+    roundtrips = _match_round_trips(transactions)
 
     roundtrips = pd.DataFrame(roundtrips)
 
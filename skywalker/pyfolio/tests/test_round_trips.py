@@ -103,6 +103,24 @@ class RoundTripTestCase(TestCase):
                             'long', 'symbol'],
                    index=[0, 1])
          ),
+        # Round-trips over large amounts, with a lot that is split
+        (DataFrame(data=[[100000, 10., 'A'],
+                         [-150000, 12., 'A'],
+                         [50000, 11., 'A']],
+                   columns=['amount', 'price', 'symbol'],
+                   index=dates[:3]),
+         DataFrame(data=[[dates[0], dates[1],
+                          Timedelta(days=1), 200000., .2,
+                          True, 'A'],
+                         [dates[1], dates[2],
+                          Timedelta(days=1),
+                          50000., (1. / 12),
+                          False, 'A']],
+                   columns=['open_dt', 'close_dt',
+                            'duration', 'pnl', 'rt_returns',
+                            'long', 'symbol'],
+                   index=[0, 1])
+         ),
         # Round-trip that does not cross 0
         (DataFrame(data=[[4, 10., 'A'],
                          [-2, 15., 'A'],
@@ -2,6 +2,7 @@ from __future__ import division
 
 from unittest import TestCase
 
+import empyrical
 import numpy as np
 import pandas as pd
 from nose_parameterized import parameterized
@@ -256,14 +257,15 @@ class TestStats(TestCase):
     dt_2 = pd.date_range('2000-1-3', periods=8, freq='D')
 
     @parameterized.expand([
-        (simple_rets[:5], 2, '[nan, inf, inf, 11.224972160321828, inf]')
+        (simple_rets[:5], 2, [np.nan, np.inf, np.inf, 11.224972160321828,
+                              np.nan])
     ])
     def test_sharpe_2(self, returns, rolling_sharpe_window, expected):
-        self.assertEqual(str(timeseries.rolling_sharpe(
-            returns, rolling_sharpe_window).values.tolist()), expected)
+        assert_allclose(timeseries.rolling_sharpe(
+            returns, rolling_sharpe_window).values, expected)
 
     @parameterized.expand([
-        (simple_rets[:5], simple_benchmark, 2, 8.024708101613483e-32)
+        (simple_rets[:5], simple_benchmark, 2, 0.)
     ])
     def test_beta(self, returns, benchmark_rets, rolling_window, expected):
         self.assertEqual(
@@ -273,6 +275,27 @@ class TestStats(TestCase):
                 rolling_window=rolling_window).values.tolist()[2],
             expected)
 
+    def test_rolling_beta_matches_empyrical(self):
+        random_state = np.random.RandomState(0)
+        index = pd.date_range('2000-1-3', periods=100, freq='D')
+        returns = pd.Series(random_state.normal(0., .01, 100), index)
+        factor_returns = pd.DataFrame(random_state.normal(0., .01, (100, 2)),
+                                      index, columns=['a', 'b'])
+        returns.iloc[10] = np.nan
+        factor_returns.iloc[30, 1] = np.nan
+
+        rolling_beta = timeseries.rolling_beta(returns, factor_returns,
+                                               rolling_window=20)
+
+        self.assertTrue(rolling_beta.iloc[:20].isnull().all().all())
+        for column in factor_returns.columns:
+            for i in range(20, 100):
+                assert_almost_equal(
+                    rolling_beta[column].iloc[i],
+                    empyrical.beta(returns.iloc[i - 20:i + 1],
+                                   factor_returns[column].iloc[i - 20:i + 1]),
+                    DECIMAL_PLACES)
+
 
 class TestMultifactor(TestCase):
     simple_rets = pd.Series(
@@ -327,6 +350,45 @@ class TestCone(TestCase):
             expected = normal_cone[col].values
             assert_allclose(vals.values, expected, rtol=.005)
 
+    def test_simulate_paths_matches_pandas_sample(self):
+        rets = pd.Series(np.random.RandomState(0).normal(0., .01, 100))
+
+        samples = timeseries.simulate_paths(rets, 20, num_samples=50,
+                                            random_seed=1)
+
+        random_state = np.random.RandomState(seed=1)
+        for sample in samples:
+            expected = rets.sample(20, replace=True, random_state=random_state)
+            assert_allclose(sample, expected.values)
+
+    def test_chunked_cone_matches_cone(self):
+        rets = pd.Series(np.random.RandomState(0).normal(0., .01, 100))
+
+        cone = timeseries.forecast_cone_bootstrap(
+            rets, 50, num_samples=1000, random_seed=1)
+        chunked_cone = timeseries.forecast_cone_bootstrap(
+            rets, 50, num_samples=1000, random_seed=1, chunk_size=128)
+
+        self.assertEqual(list(cone.columns), list(chunked_cone.columns))
+        assert_allclose(chunked_cone.values, cone.values, rtol=1e-10)
+
+    def test_chunked_quantiles_within_one_bin(self):
+        rets = pd.Series(np.random.RandomState(0).normal(0., .01, 100))
+        num_bins = 1024
+
+        quantiles = timeseries.forecast_quantiles_bootstrap(
+            rets, 50, num_samples=1000, random_seed=1)
+        chunked_quantiles = timeseries.forecast_quantiles_bootstrap(
+            rets, 50, num_samples=1000, random_seed=1, chunk_size=128,
+            num_bins=num_bins)
+
+        log_rets = np.log1p(rets)
+        bin_width = 50 * (log_rets.max() - log_rets.min()) / num_bins
+        self.assertLessEqual(
+            np.abs(np.log(chunked_quantiles.values) -
+                   np.log(quantiles.values)).max(),
+            bin_width)
+
 
 class TestBootstrap(TestCase):
     @parameterized.expand([
@@ -364,3 +426,39 @@ class TestBootstrap(TestCase):
             3,
             'SD of bootstrap does not match theoretical SD of'
             'sampling distribution')
+
+    @parameterized.expand([
+        (func,) for func in timeseries.VECTORIZED_STAT_FUNCS.keys()
+    ])
+    def test_vectorized_stat_matches_loop(self, func):
+        np.random.seed(0)
+        returns = pd.Series(np.random.randn(100) / 100)
+        factor_returns = pd.Series(np.random.randn(100) / 100)
+        kwargs = {}
+        if func in timeseries.FACTOR_STAT_FUNCS:
+            kwargs['factor_returns'] = factor_returns
+
+        samples = timeseries.calc_bootstrap(func, returns, n_samples=50,
+                                            random_seed=1, **kwargs)
+        # Wrapping the function forces a call per sample.
+        expected = timeseries.calc_bootstrap(lambda *args: func(*args),
+                                             returns, n_samples=50,
+                                             random_seed=1, **kwargs)
+
+        assert_allclose(samples, expected, rtol=1e-7)
+
+    def test_perf_stats_bootstrap_is_reproducible(self):
+        np.random.seed(0)
+        returns = pd.Series(np.random.randn(100) / 100)
+        factor_returns = pd.Series(np.random.randn(100) / 100)
+
+        stats = timeseries.perf_stats_bootstrap(
+            returns, factor_returns, return_stats=False, n_samples=20,
+            random_seed=1)
+        expected = timeseries.perf_stats_bootstrap(
+            returns, factor_returns, return_stats=False, n_samples=20,
+            random_seed=1)
+
+        self.assertEqual(stats.shape, (20, len(timeseries.SIMPLE_STAT_FUNCS) +
+                                       len(timeseries.FACTOR_STAT_FUNCS)))
+        assert_allclose(stats.values, expected.values)
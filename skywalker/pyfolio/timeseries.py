@@ -15,7 +15,7 @@
 from __future__ import division
 
 from collections import OrderedDict
-from functools import partial
+from multiprocessing import Pool
 
 import empyrical
 import numpy as np
@@ -27,7 +27,7 @@ from . import utils
 from .deprecate import deprecated
 from .interesting_periods import PERIODS
 from .utils import APPROX_BDAYS_PER_MONTH, APPROX_BDAYS_PER_YEAR
-from .utils import DAILY
+from .utils import ANNUALIZATION_FACTORS, DAILY
 
 DEPRECATION_WARNING = ("Risk functions in pyfolio.timeseries are deprecated "
                        "and will be removed in a future release. Please "
@@ -482,6 +482,9 @@ FACTOR_STAT_FUNCS = [
     beta,
 ]
 
+# Maximum number of sampled returns to hold at once when bootstrapping.
+BOOTSTRAP_CHUNK_ELEMENTS = 1024 * 1024 * 4
+
 
 def normalize(returns, starting_value=1):
     """
@@ -581,6 +584,82 @@ def calc_multifactor(returns, factors):
     return results.params
 
 
+def _rolling_sums(values, window):
+    """Sums of each row of an array and the window - 1 rows before it.
+
+    Sums restart every window rows and each window is the sum of the
+    end of a block and the start of the next one, so the rounding errors
+    don't grow with the length of the array.
+    """
+    n_rows = len(values)
+    n_blocks = -(-n_rows // window)
+    blocks = np.zeros((n_blocks * window,) + values.shape[1:])
+    blocks[:n_rows] = values
+    blocks = blocks.reshape((n_blocks, window) + values.shape[1:])
+
+    out = np.cumsum(blocks, axis=1)
+    suffix = np.cumsum(blocks[:, ::-1], axis=1)[:, ::-1]
+    out[1:, :-1] += suffix[:-1, 1:]
+    return out.reshape((n_blocks * window,) + values.shape[1:])[:n_rows]
+
+
+def _rolling_moments(returns, factor_returns, window):
+    """Rolling moments of returns against several factors at once.
+
+    Each window only includes the rows where both the returns and the
+    factor are not NaN.
+
+    Parameters
+    ----------
+    returns : np.ndarray
+        Noncumulative returns, with shape (n,).
+    factor_returns : np.ndarray
+        Noncumulative factor returns, with shape (n, k).
+    window : int
+        Number of rows in each window.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The number of rows, the mean of the returns, the sums of squared
+        deviations of the returns and of the factors, and the sums of
+        products of their deviations, each with shape (n, k).
+    """
+    returns = returns[:, np.newaxis]
+    valid = ~(np.isnan(returns) | np.isnan(factor_returns))
+    n_valid = np.maximum(valid.sum(axis=0), 1)
+
+    # Centering on the overall means keeps the sums small.
+    returns_center = np.where(valid, returns, 0.).sum(axis=0) / n_valid
+    factor_center = np.where(valid, factor_returns, 0.).sum(axis=0) / n_valid
+    returns = np.where(valid, returns - returns_center, 0.)
+    factor_returns = np.where(valid, factor_returns - factor_center, 0.)
+
+    count = _rolling_sums(valid.astype(float), window)
+    returns_sum = _rolling_sums(returns, window)
+    factor_sum = _rolling_sums(factor_returns, window)
+    returns_sq = _rolling_sums(returns * returns, window)
+    factor_sq = _rolling_sums(factor_returns * factor_returns, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns_mean = returns_sum / count
+        factor_mean = factor_sum / count
+    returns_ss = returns_sq - returns_sum * returns_mean
+    factor_ss = factor_sq - factor_sum * factor_mean
+    cross = _rolling_sums(returns * factor_returns, window) - \
+        factor_sum * returns_mean
+
+    # Values within the rounding error of the sums are 0, as they are
+    # for a constant window.
+    tolerance = 16 * window * np.finfo(float).eps
+    returns_ss[returns_ss <= tolerance * returns_sq] = 0.
+    factor_ss[factor_ss <= tolerance * factor_sq] = 0.
+    cross[np.absolute(cross) <=
+          tolerance * np.sqrt(returns_sq * factor_sq)] = 0.
+
+    return (count, returns_mean + returns_center, returns_ss, factor_ss,
+            cross)
+
+
 def rolling_beta(returns, factor_returns,
                  rolling_window=APPROX_BDAYS_PER_MONTH * 6):
     """Determines the rolling beta of a strategy.
@@ -608,19 +687,22 @@ def rolling_beta(returns, factor_returns,
     See https://en.wikipedia.org/wiki/Beta_(finance) for more details.
 
     """
+    factor_values = factor_returns.reindex(returns.index).values.reshape(
+        len(returns), -1)
+    count, _, _, factor_ss, cross = _rolling_moments(
+        returns.values, factor_values, rolling_window + 1)
+
+    # Same as empyrical.beta over each window, including its end.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = cross / factor_ss
+        out[(count < 2) | (np.absolute(factor_ss / count) < 1.0e-30)] = np.nan
+    out[:rolling_window] = np.nan
+
     if factor_returns.ndim > 1:
-        # Apply column-wise
-        return factor_returns.apply(partial(rolling_beta, returns),
-                                    rolling_window=rolling_window)
+        return pd.DataFrame(out, index=returns.index,
+                            columns=factor_returns.columns)
     else:
-        out = pd.Series(index=returns.index)
-        for beg, end in zip(returns.index[0:-rolling_window],
-                            returns.index[rolling_window:]):
-            out.loc[end] = empyrical.beta(
-                returns.loc[beg:end],
-                factor_returns.loc[beg:end])
-
-        return out
+        return pd.Series(out[:, 0], index=returns.index)
 
 
 def rolling_fama_french(returns, factor_returns=None,
@@ -691,9 +773,12 @@ def perf_stats(returns, factor_returns=None):
     return stats
 
 
-def perf_stats_bootstrap(returns, factor_returns=None, return_stats=True):
+def perf_stats_bootstrap(returns, factor_returns=None, return_stats=True,
+                         n_samples=1000, random_seed=None, n_jobs=1):
     """Calculates various bootstrapped performance metrics of a strategy.
 
+    All the metrics are calculated over the same bootstrap samples.
+
     Parameters
     ----------
     returns : pd.Series
@@ -708,6 +793,12 @@ def perf_stats_bootstrap(returns, factor_returns=None, return_stats=True):
         for each perf metric.
         If False, returns a DataFrame with the bootstrap samples for
         each perf metric.
+    n_samples : int (optional)
+        Number of bootstrap samples to draw. Default is 1000.
+    random_seed : int (optional)
+        Seed for the samples. If None, numpy's global random state is used.
+    n_jobs : int (optional)
+        Number of processes used to calculate the metrics. Default is 1.
 
     Returns
     -------
@@ -719,19 +810,18 @@ def perf_stats_bootstrap(returns, factor_returns=None, return_stats=True):
         - Bootstrap samples for each performance metric.
     """
     bootstrap_values = OrderedDict()
+    indices = bootstrap_indices(len(returns), n_samples, random_seed)
 
     for stat_func in SIMPLE_STAT_FUNCS:
         stat_name = stat_func.__name__
-        bootstrap_values[stat_name] = calc_bootstrap(stat_func,
-                                                     returns)
+        bootstrap_values[stat_name] = _calc_bootstrap(
+            stat_func, returns, None, indices, n_jobs)
 
     if factor_returns is not None:
         for stat_func in FACTOR_STAT_FUNCS:
             stat_name = stat_func.__name__
-            bootstrap_values[stat_name] = calc_bootstrap(
-                stat_func,
-                returns,
-                factor_returns=factor_returns)
+            bootstrap_values[stat_name] = _calc_bootstrap(
+                stat_func, returns, factor_returns, indices, n_jobs)
 
     bootstrap_values = pd.DataFrame(bootstrap_values)
 
@@ -746,6 +836,9 @@ def calc_bootstrap(func, returns, *args, **kwargs):
     """Performs a bootstrap analysis on a user-defined function returning
     a summary statistic.
 
+    Statistics in VECTORIZED_STAT_FUNCS are calculated for all the samples
+    at once. Other functions are called once per sample.
+
     Parameters
     ----------
     func : function
@@ -762,6 +855,11 @@ def calc_bootstrap(func, returns, *args, **kwargs):
     n_samples : int (optional)
         Number of bootstrap samples to draw. Default is 1000.
         Increasing this will lead to more stable / accurate estimates.
+    random_seed : int (optional)
+        Seed for the samples. If None, numpy's global random state is used.
+    n_jobs : int (optional)
+        Number of processes used to calculate vectorized statistics.
+        Default is 1.
 
     Returns
     -------
@@ -770,24 +868,233 @@ def calc_bootstrap(func, returns, *args, **kwargs):
     """
 
     n_samples = kwargs.pop('n_samples', 1000)
-    out = np.empty(n_samples)
-
+    random_seed = kwargs.pop('random_seed', None)
+    n_jobs = kwargs.pop('n_jobs', 1)
     factor_returns = kwargs.pop('factor_returns', None)
 
-    for i in range(n_samples):
-        idx = np.random.randint(len(returns), size=len(returns))
-        returns_i = returns.iloc[idx].reset_index(drop=True)
-        if factor_returns is not None:
-            factor_returns_i = factor_returns.iloc[idx].reset_index(drop=True)
-            out[i] = func(returns_i, factor_returns_i,
-                          *args, **kwargs)
-        else:
-            out[i] = func(returns_i,
-                          *args, **kwargs)
+    indices = bootstrap_indices(len(returns), n_samples, random_seed)
+    return _calc_bootstrap(func, returns, factor_returns, indices, n_jobs,
+                           *args, **kwargs)
+
+
+def bootstrap_indices(n_obs, n_samples=1000, random_seed=None):
+    """Draws the positions for all the bootstrap samples at once.
+
+    Parameters
+    ----------
+    n_obs : int
+        Number of observations to sample from, and in each sample.
+    n_samples : int (optional)
+        Number of bootstrap samples to draw. Default is 1000.
+    random_seed : int (optional)
+        Seed for the samples. If None, numpy's global random state is used,
+        which gives the same samples as drawing them one at a time.
+
+    Returns
+    -------
+    numpy.ndarray
+        Matrix of shape (n_samples, n_obs) with one sample per row.
+    """
+
+    if random_seed is None:
+        random_state = np.random
+    else:
+        random_state = np.random.RandomState(seed=random_seed)
+    return random_state.randint(n_obs, size=(n_samples, n_obs))
+
+
+def _calc_bootstrap(func, returns, factor_returns, indices, n_jobs,
+                    *args, **kwargs):
+    vectorized_func = VECTORIZED_STAT_FUNCS.get(func)
+    values = np.asarray(returns, dtype=float)
+    factor_values = None
+    if factor_returns is not None:
+        factor_values = np.asarray(factor_returns, dtype=float)
+    usable = vectorized_func is not None and not args and not kwargs and \
+        len(values) >= 2 and not np.isnan(values).any() and \
+        (factor_values is None or not np.isnan(factor_values).any())
+
+    if not usable:
+        out = np.empty(len(indices))
+        for i, idx in enumerate(indices):
+            returns_i = returns.iloc[idx].reset_index(drop=True)
+            if factor_returns is not None:
+                factor_returns_i = factor_returns.iloc[idx].reset_index(
+                    drop=True)
+                out[i] = func(returns_i, factor_returns_i,
+                              *args, **kwargs)
+            else:
+                out[i] = func(returns_i,
+                              *args, **kwargs)
+        return out
+
+    # Bound the memory used by the sampled returns.
+    chunk_size = max(1, BOOTSTRAP_CHUNK_ELEMENTS // len(values))
+    chunks = [(vectorized_func, values, factor_values,
+               indices[begin:begin + chunk_size])
+              for begin in range(0, len(indices), chunk_size)]
+    if n_jobs > 1 and len(chunks) > 1:
+        pool = Pool(processes=n_jobs)
+        try:
+            results = pool.map(_apply_vectorized_stat, chunks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_apply_vectorized_stat(chunk) for chunk in chunks]
+    return np.concatenate(results)
+
+
+def _apply_vectorized_stat(args):
+    vectorized_func, values, factor_values, indices = args
+    if factor_values is None:
+        return vectorized_func(values[indices])
+    return vectorized_func(values[indices], factor_values[indices])
+
+
+# Vectorized versions of the stat functions, for returns without NaN values
+# and at least 2 observations. Each one takes a 2D array with a sample per row
+# and returns one value per row.
+
+def _cum_log_returns(returns):
+    return np.cumsum(np.log1p(returns), axis=1)
+
+
+def _cum_returns_final_2d(returns):
+    return np.exp(np.log1p(returns).sum(axis=1)) - 1
+
+
+def _annual_return_2d(returns):
+    num_years = returns.shape[1] / ANNUALIZATION_FACTORS[DAILY]
+    return (1. + _cum_returns_final_2d(returns)) ** (1. / num_years) - 1
+
+
+def _annual_volatility_2d(returns):
+    return returns.std(axis=1, ddof=1) * \
+        np.sqrt(ANNUALIZATION_FACTORS[DAILY])
+
 
+def _sharpe_ratio_2d(returns):
+    std = returns.std(axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = returns.mean(axis=1) / std * \
+            np.sqrt(ANNUALIZATION_FACTORS[DAILY])
+    out[std == 0] = np.nan
     return out
 
 
+def _max_drawdown_2d(returns):
+    cumulative = 100 * np.exp(_cum_log_returns(returns))
+    max_return = np.maximum.accumulate(cumulative, axis=1)
+    return ((cumulative - max_return) / max_return).min(axis=1)
+
+
+def _calmar_ratio_2d(returns):
+    max_dd = _max_drawdown_2d(returns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = _annual_return_2d(returns) / np.abs(max_dd)
+    out[(max_dd >= 0) | np.isinf(out)] = np.nan
+    return out
+
+
+def _stability_of_timeseries_2d(returns):
+    cum_log_returns = _cum_log_returns(returns)
+    x = np.arange(returns.shape[1], dtype=float)
+    x -= x.mean()
+    y = cum_log_returns - cum_log_returns.mean(axis=1)[:, np.newaxis]
+    ssxm = (x * x).sum()
+    ssym = (y * y).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = y.dot(x) / np.sqrt(ssxm * ssym)
+    # Same as scipy.stats.linregress.
+    r[ssym == 0] = 0.
+    r = np.clip(r, -1., 1.)
+    return r ** 2
+
+
+def _omega_ratio_2d(returns):
+    numer = np.where(returns > 0., returns, 0.).sum(axis=1)
+    denom = -np.where(returns < 0., returns, 0.).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = numer / denom
+    out[~(denom > 0.)] = np.nan
+    return out
+
+
+def _sortino_ratio_2d(returns):
+    ann_factor = ANNUALIZATION_FACTORS[DAILY]
+    downside = np.minimum(returns, 0.)
+    downside_risk = np.sqrt((downside * downside).mean(axis=1)) * \
+        np.sqrt(ann_factor)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return returns.mean(axis=1) / downside_risk * ann_factor
+
+
+def _skew_2d(returns):
+    return stats.skew(returns, axis=1)
+
+
+def _kurtosis_2d(returns):
+    return stats.kurtosis(returns, axis=1)
+
+
+def _tail_ratio_2d(returns):
+    percentiles = np.percentile(returns, [95, 5], axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.abs(percentiles[0]) / np.abs(percentiles[1])
+
+
+def _common_sense_ratio_2d(returns):
+    return _tail_ratio_2d(returns) * (1 + _annual_return_2d(returns))
+
+
+def _information_ratio_2d(returns, factor_returns):
+    active_return = returns - factor_returns
+    tracking_error = active_return.std(axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = active_return.mean(axis=1) / tracking_error
+    out[tracking_error == 0] = np.nan
+    return out
+
+
+def _beta_2d(returns, factor_returns):
+    returns_dev = returns - returns.mean(axis=1)[:, np.newaxis]
+    factor_dev = factor_returns - factor_returns.mean(axis=1)[:, np.newaxis]
+    n = returns.shape[1]
+    cov = (returns_dev * factor_dev).sum(axis=1) / n
+    var = (factor_dev * factor_dev).sum(axis=1) / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = cov / var
+    out[np.absolute(var) < 1.0e-30] = np.nan
+    return out
+
+
+def _alpha_2d(returns, factor_returns):
+    beta_ = _beta_2d(returns, factor_returns)
+    alpha_series = returns - beta_[:, np.newaxis] * factor_returns
+    return alpha_series.mean(axis=1) * ANNUALIZATION_FACTORS[DAILY]
+
+
+VECTORIZED_STAT_FUNCS = {
+    empyrical.cum_returns_final: _cum_returns_final_2d,
+    annual_return: _annual_return_2d,
+    annual_volatility: _annual_volatility_2d,
+    sharpe_ratio: _sharpe_ratio_2d,
+    calmar_ratio: _calmar_ratio_2d,
+    stability_of_timeseries: _stability_of_timeseries_2d,
+    max_drawdown: _max_drawdown_2d,
+    omega_ratio: _omega_ratio_2d,
+    sortino_ratio: _sortino_ratio_2d,
+    stats.skew: _skew_2d,
+    stats.kurtosis: _kurtosis_2d,
+    tail_ratio: _tail_ratio_2d,
+    common_sense_ratio: _common_sense_ratio_2d,
+    information_ratio: _information_ratio_2d,
+    alpha: _alpha_2d,
+    beta: _beta_2d,
+}
+
+
 def calc_distribution_stats(x):
     """Calculate various summary statistics of data.
 
@@ -993,13 +1300,21 @@ def rolling_sharpe(returns, rolling_sharpe_window):
     See https://en.wikipedia.org/wiki/Sharpe_ratio for more details.
     """
 
-    return returns.rolling(rolling_sharpe_window).mean() \
-           / returns.rolling(rolling_sharpe_window).std() \
-           * np.sqrt(APPROX_BDAYS_PER_YEAR)
+    values = returns.values.reshape(len(returns), 1)
+    count, mean, returns_ss, _, _ = _rolling_moments(
+        values[:, 0], values, rolling_sharpe_window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = mean / np.sqrt(returns_ss / (count - 1)) * \
+            np.sqrt(APPROX_BDAYS_PER_YEAR)
+    out[count < rolling_sharpe_window] = np.nan
+
+    return pd.Series(out[:, 0], index=returns.index, name=returns.name)
 
 
 def simulate_paths(is_returns, num_days,
-                   starting_value=1, num_samples=1000, random_seed=None):
+                   starting_value=1, num_samples=1000, random_seed=None,
+                   dtype=np.float64):
     """
     Gnerate alternate paths using available values from in-sample returns.
 
@@ -1017,8 +1332,10 @@ def simulate_paths(is_returns, num_days,
         A higher number of samples will generate a more accurate
         bootstrap cone.
     random_seed : int
-        Seed for the pseudorandom number generator used by the pandas
-        sample method.
+        Seed for the pseudorandom number generator. The paths are the
+        same that the pandas sample method draws with this seed.
+    dtype : numpy.dtype
+        Type of the returned paths, np.float64 or np.float32.
 
     Returns
     -------
@@ -1026,15 +1343,40 @@ def simulate_paths(is_returns, num_days,
     samples : numpy.ndarray
 
     """
-    samples = np.empty((num_samples, num_days))
-    seed = np.random.RandomState(seed=random_seed)
-    for i in range(num_samples):
-        samples[i, :] = is_returns.sample(num_days, replace=True,
-                                          random_state=seed)
+    random_state = np.random.RandomState(seed=random_seed)
+    return _draw_paths(np.asarray(is_returns, dtype=dtype), num_days,
+                       num_samples, random_state)
+
+
+def _draw_paths(values, num_days, num_samples, random_state):
+    # One draw for the whole matrix returns the same positions as one
+    # draw per path.
+    return values[random_state.randint(len(values),
+                                       size=(num_samples, num_days))]
+
 
+def _cumulate_paths(samples):
+    # Cumulative returns of each path, calculated in place.
+    samples += 1
+    np.cumprod(samples, axis=1, out=samples)
     return samples
 
 
+def _cone_bounds(cum_mean, cum_std, cone_std):
+    if isinstance(cone_std, (float, int)):
+        cone_std = [cone_std]
+
+    columns = []
+    bounds = []
+    for num_std in cone_std:
+        columns.extend([float(num_std), float(-num_std)])
+        bounds.extend([cum_mean + cum_std * num_std,
+                       cum_mean - cum_std * num_std])
+
+    return pd.DataFrame(np.column_stack(bounds) if bounds else None,
+                        columns=pd.Float64Index(columns))
+
+
 def summarize_paths(samples, cone_std=(1., 1.5, 2.)):
     """
     Gnerate the upper and lower bounds of an n standard deviation
@@ -1055,24 +1397,32 @@ def summarize_paths(samples, cone_std=(1., 1.5, 2.)):
     samples : pandas.core.frame.DataFrame
 
     """
-    cum_samples = np.cumprod(1 + samples, axis=1) * 1.
-    cum_mean = cum_samples.mean(axis=0)
-    cum_std = cum_samples.std(axis=0)
+    samples = np.asarray(samples)
+    cum_samples = _cumulate_paths(
+        samples.astype(np.result_type(samples, np.float32)))
+    # Accumulate in float64 even when the paths are float32.
+    cum_mean = cum_samples.mean(axis=0, dtype=np.float64)
+    cum_std = cum_samples.std(axis=0, dtype=np.float64)
 
-    if isinstance(cone_std, (float, int)):
-        cone_std = [cone_std]
+    return _cone_bounds(cum_mean, cum_std, cone_std)
 
-    cone_bounds = pd.DataFrame(columns=pd.Float64Index([]))
-    for num_std in cone_std:
-        cone_bounds.loc[:, float(num_std)] = cum_mean + cum_std * num_std
-        cone_bounds.loc[:, float(-num_std)] = cum_mean - cum_std * num_std
 
-    return cone_bounds
+def _iter_cum_paths(is_returns, num_days, num_samples, random_seed,
+                    chunk_size, dtype):
+    values = np.asarray(is_returns, dtype=dtype)
+    random_state = np.random.RandomState(seed=random_seed)
+    if chunk_size is None:
+        chunk_size = num_samples
+    for begin in range(0, num_samples, chunk_size):
+        size = min(chunk_size, num_samples - begin)
+        yield _cumulate_paths(_draw_paths(values, num_days, size,
+                                          random_state))
 
 
 def forecast_cone_bootstrap(is_returns, num_days, cone_std=(1., 1.5, 2.),
                             starting_value=1, num_samples=1000,
-                            random_seed=None):
+                            random_seed=None, chunk_size=None,
+                            dtype=np.float64):
     """
     Determines the upper and lower bounds of an n standard deviation
     cone of forecasted cumulative returns. Future cumulative mean and
@@ -1101,6 +1451,12 @@ def forecast_cone_bootstrap(is_returns, num_days, cone_std=(1., 1.5, 2.),
     random_seed : int
         Seed for the pseudorandom number generator used by the pandas
         sample method.
+    chunk_size : int (optional)
+        If set, paths are drawn and summarized this many at a time, so
+        that only chunk_size paths are held in memory. The result is the
+        same as drawing all of them at once.
+    dtype : numpy.dtype
+        Type used for the paths, np.float64 or np.float32.
 
     Returns
     -------
@@ -1111,20 +1467,98 @@ def forecast_cone_bootstrap(is_returns, num_days, cone_std=(1., 1.5, 2.),
         cumulative returns.
     """
 
-    samples = simulate_paths(
-        is_returns=is_returns,
-        num_days=num_days,
-        starting_value=starting_value,
-        num_samples=num_samples,
-        random_seed=random_seed
-    )
+    count = 0
+    cum_mean = np.zeros(num_days)
+    cum_m2 = np.zeros(num_days)
+    for cum_samples in _iter_cum_paths(is_returns, num_days, num_samples,
+                                       random_seed, chunk_size, dtype):
+        # Merge the mean and the sum of squared deviations of each chunk
+        # (Chan et al.).
+        chunk_count = len(cum_samples)
+        chunk_mean = cum_samples.mean(axis=0, dtype=np.float64)
+        chunk_m2 = cum_samples.var(axis=0, dtype=np.float64) * chunk_count
+        total = count + chunk_count
+        delta = chunk_mean - cum_mean
+        cum_mean += delta * chunk_count / total
+        cum_m2 += chunk_m2 + delta ** 2 * count * chunk_count / total
+        count = total
+
+    return _cone_bounds(cum_mean, np.sqrt(cum_m2 / count), cone_std)
+
+
+def forecast_quantiles_bootstrap(is_returns, num_days,
+                                 quantiles=(5., 25., 50., 75., 95.),
+                                 num_samples=1000, random_seed=None,
+                                 chunk_size=None, num_bins=4096,
+                                 dtype=np.float64):
+    """
+    Determines quantiles of forecasted cumulative returns by repeatedly
+    sampling from the in-sample daily returns (i.e. bootstrap).
 
-    cone_bounds = summarize_paths(
-        samples=samples,
-        cone_std=cone_std
-    )
+    Parameters
+    ----------
+    is_returns : pd.Series
+        In-sample daily returns of the strategy, noncumulative.
+         - See full explanation in tears.create_full_tear_sheet.
+    num_days : int
+        Number of days to project the quantiles forward.
+    quantiles : list of int/float
+        Quantiles to calculate, between 0 and 100.
+    num_samples : int
+        Number of samples to draw from the in-sample daily returns.
+    random_seed : int
+        Seed for the pseudorandom number generator.
+    chunk_size : int (optional)
+        If set and smaller than num_samples, paths are drawn this many at
+        a time and only a histogram of the log cumulative returns of each
+        day is kept. The quantiles are then approximate, within one bin
+        of the exact value.
+    num_bins : int
+        Number of histogram bins for each day when chunk_size is set.
+    dtype : numpy.dtype
+        Type used for the paths, np.float64 or np.float32.
+
+    Returns
+    -------
+    pd.DataFrame
+        Cumulative returns for each day, with a column per quantile.
+    """
 
-    return cone_bounds
+    columns = pd.Float64Index([float(q) for q in quantiles])
+    if chunk_size is None or chunk_size >= num_samples:
+        cum_samples = next(_iter_cum_paths(is_returns, num_days, num_samples,
+                                           random_seed, None, dtype))
+        return pd.DataFrame(
+            np.percentile(cum_samples, list(columns), axis=0).T,
+            columns=columns)
+
+    # Daily log returns are bounded, so the log cumulative returns of day d
+    # fall between d times the smallest and the largest of them.
+    log_returns = np.log1p(np.asarray(is_returns, dtype=np.float64))
+    days = np.arange(1, num_days + 1)
+    lower = days * log_returns.min()
+    width = days * (log_returns.max() - log_returns.min()) / num_bins
+    scale = np.zeros(num_days)
+    scale[width > 0] = 1. / width[width > 0]
+    offsets = np.arange(num_days) * num_bins
+
+    counts = np.zeros(num_days * num_bins, dtype=np.int64)
+    for cum_samples in _iter_cum_paths(is_returns, num_days, num_samples,
+                                       random_seed, chunk_size, dtype):
+        bins = ((np.log(cum_samples) - lower) * scale).astype(np.int64)
+        np.clip(bins, 0, num_bins - 1, out=bins)
+        bins += offsets
+        counts += np.bincount(bins.ravel(), minlength=len(counts))
+
+    cum_counts = counts.reshape(num_days, num_bins).cumsum(axis=1)
+    out = np.empty((num_days, len(columns)))
+    for i, q in enumerate(columns):
+        # First bin that holds the value at rank q, as np.percentile.
+        rank = q / 100. * (num_samples - 1)
+        bins = (cum_counts <= rank).sum(axis=1)
+        out[:, i] = np.exp(lower + (bins + 0.5) * width)
+
+    return pd.DataFrame(out, columns=columns)
 
 
 def extract_interesting_date_ranges(returns):
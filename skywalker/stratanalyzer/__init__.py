@@ -35,3 +35,8 @@ class StrategyAnalyzer(object):
 
     def beforeOnBars(self, strat, bars):
         pass
+
+    def onEquityEvent(self, strat, event):
+        """Called after the broker positions were adjusted for a :class:`skywalker.barfeed.equityevent.EquityEvent`
+        on an instrument with an open position, before :meth:`beforeOnBars`."""
+        pass
@@ -51,181 +51,28 @@ class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns,
         self.__equityList = []
         self.__cashList = []
         self.__barsList = []
-        self.__buyPricesList = []
-        self.__buySharesList = []
-        self.__sellShortPricesList = []
-        self.__sellShortSharesList = []
-        self.__holdingCostList = []
-        self.__buyPricesDict = {}
-        self.__buySharesDict = {}
-        self.__sellShortPricesDict = {}
-        self.__sellShortSharesDict = {}
-        self.__positionsListByOrder = [{}]
 
     def __onOrderEvent(self, broker_, orderEvent):
         if orderEvent.getEventType() not in (broker.OrderEvent.Type.PARTIALLY_FILLED, broker.OrderEvent.Type.FILLED):
             return
         order = orderEvent.getOrder()
         execInfo = orderEvent.getEventInfo()
-        pos = broker_.getPositions()
-        positions = {}
-        for k, v in pos.iteritems():
-            positions[k] = v
-        prePostitions = self.__positionsListByOrder[-1]
-        fillPrice = execInfo.getPrice()
-        shares = order.getFilled()
         instrument = order.getInstrument()
-        if instrument not in self.__buyPricesDict.keys():
-            self.__buyPricesDict[instrument] = []
-        if instrument not in self.__buySharesDict.keys():
-            self.__buySharesDict[instrument] = []
-        if instrument not in self.__sellShortPricesDict.keys():
-            self.__sellShortPricesDict[instrument] = []
-        if instrument not in self.__sellShortSharesDict.keys():
-            self.__sellShortSharesDict[instrument] = []
-
-        if order.getAction() == 1 and shares != 0:  # buy
-            if instrument not in prePostitions.keys() or prePostitions[instrument] >= 0:  # 当前仓位为零或为正
-                # print '当前仓位为零或为正'
-                self.__tradesListDict['return'].append('None')
-                self.__tradesListDict['returnrate'].append('None')
-                self.__buyPricesDict[instrument].append(fillPrice)
-                self.__buySharesDict[instrument].append(shares)
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__buyPricesDict[instrument],
-                                                                shareslist=self.__buySharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['shares'].append(order.getFilled())
-            elif -prePostitions[instrument] >= shares:
-                # 空单部分平仓
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                                shareslist=self.__sellShortSharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['return'].append(-(fillPrice - avgHoldingCost) * shares)
-                self.__tradesListDict['returnrate'].append(-(fillPrice - avgHoldingCost) / avgHoldingCost)
-                self.__sellShortPricesDict[instrument].append(avgHoldingCost)
-                self.__sellShortSharesDict[instrument].append(-shares)
-                self.__tradesListDict['shares'].append(order.getFilled())
-
-            elif -prePostitions[instrument] < shares:
-                # print shares
-                # 所有空单平仓
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                                shareslist=self.__sellShortSharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['return'].append(-(fillPrice - avgHoldingCost) * (-prePostitions[instrument]))
-                self.__tradesListDict['returnrate'].append(-(fillPrice - avgHoldingCost) / avgHoldingCost)
-                self.__sellShortPricesDict[instrument].append(avgHoldingCost)
-                self.__sellShortSharesDict[instrument].append(prePostitions[instrument])
-                self.__tradesListDict['type'].append(self.__actionList[order.getAction() - 1])
-                self.__tradesListDict['date'].append(execInfo.getDateTime().strftime('%Y-%m-%d'))
-                self.__tradesListDict['price'].append(execInfo.getPrice())
-                self.__tradesListDict['shares'].append(-prePostitions[instrument])
-                self.__tradesListDict['instrument'].append(instrument)
-                if instrument not in positions.keys():
-                    self.__tradesListDict['position'].append(0)
-                else:
-                    self.__tradesListDict['position'].append(0)
-                # 反手做多
-                self.__tradesListDict['return'].append('None')
-                self.__tradesListDict['returnrate'].append('None')
-                self.__buyPricesDict[instrument].append(fillPrice)
-                self.__buySharesDict[instrument].append(shares - prePostitions[instrument])
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__buyPricesDict[instrument],
-                                                                shareslist=self.__buySharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['shares'].append(shares - prePostitions[instrument])
-
-        elif order.getAction() == 4 and shares != 0:  # sell short
-            self.__sellShortPricesDict[instrument].append(fillPrice)
-            self.__sellShortSharesDict[instrument].append(shares)
-            self.__tradesListDict['return'].append('None')
-            self.__tradesListDict['returnrate'].append('None')
-            avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                            shareslist=self.__sellShortPricesDict[instrument])
-            self.__tradesListDict['cost'].append(avgHoldingCost)
-            self.__tradesListDict['shares'].append(order.getFilled())
-
-        elif order.getAction() == 2 and shares != 0:  # buy to covrt
-            avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                            shareslist=self.__sellShortSharesDict[instrument])
-            self.__tradesListDict['cost'].append(avgHoldingCost)
-            self.__tradesListDict['return'].append(-(fillPrice - avgHoldingCost) * shares)
-            self.__tradesListDict['returnrate'].append(-(fillPrice - avgHoldingCost) / avgHoldingCost)
-            self.__sellShortPricesDict[instrument].append(avgHoldingCost)
-            self.__sellShortSharesDict[instrument].append(-shares)
-            self.__tradesListDict['shares'].append(order.getFilled())
-
-        elif order.getAction() == 3 and shares != 0:  # sell
-            if instrument not in prePostitions.keys() or prePostitions[instrument] <= 0:
-                self.__sellShortPricesDict[instrument].append(fillPrice)
-                self.__sellShortSharesDict[instrument].append(shares)
-                self.__tradesListDict['return'].append('None')
-                self.__tradesListDict['returnrate'].append('None')
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                                shareslist=self.__sellShortPricesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['shares'].append(order.getFilled())
-
-            elif prePostitions[instrument] < shares and prePostitions[instrument] > 0:
-
-                # 所有多单平仓
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__buyPricesDict[instrument],
-                                                                shareslist=self.__buySharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                # print (fillPrice - avgHoldingCost) * prePostitions[instrument]
-                self.__tradesListDict['return'].append((fillPrice - avgHoldingCost) * prePostitions[instrument])
-                self.__tradesListDict['returnrate'].append((fillPrice - avgHoldingCost) / avgHoldingCost)
-                self.__buyPricesDict[instrument].append(avgHoldingCost)
-                self.__buySharesDict[instrument].append(-prePostitions[instrument])
-
-                self.__tradesListDict['type'].append(self.__actionList[order.getAction() - 1])
-                self.__tradesListDict['date'].append(execInfo.getDateTime().strftime('%Y-%m-%d'))
-                self.__tradesListDict['price'].append(execInfo.getPrice())
-                self.__tradesListDict['shares'].append(prePostitions[instrument])
-                self.__tradesListDict['instrument'].append(instrument)
-                if instrument not in positions.keys():
-                    self.__tradesListDict['position'].append(0)
-                else:
-                    self.__tradesListDict['position'].append(0)
-                # 反手做空
-                self.__sellShortPricesDict[instrument].append(fillPrice)
-
-                self.__sellShortSharesDict[instrument].append(shares - prePostitions[instrument])
-                self.__tradesListDict['return'].append('None')
-                self.__tradesListDict['returnrate'].append('None')
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                                shareslist=self.__sellShortPricesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['shares'].append(shares - prePostitions[instrument])
-
-            elif prePostitions[instrument] >= shares:
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__buyPricesDict[instrument],
-                                                                shareslist=self.__buySharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['return'].append((fillPrice - avgHoldingCost) * shares)
-                self.__tradesListDict['returnrate'].append((fillPrice - avgHoldingCost) / avgHoldingCost)
-                self.__buyPricesDict[instrument].append(avgHoldingCost)
-                self.__buySharesDict[instrument].append(-shares)
-                self.__tradesListDict['shares'].append(order.getFilled())
-
-        self.__tradesListDict['type'].append(self.__actionList[order.getAction() - 1])
-        self.__tradesListDict['date'].append(execInfo.getDateTime().strftime('%Y-%m-%d'))
-        self.__tradesListDict['price'].append(execInfo.getPrice())
-        # self.__tradesListDict['shares'].append(order.getFilled())
-        self.__tradesListDict['instrument'].append(instrument)
-        if instrument not in positions.keys():
-            self.__tradesListDict['position'].append(0)
+        action = self.__actionList[order.getAction() - 1]
+        # Trades在本函数之前订阅订单事件，持仓账本中已经记录了本次成交
+        trades.appendLedgerFill(self.__tradesListDict, action, execInfo.getDateTime(),
+                                self.getLedger().getLastFill(instrument))
+        # 获取发生交易时的股价用于计算滑价，通过时间索引查找bar的位置
+        barDS = self.__strat.getFeed()[order.getInstrument()]
+        index = barDS.getCloseDataSeries().getDateTimeIndex(execInfo.getDateTime())
+        if index is None:
+            # 成交时的bar已超出maxLen
+            self.__momentPrice = execInfo.getPrice()
+        elif order.getFillOnClose():
+            self.__momentPrice = barDS.getCloseDataSeries()[index]
         else:
-            self.__tradesListDict['position'].append(positions[instrument])
-        # 获取发生交易时的股价用于计算滑价
-        index = self.__strat.getFeed()[order.getInstrument()].getCloseDataSeries().getDateTimes().index(
-            execInfo.getDateTime())
-        if order.getFillOnClose():
-            self.__momentPrice = self.__strat.getFeed()[order.getInstrument()].getCloseDataSeries()[index]
-        else:
-            self.__momentPrice = self.__strat.getFeed()[order.getInstrument()].getOpenDataSeries()[index]
+            self.__momentPrice = barDS.getOpenDataSeries()[index]
         self.__totalSlippage = self.__totalSlippage + broker_.getFillStrategy().getSlippageModel().getSlippagePerShare() * order.getFilled()
-        self.__positionsListByOrder.append(positions)
 
     def beforeAttach(self, strat):
         super(analyzer_skysense, self).beforeAttach(strat)
@@ -274,16 +121,6 @@ class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns,
         self.__benchmarkList.append(self.__presentBenchmark)
         self.__report = None
 
-    def __calculateAvgHoldingCost(self, pricelist, shareslist):
-        """计算平均持股成本"""
-        assert len(pricelist) == len(shareslist)
-        totalPrices = 0
-        totalShares = 0
-        for i in range(0, len(pricelist)):
-            totalPrices = totalPrices + pricelist[i] * shareslist[i]
-            totalShares = totalShares + shareslist[i]
-        return totalPrices / totalShares
-
     def getCount(self):
         """Returns the total number of trades."""
         count = [i for i in self.__tradesListDict["return"] if i != 'None']
@@ -9,25 +9,29 @@ from skywalker import broker
 from skywalker import dataseries
 from skywalker.stratanalyzer import drawdown
 from skywalker.stratanalyzer import excelreport
+from skywalker.stratanalyzer import recorder
 from skywalker.stratanalyzer import returns
+from skywalker.stratanalyzer import rollingstats
 from skywalker.stratanalyzer import sharpe
 from skywalker.stratanalyzer import trades
-from skywalker.stratanalyzer.maxdrawdown import calculateMaxDrawDown
 
 
 class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns, trades.Trades):
-    """继承了pyalgotrade的所有analyzer，并添加了策略回测绩效报告中需要的功能"""
+    """继承了pyalgotrade的所有analyzer，并添加了策略回测绩效报告中需要的功能
 
-    def __init__(self, maxLen=None):
+    :param maxLen: The maximum number of values to hold in the returns data series.
+    :param spillDir: A directory where the per bar values are spilled to once they exceed chunkSize, or None to keep
+        them in memory.
+    :param chunkSize: The number of per bar values to keep in memory before spilling them.
+    :param recordBars: True to record the bars, needed by :meth:`getBarsList`.
+    """
+
+    def __init__(self, maxLen=None, spillDir=None, chunkSize=recorder.DEFAULT_CHUNK_SIZE, recordBars=True):
         super(analyzer_skysense, self).__init__()
         self.__netReturns = dataseries.SequenceDataSeries(maxLen=maxLen)
         self.__cumReturns = dataseries.SequenceDataSeries(maxLen=maxLen)
         self.__benchmarkDailyReturns = dataseries.SequenceDataSeries(maxLen=maxLen)
         self.__benchmarkCumuReturns = dataseries.SequenceDataSeries(maxLen=maxLen)
-        self.__benchmarkList = []
-        self.__dailyPeriodAnalysis = {'Date': [], 'profit': [], 'profitratio': []}
-        self.__presentEquity = None
-        self.__lastEquity = None
         self.__presentBenchmark = None
         self.__lastBenchmark = None
         self.__strat = None
@@ -48,21 +52,8 @@ class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns,
         self.__long = 0
         self.__short = 0
         self.__countTrades = 0
-        self.__positionsList = []
-        self.__dateTimeList = []
-        self.__equityList = []
-        self.__cashList = []
-        self.__barsList = []
-        self.__buyPricesList = []
-        self.__buySharesList = []
-        self.__sellShortPricesList = []
-        self.__sellShortSharesList = []
-        self.__holdingCostList = []
-        self.__buyPricesDict = {}
-        self.__buySharesDict = {}
-        self.__sellShortPricesDict = {}
-        self.__sellShortSharesDict = {}
-        self.__positionsListByOrder = [{}]
+        # 每个bar的时间、权益、现金、基准、仓位和行情
+        self.__recorder = recorder.AnalyzerRecorder(spillDir=spillDir, chunkSize=chunkSize, recordBars=recordBars)
         self.__orderDatetimeList = []
 
     def __onOrderEvent(self, broker_, orderEvent):
@@ -70,166 +61,22 @@ class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns,
             return
         order = orderEvent.getOrder()
         execInfo = orderEvent.getEventInfo()
-        pos = broker_.getPositions()
-        positions = {k: v for k, v in pos.items()}
-        prePostitions = self.__positionsListByOrder[-1]
-        fillPrice = execInfo.getPrice()
-        shares = order.getFilled()
         instrument = order.getInstrument()
-        if instrument not in self.__buyPricesDict.keys():
-            self.__buyPricesDict[instrument] = []
-        if instrument not in self.__buySharesDict.keys():
-            self.__buySharesDict[instrument] = []
-        if instrument not in self.__sellShortPricesDict.keys():
-            self.__sellShortPricesDict[instrument] = []
-        if instrument not in self.__sellShortSharesDict.keys():
-            self.__sellShortSharesDict[instrument] = []
-
-        if order.getAction() == 1 and shares != 0:  # buy
-            if instrument not in prePostitions.keys() or prePostitions[instrument] >= 0:  # 当前仓位为零或为正
-                # print '当前仓位为零或为正'
-                self.__tradesListDict['return'].append('None')
-                self.__tradesListDict['returnrate'].append('None')
-                self.__buyPricesDict[instrument].append(fillPrice)
-                self.__buySharesDict[instrument].append(shares)
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__buyPricesDict[instrument],
-                                                                shareslist=self.__buySharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['shares'].append(order.getFilled())
-            elif -prePostitions[instrument] >= shares:
-                # 空单部分平仓
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                                shareslist=self.__sellShortSharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['return'].append(-(fillPrice - avgHoldingCost) * shares)
-                self.__tradesListDict['returnrate'].append(-(fillPrice - avgHoldingCost) / avgHoldingCost)
-                self.__sellShortPricesDict[instrument].append(avgHoldingCost)
-                self.__sellShortSharesDict[instrument].append(-shares)
-                self.__tradesListDict['shares'].append(order.getFilled())
-
-            elif -prePostitions[instrument] < shares:
-                # print shares
-                # 所有空单平仓
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                                shareslist=self.__sellShortSharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['return'].append(-(fillPrice - avgHoldingCost) * (-prePostitions[instrument]))
-                self.__tradesListDict['returnrate'].append(-(fillPrice - avgHoldingCost) / avgHoldingCost)
-                self.__sellShortPricesDict[instrument].append(avgHoldingCost)
-                self.__sellShortSharesDict[instrument].append(prePostitions[instrument])
-                self.__tradesListDict['type'].append(self.__actionList[order.getAction() - 1])
-                self.__tradesListDict['date'].append(execInfo.getDateTime().strftime('%Y-%m-%d'))
-                self.__tradesListDict['datetime'].append(execInfo.getDateTime())
-                self.__tradesListDict['price'].append(execInfo.getPrice())
-                self.__tradesListDict['shares'].append(-prePostitions[instrument])
-                self.__tradesListDict['instrument'].append(instrument)
-                if instrument not in positions.keys():
-                    self.__tradesListDict['position'].append(0)
-                else:
-                    self.__tradesListDict['position'].append(0)
-                # 反手做多
-                self.__tradesListDict['return'].append('None')
-                self.__tradesListDict['returnrate'].append('None')
-                self.__buyPricesDict[instrument].append(fillPrice)
-                self.__buySharesDict[instrument].append(shares - prePostitions[instrument])
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__buyPricesDict[instrument],
-                                                                shareslist=self.__buySharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['shares'].append(shares - prePostitions[instrument])
-
-        elif order.getAction() == 4 and shares != 0:  # sell short
-            self.__sellShortPricesDict[instrument].append(fillPrice)
-            self.__sellShortSharesDict[instrument].append(shares)
-            self.__tradesListDict['return'].append('None')
-            self.__tradesListDict['returnrate'].append('None')
-            avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                            shareslist=self.__sellShortPricesDict[instrument])
-            self.__tradesListDict['cost'].append(avgHoldingCost)
-            self.__tradesListDict['shares'].append(order.getFilled())
-
-        elif order.getAction() == 2 and shares != 0:  # buy to covrt
-            avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                            shareslist=self.__sellShortSharesDict[instrument])
-            self.__tradesListDict['cost'].append(avgHoldingCost)
-            self.__tradesListDict['return'].append(-(fillPrice - avgHoldingCost) * shares)
-            self.__tradesListDict['returnrate'].append(-(fillPrice - avgHoldingCost) / avgHoldingCost)
-            self.__sellShortPricesDict[instrument].append(avgHoldingCost)
-            self.__sellShortSharesDict[instrument].append(-shares)
-            self.__tradesListDict['shares'].append(order.getFilled())
-
-        elif order.getAction() == 3 and shares != 0:  # sell
-            if instrument not in prePostitions.keys() or prePostitions[instrument] <= 0:
-                self.__sellShortPricesDict[instrument].append(fillPrice)
-                self.__sellShortSharesDict[instrument].append(shares)
-                self.__tradesListDict['return'].append('None')
-                self.__tradesListDict['returnrate'].append('None')
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                                shareslist=self.__sellShortPricesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['shares'].append(order.getFilled())
-
-            elif prePostitions[instrument] < shares and prePostitions[instrument] > 0:
-
-                # 所有多单平仓
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__buyPricesDict[instrument],
-                                                                shareslist=self.__buySharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                # print (fillPrice - avgHoldingCost) * prePostitions[instrument]
-                self.__tradesListDict['return'].append((fillPrice - avgHoldingCost) * prePostitions[instrument])
-                self.__tradesListDict['returnrate'].append((fillPrice - avgHoldingCost) / avgHoldingCost)
-                self.__buyPricesDict[instrument].append(avgHoldingCost)
-                self.__buySharesDict[instrument].append(-prePostitions[instrument])
-
-                self.__tradesListDict['type'].append(self.__actionList[order.getAction() - 1])
-                self.__tradesListDict['date'].append(execInfo.getDateTime().strftime('%Y-%m-%d'))
-                self.__tradesListDict['datetime'].append(execInfo.getDateTime())
-                self.__tradesListDict['price'].append(execInfo.getPrice())
-                self.__tradesListDict['shares'].append(prePostitions[instrument])
-                self.__tradesListDict['instrument'].append(instrument)
-                if instrument not in positions.keys():
-                    self.__tradesListDict['position'].append(0)
-                else:
-                    self.__tradesListDict['position'].append(0)
-                # 反手做空
-                self.__sellShortPricesDict[instrument].append(fillPrice)
-
-                self.__sellShortSharesDict[instrument].append(shares - prePostitions[instrument])
-                self.__tradesListDict['return'].append('None')
-                self.__tradesListDict['returnrate'].append('None')
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__sellShortPricesDict[instrument],
-                                                                shareslist=self.__sellShortPricesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['shares'].append(shares - prePostitions[instrument])
-
-            elif prePostitions[instrument] >= shares:
-                avgHoldingCost = self.__calculateAvgHoldingCost(pricelist=self.__buyPricesDict[instrument],
-                                                                shareslist=self.__buySharesDict[instrument])
-                self.__tradesListDict['cost'].append(avgHoldingCost)
-                self.__tradesListDict['return'].append((fillPrice - avgHoldingCost) * shares)
-                self.__tradesListDict['returnrate'].append((fillPrice - avgHoldingCost) / avgHoldingCost)
-                self.__buyPricesDict[instrument].append(avgHoldingCost)
-                self.__buySharesDict[instrument].append(-shares)
-                self.__tradesListDict['shares'].append(order.getFilled())
-
-        self.__tradesListDict['type'].append(self.__actionList[order.getAction() - 1])
-        self.__tradesListDict['date'].append(execInfo.getDateTime().strftime('%Y-%m-%d'))
-        self.__tradesListDict['datetime'].append(execInfo.getDateTime())
-        self.__tradesListDict['price'].append(execInfo.getPrice())
-        # self.__tradesListDict['shares'].append(order.getFilled())
-        self.__tradesListDict['instrument'].append(instrument)
-        if instrument not in positions.keys():
-            self.__tradesListDict['position'].append(0)
-        else:
-            self.__tradesListDict['position'].append(positions[instrument])
-        # 获取发生交易时的股价用于计算滑价
-        index = self.__strat.getFeed()[order.getInstrument()].getCloseDataSeries().getDateTimes().index(
-            execInfo.getDateTime())
-        if order.getFillOnClose():
-            self.__momentPrice = self.__strat.getFeed()[order.getInstrument()].getCloseDataSeries()[index]
+        action = self.__actionList[order.getAction() - 1]
+        # Trades在本函数之前订阅订单事件，持仓账本中已经记录了本次成交
+        trades.appendLedgerFill(self.__tradesListDict, action, execInfo.getDateTime(),
+                                self.getLedger().getLastFill(instrument))
+        # 获取发生交易时的股价用于计算滑价，通过时间索引查找bar的位置
+        barDS = self.__strat.getFeed()[order.getInstrument()]
+        index = barDS.getCloseDataSeries().getDateTimeIndex(execInfo.getDateTime())
+        if index is None:
+            # 成交时的bar已超出maxLen
+            self.__momentPrice = execInfo.getPrice()
+        elif order.getFillOnClose():
+            self.__momentPrice = barDS.getCloseDataSeries()[index]
         else:
-            self.__momentPrice = self.__strat.getFeed()[order.getInstrument()].getOpenDataSeries()[index]
+            self.__momentPrice = barDS.getOpenDataSeries()[index]
         self.__totalSlippage = self.__totalSlippage + broker_.getFillStrategy().getSlippageModel().getSlippagePerShare() * order.getFilled()
-        self.__positionsListByOrder.append(positions)
 
     def beforeAttach(self, strat):
         super(analyzer_skysense, self).beforeAttach(strat)
@@ -244,25 +91,6 @@ class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns,
     def beforeOnBars(self, strat, bars):
         super(analyzer_skysense, self).beforeOnBars(strat, bars)
         broker = strat.getBroker()
-        # 周期分析
-        if self.__presentEquity is None and self.__lastEquity is None:
-            self.__lastEquity = strat.getEquity()
-            self.__presentEquity = strat.getEquity()
-        else:
-            self.__lastEquity = self.__presentEquity
-            self.__presentEquity = strat.getEquity()
-        self.__dailyPeriodAnalysis['Date'].append(bars.getDateTime().strftime('%Y-%m-%d'))
-        self.__dailyPeriodAnalysis['profit'].append(self.__presentEquity - self.__lastEquity)
-        self.__dailyPeriodAnalysis['profitratio'].append((self.__presentEquity - self.__lastEquity) / self.__lastEquity)
-        # 生成时间序列和每日仓位列表
-        pos = strat.getBroker().getPositions()
-        # 使用strat.getBroker().getPositions()获取的仓位字典存在一些问题，重新生成一个相同内容的字典后将其加入仓位列表中
-        dic = {k: v for k, v in pos.items()}
-        self.__positionsList.append(dic)
-        self.__dateTimeList.append(bars.getDateTime())
-        self.__equityList.append(broker.getEquity())
-        self.__cashList.append(broker.getCash())
-        self.__barsList.append(bars)
         if bars.getBar(strat.getBenchmark()) is not None:
             self.__lastBenchmark = self.__presentBenchmark
             self.__presentBenchmark = bars.getBar(strat.getBenchmark()).getClose()
@@ -271,16 +99,11 @@ class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns,
         else:
             self.__benchmarkDailyReturns.appendWithDateTime(bars.getDateTime(), (
             self.__presentBenchmark - self.__lastBenchmark) / self.__lastBenchmark)
-        self.__benchmarkList.append(self.__presentBenchmark)
+        # 记录时间序列、权益、现金、基准和仓位，仓位只保存变化的部分
+        self.__recorder.append(bars.getDateTime(), broker.getEquity(), broker.getCash(), self.__presentBenchmark,
+                               broker.getPositions(), bars)
         self.__report = None
 
-    def __calculateAvgHoldingCost(self, pricelist, shareslist):
-        """计算平均持股成本"""
-        assert len(pricelist) == len(shareslist)
-        totalPrices = sum([price * share for price, share in zip(pricelist, shareslist)])
-        totalShares = sum(shareslist)
-        return totalPrices / totalShares
-
     def getCount(self):
         """Returns the total number of trades."""
         count = [i for i in self.__tradesListDict["return"] if i != 'None']
@@ -348,8 +171,18 @@ class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns,
         return np.asarray(negativeReturns)
 
     def getDailyPeriodAnalysis(self):
-        """策略回测绩效报告中的周期分析"""
-        return self.__dailyPeriodAnalysis
+        """策略回测绩效报告中的周期分析，由每日权益计算"""
+        equity = self.__recorder.getEquity()
+        profit = np.zeros(len(equity))
+        profitRatio = np.zeros(len(equity))
+        if len(equity):
+            profit[1:] = np.diff(equity)
+            profitRatio[1:] = profit[1:] / equity[:-1]
+        return {
+            'Date': [dateTime.strftime('%Y-%m-%d') for dateTime in self.__recorder.getDateTimeList()],
+            'profit': profit.tolist(),
+            'profitratio': profitRatio.tolist()
+        }
 
     def getWinningRatio(self):
         """胜率"""
@@ -397,7 +230,8 @@ class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns,
 
     def getTradePeriod(self):
         """交易周期"""
-        return self.__dateTimeList[-1] - self.__dateTimeList[0]
+        dateTimeList = self.getDateTimeList()
+        return dateTimeList[-1] - dateTimeList[0]
 
     def getStratRunTime(self):
         """策略运行时间"""
@@ -426,47 +260,49 @@ class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns,
 
     def getPositionsList(self):
         """每日仓位列表"""
-        return self.__positionsList
+        return self.__recorder.getPositionsList()
 
     def getDateTimeList(self):
         """日期列表"""
-        return self.__dateTimeList
+        return self.__recorder.getDateTimeList()
 
     def getEquityList(self):
         """每日权益列表"""
-        return self.__equityList
+        return self.__recorder.getEquityList()
 
     def getCashList(self):
         """每日现金列表"""
-        return self.__cashList
+        return self.__recorder.getCashList()
 
     def getBarsList(self):
         """每日k线"""
-        return self.__barsList
+        return self.__recorder.getBarsList()
 
     def getEmptyDurationDict(self):
         """空仓期字典，包含空仓开始时间，结束时间和空仓期"""
         ret = {'start': [], 'end': [], 'duration': []}
-        for i in range(0, len(self.__dateTimeList)):
+        dateTimeList = self.getDateTimeList()
+        positionsList = self.getPositionsList()
+        for i in range(0, len(dateTimeList)):
             if i == 0:
-                if not self.__positionsList[i].keys():
-                    ret['start'].append(self.__dateTimeList[i])
-            elif i == len(self.__dateTimeList) - 1:
-                if not self.__positionsList[i].keys() and self.__positionsList[i - 1].keys():
-                    ret['start'].append(self.__dateTimeList[i])
-                    ret['end'].append(self.__dateTimeList[i] + datetime.timedelta(days=1))
+                if not positionsList[i].keys():
+                    ret['start'].append(dateTimeList[i])
+            elif i == len(dateTimeList) - 1:
+                if not positionsList[i].keys() and positionsList[i - 1].keys():
+                    ret['start'].append(dateTimeList[i])
+                    ret['end'].append(dateTimeList[i] + datetime.timedelta(days=1))
                     ret['duration'].append(ret['end'][-1] - ret['start'][-1])
-                elif not self.__positionsList[i].keys() and not self.__positionsList[i - 1].keys():
-                    ret['end'].append(self.__dateTimeList[i] + datetime.timedelta(days=1))
+                elif not positionsList[i].keys() and not positionsList[i - 1].keys():
+                    ret['end'].append(dateTimeList[i] + datetime.timedelta(days=1))
                     ret['duration'].append(ret['end'][-1] - ret['start'][-1])
-                elif self.__positionsList[i].keys() and not self.__positionsList[i - 1].keys():
-                    ret['end'].append(self.__dateTimeList[i])
+                elif positionsList[i].keys() and not positionsList[i - 1].keys():
+                    ret['end'].append(dateTimeList[i])
                     ret['duration'].append(ret['end'][-1] - ret['start'][-1])
             else:
-                if not self.__positionsList[i].keys() and self.__positionsList[i - 1].keys():
-                    ret['start'].append(self.__dateTimeList[i])
-                elif self.__positionsList[i].keys() and not self.__positionsList[i - 1].keys():
-                    ret['end'].append(self.__dateTimeList[i])
+                if not positionsList[i].keys() and positionsList[i - 1].keys():
+                    ret['start'].append(dateTimeList[i])
+                elif positionsList[i].keys() and not positionsList[i - 1].keys():
+                    ret['end'].append(dateTimeList[i])
                     ret['duration'].append(ret['end'][-1] - ret['start'][-1])
         return ret
 
@@ -529,7 +365,7 @@ class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns,
         return self.__benchmarkDailyReturns
 
     def getBenchmarkList(self):
-        return self.__benchmarkList
+        return self.__recorder.getBenchmarkList()
 
     def getBenchmarkCumuReturns(self):
         cumuReturns = dataseries.SequenceDataSeries(maxLen=None)
@@ -653,293 +489,48 @@ class analyzer_skysense(sharpe.SharpeRatio, drawdown.DrawDown, returns.Returns,
         self.__report.save()
         print("绩效报告生成完毕")
 
-    def __countMonth(self):
-        dateList = self.getDateTimeList()
-        result = []
-        for i in range(0, len(dateList)):
-            dict = {}
-            year = dateList[i].year
-            month = dateList[i].month
-            if i == 0:
-                result.append([dateList[i]])
-            elif dateList[i].month != dateList[i - 1].month and i != len(dateList) - 1:
-                result[-1].append(dateList[i - 1])
-                result.append([dateList[i]])
-            elif i == len(dateList) - 1:
-                if dateList[i].month != dateList[i - 1].month:
-                    result[-1].append(dateList[i - 1])
-                    result.append([dateList[i], dateList[i]])
-                else:
-                    result[-1].append(dateList[i])
-        return result
+    def __getRollingStats(self):
+        windows = rollingstats.MonthlyWindows(self.getDateTimeList())
+        return rollingstats.RollingStats(windows, self.getReturns()[0:], self.getBenchmarkDailyReturns()[0:])
+
+    def __buildDictByMonth(self, windows, valuesFun):
+        ret = {u'Date': windows.getLabels()}
+        for n, key in ((1, u'1 Month'), (3, u'3 Months'), (6, u'6 Months'), (12, u'12 Months')):
+            ret[key] = valuesFun(n)
+        return ret
 
     def getVolatilityDict(self):
-        volatilityDict = {u'1 Month': [],
-                          u'3 Months': [],
-                          u'6 Months': [],
-                          u'12 Months': []
-                          }
-        startEndList = self.__countMonth()
-        returns = self.getReturns()[0:]
-        dateList = self.getDateTimeList()
-        volatilityDict[u'Date'] = [daylist[0].strftime('%Y-%m') for daylist in startEndList]
-        for i in range(0, len(volatilityDict['Date'])):
-            volatilityDict[u'1 Month'].append(self.__calculateVolatilityByMonth(i, 1, dateList, startEndList, returns))
-            volatilityDict[u'3 Months'].append(self.__calculateVolatilityByMonth(i, 3, dateList, startEndList, returns))
-            volatilityDict[u'6 Months'].append(self.__calculateVolatilityByMonth(i, 6, dateList, startEndList, returns))
-            volatilityDict[u'12 Months'].append(
-                self.__calculateVolatilityByMonth(i, 12, dateList, startEndList, returns))
-        return volatilityDict
+        stats = self.__getRollingStats()
+        return self.__buildDictByMonth(stats.getWindows(), stats.volatility)
 
     def getSharpeRatioDict(self):
         riskFreeRate = self.__strat.getRiskFreeRate()
-        sharpeRatioDict = {u'1 Month': [],
-                           u'3 Months': [],
-                           u'6 Months': [],
-                           u'12 Months': []
-                           }
-        startEndList = self.__countMonth()
-        returns = self.getReturns()[0:]
-        dateList = self.getDateTimeList()
-        sharpeRatioDict[u'Date'] = [daylist[0].strftime('%Y-%m') for daylist in startEndList]
-        for i in range(0, len(sharpeRatioDict[u'Date'])):
-            sharpeRatioDict[u'1 Month'].append(
-                self.__calculateSharpeByMonth(i, 1, dateList, startEndList, returns, riskFreeRate))
-            sharpeRatioDict[u'3 Months'].append(
-                self.__calculateSharpeByMonth(i, 3, dateList, startEndList, returns, riskFreeRate))
-            sharpeRatioDict[u'6 Months'].append(
-                self.__calculateSharpeByMonth(i, 6, dateList, startEndList, returns, riskFreeRate))
-            sharpeRatioDict[u'12 Months'].append(
-                self.__calculateSharpeByMonth(i, 12, dateList, startEndList, returns, riskFreeRate))
-        return sharpeRatioDict
+        stats = self.__getRollingStats()
+        return self.__buildDictByMonth(stats.getWindows(), lambda n: stats.sharpe(n, riskFreeRate))
 
     def getMaxDrawDownDict(self):
-        maxDrawDownDict = {u'1 Month': [],
-                           u'3 Months': [],
-                           u'6 Months': [],
-                           u'12 Months': []
-                           }
-        startEndList = self.__countMonth()
-        returns = self.getReturns()[0:]
-        dateList = self.getDateTimeList()
-        equityList = self.getEquitySeries()
-        maxDrawDownDict[u'Date'] = [daylist[0].strftime('%Y-%m') for daylist in startEndList]
-        for i in range(0, len(maxDrawDownDict[u'Date'])):
-            maxDrawDownDict[u'1 Month'].append(calculateMaxDrawDown(i, 1, dateList, startEndList, equityList))
-            maxDrawDownDict[u'3 Months'].append(calculateMaxDrawDown(i, 3, dateList, startEndList, equityList))
-            maxDrawDownDict[u'6 Months'].append(calculateMaxDrawDown(i, 6, dateList, startEndList, equityList))
-            maxDrawDownDict[u'12 Months'].append(calculateMaxDrawDown(i, 12, dateList, startEndList, equityList))
-        return maxDrawDownDict
+        windows = rollingstats.MonthlyWindows(self.getDateTimeList())
+        equityList = self.getEquityList()
+        return self.__buildDictByMonth(windows, lambda n: rollingstats.max_drawdowns(windows, equityList, n))
 
     def getBetaDict(self):
-        betaDict = {u'1 Month': [],
-                    u'3 Months': [],
-                    u'6 Months': [],
-                    u'12 Months': []
-                    }
-        startEndList = self.__countMonth()
-        returns = self.getReturns()[0:]
-        benchmarkReturns = self.getBenchmarkDailyReturns()[0:]
-        dateList = self.getDateTimeList()
-        betaDict[u'Date'] = [daylist[0].strftime('%Y-%m') for daylist in startEndList]
-        for i in range(0, len(betaDict[u'Date'])):
-            betaDict[u'1 Month'].append(self.__caculateBeta(i, 1, dateList, startEndList, returns, benchmarkReturns))
-            betaDict[u'3 Months'].append(self.__caculateBeta(i, 3, dateList, startEndList, returns, benchmarkReturns))
-            betaDict[u'6 Months'].append(self.__caculateBeta(i, 6, dateList, startEndList, returns, benchmarkReturns))
-            betaDict[u'12 Months'].append(self.__caculateBeta(i, 12, dateList, startEndList, returns, benchmarkReturns))
-        return betaDict
+        stats = self.__getRollingStats()
+        return self.__buildDictByMonth(stats.getWindows(), stats.beta)
 
     def getIRDict(self, betaDict):
-        IRDict = {u'1 Month': [],
-                  u'3 Months': [],
-                  u'6 Months': [],
-                  u'12 Months': []}
-        startEndList = self.__countMonth()
-        dateList = self.getDateTimeList()
-        IRDict[u'Date'] = [daylist[0].strftime('%Y-%m') for daylist in startEndList]
-        stratReturns = pd.Series(self.getReturns()[0:])
-        benchmarkReturns = pd.Series(self.getBenchmarkDailyReturns()[0:])
-        for i in range(0, len(IRDict[u'Date'])):
-            IRDict[u'1 Month'].append(
-                self.__calculateIR(i, 1, dateList, startEndList, stratReturns, benchmarkReturns, betaDict))
-            IRDict[u'3 Months'].append(
-                self.__calculateIR(i, 3, dateList, startEndList, stratReturns, benchmarkReturns, betaDict))
-            IRDict[u'6 Months'].append(
-                self.__calculateIR(i, 6, dateList, startEndList, stratReturns, benchmarkReturns, betaDict))
-            IRDict[u'12 Months'].append(
-                self.__calculateIR(i, 12, dateList, startEndList, stratReturns, benchmarkReturns, betaDict))
-        return IRDict
+        stats = self.__getRollingStats()
+        return self.__buildDictByMonth(
+            stats.getWindows(), lambda n: stats.informationRatio(n, betaDict[self.__monthsKey(n)])
+        )
 
     def getAlphaDict(self, betaDict):
         riskFreeRate = self.__strat.getRiskFreeRate()
-        alphaDict = {u'1 Month': [],
-                     u'3 Months': [],
-                     u'6 Months': [],
-                     u'12 Months': []}
-        startEndList = self.__countMonth()
-        dateList = self.getDateTimeList()
-        alphaDict[u'Date'] = [daylist[0].strftime('%Y-%m') for daylist in startEndList]
-        stratReturns = pd.Series(self.getReturns()[0:])
-        benchmarkReturns = pd.Series(self.getBenchmarkDailyReturns()[0:])
-        for i in range(0, len(alphaDict[u'Date'])):
-            alphaDict[u'1 Month'].append(
-                self.__calculateAlpha(i, 1, dateList, startEndList, stratReturns, benchmarkReturns, riskFreeRate,
-                                      betaDict))
-            alphaDict[u'3 Months'].append(
-                self.__calculateAlpha(i, 3, dateList, startEndList, stratReturns, benchmarkReturns, riskFreeRate,
-                                      betaDict))
-            alphaDict[u'6 Months'].append(
-                self.__calculateAlpha(i, 6, dateList, startEndList, stratReturns, benchmarkReturns, riskFreeRate,
-                                      betaDict))
-            alphaDict[u'12 Months'].append(
-                self.__calculateAlpha(i, 12, dateList, startEndList, stratReturns, benchmarkReturns, riskFreeRate,
-                                      betaDict))
-        return alphaDict
-
-    def __calculateAlpha(self, monthIndex, n, dateList, startEndList, returns, benchmarkReturns, riskFreeRate,
-                         betaDict):
-        if monthIndex < n - 1:
-            return 'NaN'
-        else:
-            endDay = startEndList[monthIndex][1]
-            endIndex = dateList.index(endDay)
-            endStratReturn = returns[endIndex]
-            endBenchmarkReturn = benchmarkReturns[endIndex]
-            annualizedReturn = endStratReturn * 12 / n
-            annualizedBenchmarkReturn = endBenchmarkReturn * 12 / n
-            if n == 1:
-                beta = betaDict[u'1 Month'][monthIndex]
-            elif n == 3:
-                beta = betaDict[u'3 Months'][monthIndex]
-            elif n == 6:
-                beta = betaDict[u'6 Months'][monthIndex]
-            elif n == 12:
-                beta = betaDict[u'12 Months'][monthIndex]
-            alpha = (annualizedReturn - riskFreeRate) - beta * (annualizedBenchmarkReturn - riskFreeRate)
-            return alpha
-
-    def __calculateIR(self, monthIndex, n, dateList, startEndList, returns, benchmarkReturns, betaDict):
-        if monthIndex < n - 1:
-            return 'NaN'
-        else:
-            startDay = startEndList[monthIndex - n + 1][0]
-            endDay = startEndList[monthIndex][1]
-            startIndex = dateList.index(startDay)
-            endIndex = dateList.index(endDay)
-            stratReturnsBetween = returns[startIndex:endIndex]
-            benchamrkReturnsBetweem = benchmarkReturns[startIndex:endIndex]
-            if n == 1:
-                beta = betaDict[u'1 Month'][monthIndex]
-            elif n == 3:
-                beta = betaDict[u'3 Months'][monthIndex]
-            elif n == 6:
-                beta = betaDict[u'6 Months'][monthIndex]
-            elif n == 12:
-                beta = betaDict[u'12 Months'][monthIndex]
-            residualReturns = stratReturnsBetween - beta * benchamrkReturnsBetweem
-            residualReturnMean = residualReturns.mean()
-            residualRisk = residualReturns.std()
-            try:
-                IR = residualReturnMean / residualRisk
-            except ZeroDivisionError:
-                IR = 'NaN'
-            return IR
-
-    def __caculateBeta(self, monthIndex, n, dateList, startEndList, returns, benchmarkReturns):
-        if monthIndex < n - 1:
-            return 'NaN'
-        else:
-            startDay = startEndList[monthIndex - n + 1][0]
-            endDay = startEndList[monthIndex][1]
-            startIndex = dateList.index(startDay)
-            endIndex = dateList.index(endDay)
-            returnsBetween = returns[startIndex:endIndex]
-            benchamrkReturnsBetweem = benchmarkReturns[startIndex:endIndex]
-            Y = pd.Series(returnsBetween)
-            X = sm.add_constant(benchamrkReturnsBetweem)
-            model = sm.OLS(Y, X)
-            results = model.fit()
-            try:
-                beta = results.params[1]
-            except IndexError:
-                beta = 0
-            # print results.params
-            # print beta
-            return beta
-
-    def __calculateMaxDrawDown(self, monthIndex, n, dateList, startEndList, equityList):
-        # if monthIndex < n-1:
-        #     return 'NaN'
-        # else:
-        #     startDay = startEndList[monthIndex-n+1][0]
-        #     endDay = startEndList[monthIndex][1]
-        #     # startIndex = dateList.index(startDay)
-        #     # endIndex = dateList.index(endDay)
-        #     df = pd.DataFrame(data=equityList, index=dateList,columns=['Equity'])
-        #     # equityBetween = equityList[startIndex:endIndex]
-        #     equityBetween = df[startDay:endDay]['Equity']
-        #     maxDrawDown = 0.0
-        #     maxDrawDownDay = None
-        #     for i in equityBetween.index:
-        #         for j in equityBetween.index:
-        #             drawdown = (equityBetween[j] - equityBetween[i]) / equityBetween[i]
-        #             if -drawdown >= maxDrawDown:
-        #                 maxDrawDown = -drawdown
-        #                 maxDrawDownDay = j
-        #     # maxDrawDownDay = dateList[startIndex:endIndex][maxDrawDownDayIndex].strftime('%Y-%m-%d')
-        #     # maxDrawDownDay = df[startDay:endDay].index[maxDrawDownDayIndex].strftime('%Y-%m-%d')
-        #     maxDrawDownDay = maxDrawDownDay.strftime('%Y-%m-%d')
-        #     maxDDPlusDay = str(maxDrawDown)+'('+maxDrawDownDay+')'
-        #     return maxDDPlusDay
-
-        if monthIndex < n - 1:
-            return 'NaN'
-        else:
-            startDay = startEndList[monthIndex - n + 1][0]
-            endDay = startEndList[monthIndex][1]
-            startIndex = dateList.index(startDay)
-            endIndex = dateList.index(endDay)
-            equityBetween = equityList[startIndex:endIndex]
-            maxDrawDown = 0.0
-            maxDrawDownDayIndex = 0
-            for i in range(0, len(equityBetween)):
-                for j in range(i, len(equityBetween)):
-                    drawdown = (equityBetween[j] - equityBetween[i]) / equityBetween[i]
-                    # maxDrawDown = max(maxDrawDown, -drawdown)
-                    if -drawdown >= maxDrawDown:
-                        maxDrawDown = -drawdown
-                        maxDrawDownDayIndex = j
-                    else:
-                        pass
-            maxDrawDownDay = dateList[startIndex:endIndex][maxDrawDownDayIndex].strftime('%Y-%m-%d')
-            maxDDPlusDay = str(maxDrawDown) + '(' + maxDrawDownDay + ')'
-            return maxDDPlusDay
-
-    def __calculateVolatilityByMonth(self, monthIndex, n, dateList, startEndList, returns):
-        if monthIndex < n - 1:
-            return 'NaN'
-        else:
-            startDay = startEndList[monthIndex - n + 1][0]
-            endDay = startEndList[monthIndex][1]
-            startIndex = dateList.index(startDay)
-            endIndex = dateList.index(endDay)
-            returnsBetween = pd.Series(returns[startIndex:endIndex])
-            volatility = returnsBetween.std()
-            return volatility * 250 ** 0.5
-
-    def __calculateSharpeByMonth(self, monthIndex, n, dateList, startEndList, returns, rf):
-        if monthIndex < n - 1:
-            return 'NaN'
-        else:
-            startDay = startEndList[monthIndex - n + 1][0]
-            endDay = startEndList[monthIndex][1]
-            startIndex = dateList.index(startDay)
-            endIndex = dateList.index(endDay)
-            returnsBetween = pd.Series(returns[startIndex:endIndex])
-            annualizedVolatility = returnsBetween.std() * 250 ** 0.5
-            annualizedReturn = returnsBetween.mean() * 12 / n
-            try:
-                sharpe = (annualizedReturn - rf) / annualizedVolatility
-            except ZeroDivisionError:
-                sharpe = 'NaN'
-            return sharpe
+        stats = self.__getRollingStats()
+        return self.__buildDictByMonth(
+            stats.getWindows(), lambda n: stats.alpha(n, riskFreeRate, betaDict[self.__monthsKey(n)])
+        )
+
+    def __monthsKey(self, n):
+        if n == 1:
+            return u'1 Month'
+        return u'%d Months' % n
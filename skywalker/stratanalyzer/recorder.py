@@ -0,0 +1,234 @@
+# -*- coding:utf-8 -*-
+import os
+
+import numpy as np
+
+from skywalker import bar
+from skywalker.barfeed import columnar
+
+# Number of values kept in memory for each column before spilling them to disk, if a spill directory is set.
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class GrowableArray(object):
+    """A numpy array that grows by doubling its capacity, and can spill full chunks to .npy files.
+
+    :param dtype: The type of the values.
+    :param initialSize: The initial capacity.
+    :param spillDir: A directory to spill chunks to, or None to keep all the values in memory.
+    :param name: Prefix for the chunk file names.
+    :param chunkSize: Number of values kept in memory before spilling them.
+    """
+
+    def __init__(self, dtype=np.float64, initialSize=1024, spillDir=None, name="values", chunkSize=DEFAULT_CHUNK_SIZE):
+        if spillDir is not None:
+            initialSize = min(initialSize, chunkSize)
+        self.__dtype = dtype
+        self.__values = np.empty(initialSize, dtype=dtype)
+        self.__size = 0
+        self.__spillDir = spillDir
+        self.__name = name
+        self.__chunkSize = chunkSize
+        self.__chunkFiles = []
+        self.__spilledSize = 0
+
+    def __len__(self):
+        return self.__spilledSize + self.__size
+
+    def append(self, value):
+        if self.__size == len(self.__values):
+            if self.__spillDir is not None and self.__size >= self.__chunkSize:
+                self.__spill()
+            else:
+                values = np.empty(len(self.__values) * 2, dtype=self.__dtype)
+                values[:self.__size] = self.__values[:self.__size]
+                self.__values = values
+        self.__values[self.__size] = value
+        self.__size += 1
+
+    def __spill(self):
+        fileName = os.path.join(self.__spillDir, "%s_%05d.npy" % (self.__name, len(self.__chunkFiles)))
+        np.save(fileName, self.__values[:self.__size])
+        self.__chunkFiles.append(fileName)
+        self.__spilledSize += self.__size
+        self.__size = 0
+
+    def getValues(self):
+        """Returns all the values. Spilled chunks are memory mapped."""
+        current = self.__values[:self.__size]
+        if not len(self.__chunkFiles):
+            return current
+        return np.concatenate([np.load(fileName, mmap_mode="r") for fileName in self.__chunkFiles] + [current])
+
+
+class AnalyzerRecorder(object):
+    """Records the per bar state needed by the analyzer reports in compact form.
+
+    Equity, cash and benchmark values go to numpy arrays. Positions are stored as the changes from the previous bar,
+    and bars as one row of values per instrument. Lists with the original objects are rebuilt on demand.
+
+    :param spillDir: A directory to spill values to, or None to keep them in memory.
+    :param chunkSize: Number of values per column kept in memory before spilling them.
+    :param recordBars: True to record the bars.
+    """
+
+    def __init__(self, spillDir=None, chunkSize=DEFAULT_CHUNK_SIZE, recordBars=True):
+        if spillDir is not None and not os.path.exists(spillDir):
+            os.makedirs(spillDir)
+
+        def build(name, dtype=np.float64):
+            return GrowableArray(dtype, spillDir=spillDir, name=name, chunkSize=chunkSize)
+
+        self.__timestamps = build("timestamp", np.int64)
+        self.__tzinfo = None
+        self.__equity = build("equity")
+        self.__cash = build("cash")
+        # NaN when there is no benchmark value yet.
+        self.__benchmark = build("benchmark")
+
+        # Position changes: bar index, instrument id and the new number of shares (0 when the position was closed).
+        self.__positionsBar = build("positions_bar", np.int64)
+        self.__positionsInstrument = build("positions_instrument", np.int32)
+        self.__positionsShares = build("positions_shares")
+        self.__positionsIsInt = build("positions_isint", np.bool_)
+        self.__lastPositions = {}
+
+        self.__recordBars = recordBars
+        self.__barsBar = build("bars_bar", np.int64)
+        self.__barsInstrument = build("bars_instrument", np.int32)
+        self.__barsValues = [build("bars_" + column) for column in columnar.OHLCV_COLUMNS]
+        self.__frequency = None
+
+        self.__instruments = []
+        self.__instrumentIds = {}
+        # Views rebuilt on demand, and the number of bars they were built for.
+        self.__views = {}
+
+    def __len__(self):
+        return len(self.__equity)
+
+    def __getInstrumentId(self, instrument):
+        ret = self.__instrumentIds.get(instrument)
+        if ret is None:
+            ret = len(self.__instruments)
+            self.__instruments.append(instrument)
+            self.__instrumentIds[instrument] = ret
+        return ret
+
+    def append(self, dateTime, equity, cash, benchmark, positions, bars=None):
+        barIndex = len(self)
+        timestamps, tzinfo = columnar.datetimes_to_timestamps([dateTime])
+        self.__tzinfo = tzinfo
+        self.__timestamps.append(timestamps[0])
+        self.__equity.append(equity)
+        self.__cash.append(cash)
+        self.__benchmark.append(np.nan if benchmark is None else benchmark)
+
+        # Only store the positions that changed.
+        for instrument, shares in positions.items():
+            if self.__lastPositions.get(instrument) != shares:
+                self.__appendPosition(barIndex, instrument, shares)
+        for instrument in self.__lastPositions.keys():
+            if instrument not in positions:
+                self.__appendPosition(barIndex, instrument, None)
+        self.__lastPositions = dict(positions)
+
+        if self.__recordBars and bars is not None:
+            for instrument in bars.getInstruments():
+                bar_ = bars[instrument]
+                if self.__frequency is None:
+                    self.__frequency = bar_.getFrequency()
+                self.__barsBar.append(barIndex)
+                self.__barsInstrument.append(self.__getInstrumentId(instrument))
+                adjClose = bar_.getAdjClose()
+                values = (bar_.getOpen(), bar_.getHigh(), bar_.getLow(), bar_.getClose(), bar_.getVolume(),
+                          np.nan if adjClose is None else adjClose)
+                for column, value in zip(self.__barsValues, values):
+                    column.append(value)
+
+    def __appendPosition(self, barIndex, instrument, shares):
+        self.__positionsBar.append(barIndex)
+        self.__positionsInstrument.append(self.__getInstrumentId(instrument))
+        # None flags a closed position, since shares can't be NaN.
+        self.__positionsShares.append(np.nan if shares is None else shares)
+        self.__positionsIsInt.append(isinstance(shares, (int, long)))
+
+    def __getView(self, name, buildFun):
+        view = self.__views.get(name)
+        if view is None or view[0] != len(self):
+            view = (len(self), buildFun())
+            self.__views[name] = view
+        return view[1]
+
+    def getEquity(self):
+        return self.__equity.getValues()
+
+    def getCash(self):
+        return self.__cash.getValues()
+
+    def getBenchmark(self):
+        return self.__benchmark.getValues()
+
+    def getDateTimeList(self):
+        return self.__getView("datetimes", lambda: [
+            columnar.timestamp_to_datetime(timestamp, self.__tzinfo) for timestamp in self.__timestamps.getValues()
+        ])
+
+    def getEquityList(self):
+        return self.__getView("equity", lambda: self.getEquity().tolist())
+
+    def getCashList(self):
+        return self.__getView("cash", lambda: self.getCash().tolist())
+
+    def getBenchmarkList(self):
+        return self.__getView("benchmark", lambda: [
+            None if value != value else value for value in self.getBenchmark().tolist()
+        ])
+
+    def getPositionsList(self):
+        return self.__getView("positions", self.__buildPositionsList)
+
+    def __buildPositionsList(self):
+        ret = []
+        barIndexes = self.__positionsBar.getValues()
+        instrumentIds = self.__positionsInstrument.getValues()
+        shares = self.__positionsShares.getValues()
+        isInt = self.__positionsIsInt.getValues()
+        positions = {}
+        i = 0
+        for barIndex in xrange(len(self)):
+            while i < len(barIndexes) and barIndexes[i] == barIndex:
+                instrument = self.__instruments[instrumentIds[i]]
+                value = shares.item(i)
+                if value != value:
+                    del positions[instrument]
+                else:
+                    positions[instrument] = int(value) if isInt[i] else value
+                i += 1
+            ret.append(dict(positions))
+        return ret
+
+    def getBarsList(self):
+        """Returns a list of :class:`skywalker.bar.Bars`, or None for bars where no instrument had a bar."""
+        return self.__getView("bars", self.__buildBarsList)
+
+    def __buildBarsList(self):
+        ret = [None] * len(self)
+        dateTimes = self.getDateTimeList()
+        barIndexes = self.__barsBar.getValues()
+        instrumentIds = self.__barsInstrument.getValues()
+        columns = [column.getValues() for column in self.__barsValues]
+        bounds = np.flatnonzero(np.diff(barIndexes)) + 1
+        for begin, end in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(barIndexes)]])):
+            if begin == end:
+                continue
+            barIndex = barIndexes[begin]
+            barDict = {}
+            for i in xrange(begin, end):
+                open_, high, low, close, volume, adjClose = [column.item(i) for column in columns]
+                barDict[self.__instruments[instrumentIds[i]]] = bar.BasicBar(
+                    dateTimes[barIndex], open_, high, low, close, volume,
+                    None if adjClose != adjClose else adjClose, self.__frequency
+                )
+            ret[barIndex] = bar.Bars(barDict)
+        return ret
@@ -154,6 +154,12 @@ class PositionTracker(object):
 
         self.__commissions += commission
 
+    def applyShareRatio(self, ratio):
+        """Adjusts the position for a dividend or split that turns each share into ratio shares. The amount commited
+        to the position doesn't change."""
+        self.__position *= ratio
+        self.__avgPrice /= float(ratio)
+
     def buy(self, quantity, price, commission=0.0):
         assert quantity > 0, "Invalid quantity"
         self.update(quantity, price, commission)
@@ -163,6 +169,138 @@ class PositionTracker(object):
         self.update(quantity * -1, price, commission)
 
 
+# The effect of a fill on the position in an instrument, as recorded by PositionLedger.
+class LedgerFill(object):
+    def __init__(self, instrument, quantity, price, previousPosition, previousAvgPrice, position, avgPrice):
+        self.__instrument = instrument
+        self.__quantity = quantity
+        self.__price = price
+        self.__previousPosition = previousPosition
+        self.__previousAvgPrice = previousAvgPrice
+        self.__position = position
+        self.__avgPrice = avgPrice
+
+    def getInstrument(self):
+        return self.__instrument
+
+    # Positive for buys and negative for sells.
+    def getQuantity(self):
+        return self.__quantity
+
+    def getPrice(self):
+        return self.__price
+
+    def getPreviousPosition(self):
+        return self.__previousPosition
+
+    # The average price of the position before the fill. This is the cost for the shares closed by the fill.
+    def getPreviousAvgPrice(self):
+        return self.__previousAvgPrice
+
+    def getPosition(self):
+        return self.__position
+
+    # The average price of the position after the fill, or 0 if it was closed.
+    def getAvgPrice(self):
+        return self.__avgPrice
+
+    # The number of shares of the previous position closed by the fill.
+    def getClosedQuantity(self):
+        if self.__previousPosition * self.__quantity >= 0:
+            return 0
+        return min(abs(self.__quantity), abs(self.__previousPosition))
+
+
+# Helper class to keep a PositionTracker for every instrument.
+# Each fill is processed in constant time. Fills that go from long to short (or viceversa) are split in two, closing
+# the current trade and opening a new one, so each tracker holds a single trade at a time.
+class PositionLedger(object):
+    def __init__(self):
+        self.__trackers = {}
+        self.__lastFills = {}
+        self.__tradeClosedEvent = observer.Event()
+
+    # Event handler receives:
+    # 1: The instrument
+    # 2: The PositionTracker for the closed trade. It gets reset once the event is processed.
+    def getTradeClosedEvent(self):
+        return self.__tradeClosedEvent
+
+    def getTracker(self, instrument):
+        return self.__trackers.get(instrument)
+
+    def getPosition(self, instrument):
+        ret = 0
+        posTracker = self.__trackers.get(instrument)
+        if posTracker is not None:
+            ret = posTracker.getPosition()
+        return ret
+
+    def getAvgPrice(self, instrument):
+        ret = 0.0
+        posTracker = self.__trackers.get(instrument)
+        if posTracker is not None:
+            ret = posTracker.getAvgPrice()
+        return ret
+
+    def getLastFill(self, instrument):
+        """Returns the :class:`LedgerFill` for the last fill processed for an instrument, or None."""
+        return self.__lastFills.get(instrument)
+
+    def applyShareRatio(self, instrument, ratio):
+        """Adjusts the position in an instrument for a dividend or split that turns each share into ratio shares, as
+        the broker does with fixPositions.
+
+        :param ratio: The number of shares after the event for each share held before it.
+        """
+        posTracker = self.__trackers.get(instrument)
+        if posTracker is not None and posTracker.getPosition() != 0:
+            posTracker.applyShareRatio(ratio)
+
+    def __closeTrade(self, instrument, posTracker):
+        self.__tradeClosedEvent.emit(instrument, posTracker)
+        posTracker.reset()
+
+    def update(self, instrument, instrumentTraits, quantity, price, commission=0.0):
+        """Updates the position in an instrument with a fill and returns a :class:`LedgerFill`.
+
+        :param quantity: The quantity filled. Positive for buys and negative for sells.
+        """
+        try:
+            posTracker = self.__trackers[instrument]
+        except KeyError:
+            posTracker = PositionTracker(instrumentTraits)
+            self.__trackers[instrument] = posTracker
+
+        currentShares = posTracker.getPosition()
+        previousAvgPrice = posTracker.getAvgPrice()
+        newShares = instrumentTraits.roundQuantity(currentShares + quantity)
+
+        if currentShares == 0 or math.copysign(1, currentShares) == math.copysign(1, quantity):
+            # Open or extend the position.
+            posTracker.update(quantity, price, commission)
+        elif newShares == 0:
+            posTracker.update(quantity, price, commission)
+            self.__closeTrade(instrument, posTracker)
+        elif math.copysign(1, newShares) == math.copysign(1, currentShares):
+            # Reduce the position.
+            posTracker.update(quantity, price, commission)
+        else:
+            # Close the position and open one in the opposite direction. Use proportional commissions.
+            proportionalCommission = commission * abs(currentShares) / float(abs(quantity))
+            posTracker.update(currentShares * -1, price, proportionalCommission)
+            self.__closeTrade(instrument, posTracker)
+            proportionalCommission = commission * abs(newShares) / float(abs(quantity))
+            posTracker.update(newShares, price, proportionalCommission)
+
+        ret = LedgerFill(
+            instrument, quantity, price, currentShares, previousAvgPrice, posTracker.getPosition(),
+            posTracker.getAvgPrice()
+        )
+        self.__lastFills[instrument] = ret
+        return ret
+
+
 class ReturnsAnalyzerBase(stratanalyzer.StrategyAnalyzer):
     def __init__(self):
         super(ReturnsAnalyzerBase, self).__init__()
@@ -0,0 +1,202 @@
+# -*- coding:utf-8 -*-
+import numpy as np
+
+TRADE_DAYS = 250
+
+
+class MonthlyWindows(object):
+    """Index boundaries for windows of whole months over a list of dates.
+
+    Month boundaries are calculated once, so a window of n months ending on a given month is found in O(1).
+
+    :param dateList: A sorted list of datetimes.
+    """
+
+    def __init__(self, dateList):
+        self.__dateList = dateList
+        # Index of the first and last date of each month.
+        self.__starts = []
+        self.__ends = []
+        for i in xrange(len(dateList)):
+            if i == 0 or (dateList[i].year, dateList[i].month) != (dateList[i - 1].year, dateList[i - 1].month):
+                if i > 0:
+                    self.__ends.append(i - 1)
+                self.__starts.append(i)
+        if len(dateList):
+            self.__ends.append(len(dateList) - 1)
+
+    def getDateList(self):
+        return self.__dateList
+
+    def getMonthCount(self):
+        return len(self.__starts)
+
+    def getLabels(self):
+        """Returns the months formatted as %Y-%m."""
+        return [self.__dateList[start].strftime('%Y-%m') for start in self.__starts]
+
+    def getBounds(self, monthIndex, n):
+        """Returns the index of the first date of the window of n months ending on monthIndex, and the index of the
+        last date of the window, or None if there are not enough months."""
+        if monthIndex < n - 1:
+            return None
+        return self.__starts[monthIndex - n + 1], self.__ends[monthIndex]
+
+    def getAllBounds(self, n):
+        """Returns arrays with the first and last index of every complete window of n months, and the index of the
+        months for those windows."""
+        months = np.arange(n - 1, len(self.__starts))
+        starts = np.array(self.__starts, dtype=np.int64)[months - n + 1] if len(months) else np.array([], np.int64)
+        ends = np.array(self.__ends, dtype=np.int64)[months] if len(months) else np.array([], np.int64)
+        return starts, ends, months
+
+
+def _cumsum(values):
+    # Cumulative sums with a leading 0, so the sum of values[i:j] is ret[j] - ret[i].
+    ret = np.zeros(len(values) + 1)
+    np.cumsum(values, out=ret[1:])
+    return ret
+
+
+def _to_list(windows, months, values):
+    ret = ['NaN'] * windows.getMonthCount()
+    for month, value in zip(months, values):
+        ret[month] = value.item() if isinstance(value, np.generic) else value
+    return ret
+
+
+class RollingStats(object):
+    """Statistics over windows of whole months, calculated with cumulative sums so that each window is O(1).
+
+    Like the original per window calculations, windows for returns start on the first date of the first month and
+    end before the last date of the last month.
+
+    :param windows: The month boundaries.
+    :type windows: :class:`MonthlyWindows`.
+    :param returns: The strategy returns, one per date.
+    :param benchmarkReturns: The benchmark returns, one per date, or None.
+    """
+
+    def __init__(self, windows, returns, benchmarkReturns=None):
+        self.__windows = windows
+        self.__returns = np.asarray(returns, dtype=np.float64)
+        self.__benchmarkReturns = None
+        if benchmarkReturns is not None:
+            self.__benchmarkReturns = np.asarray(benchmarkReturns, dtype=np.float64)
+
+        # Values are centered before accumulating them to reduce the rounding errors of the sum of squares.
+        y = self.__returns - (self.__returns.mean() if len(self.__returns) else 0)
+        self.__yOffset = self.__returns.mean() if len(self.__returns) else 0
+        self.__sy = _cumsum(y)
+        self.__syy = _cumsum(y * y)
+        if self.__benchmarkReturns is not None:
+            self.__xOffset = self.__benchmarkReturns.mean() if len(self.__benchmarkReturns) else 0
+            x = self.__benchmarkReturns - self.__xOffset
+            self.__sx = _cumsum(x)
+            self.__sxx = _cumsum(x * x)
+            self.__sxy = _cumsum(x * y)
+            # Number of changes in the benchmark returns, to detect windows where they are constant.
+            changes = np.zeros(len(x))
+            if len(x) > 1:
+                changes[1:] = self.__benchmarkReturns[1:] != self.__benchmarkReturns[:-1]
+            self.__changes = _cumsum(changes)
+
+    def getWindows(self):
+        return self.__windows
+
+    def __bounds(self, n):
+        starts, ends, months = self.__windows.getAllBounds(n)
+        return starts, ends, months, ends - starts
+
+    def __std(self, starts, ends, count):
+        sy = self.__sy[ends] - self.__sy[starts]
+        syy = self.__syy[ends] - self.__syy[starts]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = (syy - sy * sy / count) / (count - 1)
+            ret = np.sqrt(np.maximum(var, 0))
+        ret[count <= 1] = np.nan
+        return ret
+
+    def __mean(self, starts, ends, count):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ret = (self.__sy[ends] - self.__sy[starts]) / count + self.__yOffset
+        ret[count == 0] = np.nan
+        return ret
+
+    def volatility(self, n):
+        """Annualized volatility for every window of n months."""
+        starts, ends, months, count = self.__bounds(n)
+        return _to_list(self.__windows, months, self.__std(starts, ends, count) * TRADE_DAYS ** 0.5)
+
+    def sharpe(self, n, riskFreeRate):
+        """Sharpe ratio for every window of n months."""
+        starts, ends, months, count = self.__bounds(n)
+        annualizedVolatility = self.__std(starts, ends, count) * TRADE_DAYS ** 0.5
+        annualizedReturn = self.__mean(starts, ends, count) * 12 / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ret = (annualizedReturn - riskFreeRate) / annualizedVolatility
+        return _to_list(self.__windows, months, ret)
+
+    def beta(self, n):
+        """Beta against the benchmark for every window of n months. Windows where the benchmark returns are constant
+        get a beta of 0."""
+        starts, ends, months, count = self.__bounds(n)
+        sx = self.__sx[ends] - self.__sx[starts]
+        sy = self.__sy[ends] - self.__sy[starts]
+        sxx = self.__sxx[ends] - self.__sxx[starts]
+        sxy = self.__sxy[ends] - self.__sxy[starts]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ret = (sxy - sx * sy / count) / (sxx - sx * sx / count)
+        changes = self.__changes[ends] - self.__changes[np.minimum(starts + 1, ends)]
+        ret[(count <= 1) | (changes == 0)] = 0
+        return _to_list(self.__windows, months, ret)
+
+    def informationRatio(self, n, betas):
+        """Information ratio for every window of n months, using the betas returned by :meth:`beta`."""
+        starts, ends, months, count = self.__bounds(n)
+        beta = np.array([betas[month] for month in months], dtype=np.float64)
+        # Residuals are y - beta * x. Sums are computed over the centered values and adjusted with the offsets.
+        sx = self.__sx[ends] - self.__sx[starts]
+        sy = self.__sy[ends] - self.__sy[starts]
+        sxx = self.__sxx[ends] - self.__sxx[starts]
+        syy = self.__syy[ends] - self.__syy[starts]
+        sxy = self.__sxy[ends] - self.__sxy[starts]
+        sr = sy - beta * sx
+        srr = syy - 2 * beta * sxy + beta * beta * sxx
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = sr / count + self.__yOffset - beta * self.__xOffset
+            std = np.sqrt(np.maximum((srr - sr * sr / count) / (count - 1), 0))
+            std[count <= 1] = np.nan
+            ret = mean / std
+        return _to_list(self.__windows, months, ret)
+
+    def alpha(self, n, riskFreeRate, betas):
+        """Alpha for every window of n months, using the returns on the last date of the window."""
+        starts, ends, months, count = self.__bounds(n)
+        beta = np.array([betas[month] for month in months], dtype=np.float64)
+        annualizedReturn = self.__returns[ends] * 12 / n
+        annualizedBenchmarkReturn = self.__benchmarkReturns[ends] * 12 / n
+        ret = (annualizedReturn - riskFreeRate) - beta * (annualizedBenchmarkReturn - riskFreeRate)
+        return _to_list(self.__windows, months, ret)
+
+
+def max_drawdowns(windows, equity, n):
+    """Max. drawdown for every window of n months, formatted as 'drawdown(%Y-%m-%d)'.
+
+    The date is the last one where the drawdown was at least as deep as the max. drawdown up to that point.
+    Each window is processed in a single pass with a running peak.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    dateList = windows.getDateList()
+    starts, ends, months = windows.getAllBounds(n)
+    values = []
+    for start, end in zip(starts, ends):
+        window = equity[start:end + 1]
+        peak = np.maximum.accumulate(window)
+        drawdowns = (window - peak) / peak
+        # The max. drawdown before each date, starting at 0.
+        previousMax = np.minimum.accumulate(np.concatenate([[0.0], drawdowns]))[:-1]
+        day = np.flatnonzero(drawdowns <= previousMax)[-1]
+        maxDrawDown = min(0.0, drawdowns.min())
+        values.append(str(-maxDrawDown) + '(' + dateList[start + day].strftime('%Y-%m-%d') + ')')
+    return _to_list(windows, months, values)
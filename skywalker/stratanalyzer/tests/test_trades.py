@@ -0,0 +1,99 @@
+import datetime
+from unittest import TestCase
+
+from skywalker import bar
+from skywalker import broker
+from skywalker.barfeed import equityevent
+from skywalker.barfeed import membf
+from skywalker.broker import backtesting
+from skywalker.stratanalyzer import trades
+
+
+class BarFeed(membf.BarFeed):
+    def __init__(self, frequency, calendar):
+        super(BarFeed, self).__init__(frequency)
+        self.__calendar = calendar
+
+    def barsHaveAdjClose(self):
+        return False
+
+    def getEquityEventCalendar(self):
+        return self.__calendar
+
+
+class StubStrategy(object):
+    def __init__(self, broker_):
+        self.__broker = broker_
+
+    def getBroker(self):
+        return self.__broker
+
+
+class TradesEquityEventTestCase(TestCase):
+    instrument = "000001.SZ"
+
+    def setUp(self):
+        # A 1 for 1 capitalization on the third bar, when the price halves.
+        calendar = equityevent.EquityEventCalendar([
+            (datetime.datetime(2016, 1, 6), equityevent.EquityEvent(self.instrument, 1.0, 0, 0))
+        ])
+        self.feed = BarFeed(bar.Frequency.DAY, calendar)
+        dateTime = datetime.datetime(2016, 1, 4)
+        bars = []
+        for price in (10, 10, 5, 5):
+            bars.append(bar.BasicBar(dateTime, price, price, price, price, 1000, None, bar.Frequency.DAY))
+            dateTime += datetime.timedelta(days=1)
+        self.feed.addBarsFromSequence(self.instrument, bars)
+        self.broker = backtesting.Broker(100000, self.feed)
+        self.strat = StubStrategy(self.broker)
+        self.trades = trades.Trades()
+        self.trades.attached(self.strat)
+        self.tradesList = dict((name, []) for name in (
+            'type', 'date', 'price', 'shares', 'return', 'returnrate', 'instrument', 'position', 'cost'
+        ))
+        # Subscribed after Trades, like the analyzers that build the trade list.
+        self.broker.getOrderUpdatedEvent().subscribe(self.__onOrderEvent)
+        self.feed.start()
+        self.broker.start()
+
+    def __onOrderEvent(self, broker_, orderEvent):
+        if orderEvent.getEventType() not in (broker.OrderEvent.Type.PARTIALLY_FILLED, broker.OrderEvent.Type.FILLED):
+            return
+        order = orderEvent.getOrder()
+        trades.appendLedgerFill(self.tradesList, str(order.getAction()), orderEvent.getEventInfo().getDateTime(),
+                                self.trades.getLedger().getLastFill(order.getInstrument()))
+
+    def submit_and_fill(self, action, quantity):
+        self.broker.submitOrder(self.broker.createMarketOrder(action, self.instrument, quantity))
+        self.feed.dispatch()
+        self.apply_equity_events(self.feed.getCurrentDateTime())
+
+    def apply_equity_events(self, dateTime):
+        # What the strategy does for the instruments with an open position before processing the bars.
+        pos = self.broker.getPositions()
+        for event in self.feed.getEquityEventCalendar().getEvents(dateTime):
+            if event.getInstrument() in pos:
+                self.broker.fixPositions(event.getInstrument(), pos[event.getInstrument()] * event.getShareRatio())
+                self.trades.onEquityEvent(self.strat, event)
+
+    def test_stock_dividend_then_full_sell(self):
+        self.feed.dispatch()
+        self.submit_and_fill(broker.Order.Action.BUY, 100)
+        self.feed.dispatch()
+        self.apply_equity_events(self.feed.getCurrentDateTime())
+
+        ledger = self.trades.getLedger()
+        self.assertEqual(ledger.getPosition(self.instrument), self.broker.getShares(self.instrument))
+        self.assertEqual(ledger.getAvgPrice(self.instrument), 5)
+
+        self.submit_and_fill(broker.Order.Action.SELL, 200)
+
+        self.assertEqual(self.broker.getShares(self.instrument), 0)
+        self.assertEqual(ledger.getPosition(self.instrument), 0)
+        self.assertEqual(self.trades.getCount(), 1)
+        self.assertEqual(self.trades.getEvenCount(), 1)
+        # One row for the buy and one for the sell, with no phantom opening row.
+        self.assertEqual(self.tradesList['shares'], [100, 200])
+        self.assertEqual(self.tradesList['position'], [100, 0])
+        self.assertEqual(self.tradesList['cost'], [10, 5])
+        self.assertEqual(self.tradesList['return'], ['None', 0])
@@ -51,9 +51,10 @@ class Trades(stratanalyzer.StrategyAnalyzer):
         self.__unprofitableCommissions = []
         self.__evenCommissions = []
         self.__evenTrades = 0
-        self.__posTrackers = {}
+        self.__ledger = returns.PositionLedger()
+        self.__ledger.getTradeClosedEvent().subscribe(self.__updateTrades)
 
-    def __updateTrades(self, posTracker):
+    def __updateTrades(self, instrument, posTracker):
         price = 0  # The price doesn't matter since the position should be closed.
         assert posTracker.getPosition() == 0
         netProfit = posTracker.getPnL(price)
@@ -75,61 +76,13 @@ class Trades(stratanalyzer.StrategyAnalyzer):
         self.__allReturns.append(netReturn)
         self.__allCommissions.append(posTracker.getCommissions())
 
-        posTracker.reset()
-
-    def __updatePosTracker(self, posTracker, price, commission, quantity):
-        currentShares = posTracker.getPosition()
-
-        if currentShares > 0:  # Current position is long
-            if quantity > 0:  # Increase long position
-                posTracker.buy(quantity, price, commission)
-            else:
-                newShares = currentShares + quantity
-                if newShares == 0:  # Exit long.
-                    posTracker.sell(currentShares, price, commission)
-                    self.__updateTrades(posTracker)
-                elif newShares > 0:  # Sell some shares.
-                    posTracker.sell(quantity * -1, price, commission)
-                else:  # Exit long and enter short. Use proportional commissions.
-                    proportionalCommission = commission * currentShares / float(quantity * -1)
-                    posTracker.sell(currentShares, price, proportionalCommission)
-                    self.__updateTrades(posTracker)
-                    proportionalCommission = commission * newShares / float(quantity)
-                    posTracker.sell(newShares * -1, price, proportionalCommission)
-        elif currentShares < 0:  # Current position is short
-            if quantity < 0:  # Increase short position
-                posTracker.sell(quantity * -1, price, commission)
-            else:
-                newShares = currentShares + quantity
-                if newShares == 0:  # Exit short.
-                    posTracker.buy(currentShares * -1, price, commission)
-                    self.__updateTrades(posTracker)
-                elif newShares < 0:  # Re-buy some shares.
-                    posTracker.buy(quantity, price, commission)
-                else:  # Exit short and enter long. Use proportional commissions.
-                    proportionalCommission = commission * currentShares * -1 / float(quantity)
-                    posTracker.buy(currentShares * -1, price, proportionalCommission)
-                    self.__updateTrades(posTracker)
-                    proportionalCommission = commission * newShares / float(quantity)
-                    posTracker.buy(newShares, price, proportionalCommission)
-        elif quantity > 0:
-            posTracker.buy(quantity, price, commission)
-        else:
-            posTracker.sell(quantity * -1, price, commission)
-
     def __onOrderEvent(self, broker_, orderEvent):
         # Only interested in filled or partially filled orders.
         if orderEvent.getEventType() not in (broker.OrderEvent.Type.PARTIALLY_FILLED, broker.OrderEvent.Type.FILLED):
             return
         order = orderEvent.getOrder()
-        # Get or create the tracker for this instrument.
-        try:
-            posTracker = self.__posTrackers[order.getInstrument()]
-        except KeyError:
-            posTracker = returns.PositionTracker(order.getInstrumentTraits())
-            self.__posTrackers[order.getInstrument()] = posTracker
-
-        # Update the tracker for this order.
+
+        # Update the position for this order.
         execInfo = orderEvent.getEventInfo()
         price = execInfo.getPrice()
         commission = execInfo.getCommission()
@@ -141,11 +94,21 @@ class Trades(stratanalyzer.StrategyAnalyzer):
         else:  # Unknown action
             assert (False)
 
-        self.__updatePosTracker(posTracker, price, commission, quantity)
+        self.__ledger.update(order.getInstrument(), order.getInstrumentTraits(), quantity, price, commission)
 
     def attached(self, strat):
         strat.getBroker().getOrderUpdatedEvent().subscribe(self.__onOrderEvent)
 
+    def onEquityEvent(self, strat, event):
+        # Keep the ledger in line with the broker positions after dividends and splits.
+        self.__ledger.applyShareRatio(event.getInstrument(), event.getShareRatio())
+
+    def getLedger(self):
+        """Returns the :class:`pyalgotrade.stratanalyzer.returns.PositionLedger` with the position and average cost
+        for every instrument. It is updated before handlers subscribed to order events after this analyzer was
+        attached get called."""
+        return self.__ledger
+
     def getCount(self):
         """Returns the total number of trades."""
         return len(self.__all)
@@ -201,3 +164,43 @@ class Trades(stratanalyzer.StrategyAnalyzer):
     def getCommissionsForEvenTrades(self):
         """Returns a numpy.array with the commissions for each trade whose net profit was 0."""
         return np.asarray(self.__evenCommissions)
+
+
+def appendLedgerFill(tradesList, action, dateTime, fill):
+    """Appends the rows for a :class:`pyalgotrade.stratanalyzer.returns.LedgerFill` to a trade list.
+
+    A fill that flips the position is split in two rows: one for the shares closed at the previous average price and
+    another one for the shares opened at the new average price.
+
+    :param tradesList: A dict of lists with the type, date, price, shares, instrument, position, cost, return and
+        returnrate columns. The datetime column is filled if it is there.
+    :param action: The name of the order action.
+    :param dateTime: The datetime of the execution.
+    :param fill: The :class:`pyalgotrade.stratanalyzer.returns.LedgerFill` for the execution.
+    """
+    price = fill.getPrice()
+    closed = fill.getClosedQuantity()
+    opened = abs(fill.getQuantity()) - closed
+    rows = []
+    if closed:
+        # The closed shares cost the average price of the position before the fill.
+        cost = fill.getPreviousAvgPrice()
+        direction = 1 if fill.getPreviousPosition() > 0 else -1
+        rows.append((closed, 0 if opened else fill.getPosition(), cost, direction * (price - cost) * closed,
+                     direction * (price - cost) / float(cost)))
+    if opened:
+        # The opened shares (including the new side of a flip) cost the average price after the fill.
+        rows.append((opened, fill.getPosition(), fill.getAvgPrice(), 'None', 'None'))
+
+    for shares, position, cost, return_, returnRate in rows:
+        tradesList['type'].append(action)
+        tradesList['date'].append(dateTime.strftime('%Y-%m-%d'))
+        if 'datetime' in tradesList:
+            tradesList['datetime'].append(dateTime)
+        tradesList['price'].append(price)
+        tradesList['shares'].append(shares)
+        tradesList['instrument'].append(fill.getInstrument())
+        tradesList['position'].append(position)
+        tradesList['cost'].append(cost)
+        tradesList['return'].append(return_)
+        tradesList['returnrate'].append(returnRate)
@@ -520,16 +520,18 @@ class BaseStrategy(object):
             pos.onOrderEvent(orderEvent)
 
     def __fixPostionsAndCash(self, datetime):
-        pos = self.getBroker().getPositions()
-        for instrument in pos.keys():
-            if self.getFeed().haveEquityEvent(instrument, datetime):
-                equityEvent = self.getFeed().getEquityEvent(instrument)
-                event = equityEvent[datetime:datetime]
-                div_capitalization = event['div_capitalization'].iloc[0]
-                div_stock = event['div_stock'].iloc[0]
-                div_cashaftertax = event['div_cashaftertax'].iloc[0]
-                self.getBroker().fixPositions(instrument, pos[instrument] * float(1 + div_capitalization + div_stock))
-                self.getBroker().setCash(self.getBroker().getCash() + pos[instrument] * div_cashaftertax)
+        # Only the instruments with an equity event on this date need to be checked.
+        calendar = self.getFeed().getEquityEventCalendar()
+        if calendar is None:
+            return
+        broker_ = self.getBroker()
+        pos = broker_.getPositions()
+        for event in calendar.getEvents(datetime):
+            instrument = event.getInstrument()
+            if instrument in pos:
+                broker_.fixPositions(instrument, pos[instrument] * event.getShareRatio())
+                broker_.setCash(broker_.getCash() + pos[instrument] * event.getCashAfterTax())
+                self.__notifyAnalyzers(lambda s: s.onEquityEvent(self, event))
 
     def __onBars(self, dateTime, bars):
         # THE ORDER HERE IS VERY IMPORTANT
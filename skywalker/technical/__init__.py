@@ -18,7 +18,10 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
+import numpy as np
+
 from skywalker import dataseries
+from skywalker.technical import batch
 from skywalker.utils import collections
 
 
@@ -62,6 +65,47 @@ class EventWindow(object):
         """Override to calculate a value using the values in the window."""
         raise NotImplementedError()
 
+    def getBatchValues(self, values, dateTimes=None):
+        """Override to calculate, in one pass, the values that :meth:`getValue` would return after adding each one of
+        the given values. Used to precompute filters.
+
+        :param values: A sequence or numpy.array with all the values.
+        :param dateTimes: A sequence with the datetime for each value, or None.
+        """
+        raise NotImplementedError()
+
+
+class PrecomputedValues(object):
+    """Holds values calculated beforehand and returns them one at a time, as the values being filtered arrive.
+
+    :param values: A sequence or numpy.array with the values. NaN values are returned as None.
+    :param dateTimes: A sequence with the datetime for each value, or None to skip checking that values are in sync.
+    """
+
+    def __init__(self, values, dateTimes=None):
+        if isinstance(values, np.ndarray):
+            values = batch.to_list(values)
+        if dateTimes is not None and len(dateTimes) != len(values):
+            raise Exception("values and dateTimes must have the same length")
+        self.__values = values
+        self.__dateTimes = dateTimes
+        self.__nextPos = 0
+
+    def next(self, dateTime):
+        if self.__nextPos >= len(self.__values):
+            raise Exception("There are no more precomputed values. Next datetime is %s" % (dateTime))
+        if self.__dateTimes is not None and self.__dateTimes[self.__nextPos] != dateTime:
+            raise Exception("Precomputed values are out of sync. Expected %s and got %s" % (
+                self.__dateTimes[self.__nextPos], dateTime
+            ))
+        ret = self.__values[self.__nextPos]
+        self.__nextPos += 1
+        return ret
+
+    def getPosition(self):
+        """Returns the position of the last value returned, or -1."""
+        return self.__nextPos - 1
+
 
 class EventBasedFilter(dataseries.SequenceDataSeries):
     """An EventBasedFilter class is responsible for capturing new values in a :class:`pyalgotrade.dataseries.DataSeries`
@@ -82,15 +126,45 @@ class EventBasedFilter(dataseries.SequenceDataSeries):
         self.__dataSeries = dataSeries
         self.__dataSeries.getNewValueEvent().subscribe(self.__onNewValue)
         self.__eventWindow = eventWindow
+        self.__precomputed = None
 
     def __onNewValue(self, dataSeries, dateTime, value):
-        # Let the event window perform calculations.
-        self.__eventWindow.onNewValue(dateTime, value)
-        # Get the resulting value
-        newValue = self.__eventWindow.getValue()
+        if self.__precomputed is not None:
+            newValue = self.__precomputed.next(dateTime)
+        else:
+            # Let the event window perform calculations.
+            self.__eventWindow.onNewValue(dateTime, value)
+            # Get the resulting value
+            newValue = self.__eventWindow.getValue()
         # Add the new value.
         self.appendWithDateTime(dateTime, newValue)
 
+    def precompute(self, values, dateTimes=None):
+        """Calculates all the values for this filter in one pass, using the full history of the DataSeries being
+        filtered. From then on, values are replayed from the precomputed ones instead of being calculated as the
+        DataSeries being filtered gets new values.
+
+        :param values: All the values that the DataSeries being filtered will get.
+        :type values: A :class:`pyalgotrade.dataseries.DataSeries`, a sequence or a numpy.array.
+        :param dateTimes: The datetime for each value. If not None, it is used to check that values are in sync.
+        :type dateTimes: list.
+
+        .. note::
+            * This must be called before the DataSeries being filtered gets any value.
+            * The EventWindow is not updated with precomputed values.
+        """
+        self.setPrecomputedValues(self.__eventWindow.getBatchValues(values, dateTimes), dateTimes)
+
+    def setPrecomputedValues(self, values, dateTimes=None):
+        """Sets the values to replay as the DataSeries being filtered gets new values. See :meth:`precompute`."""
+        if len(self) > 0:
+            raise Exception("Values can't be precomputed once the filter has values")
+        self.__precomputed = PrecomputedValues(values, dateTimes)
+
+    def getPrecomputedValues(self):
+        """Returns the :class:`PrecomputedValues` being replayed, or None."""
+        return self.__precomputed
+
     def getDataSeries(self):
         return self.__dataSeries
 
@@ -19,6 +19,7 @@
 """
 
 from skywalker import technical
+from skywalker.technical import batch
 from skywalker.dataseries import bards
 
 
@@ -57,6 +58,9 @@ class ATREventWindow(technical.EventWindow):
     def getValue(self):
         return self.__value
 
+    def getBatchValues(self, values, dateTimes=None):
+        return batch.atr(values, self.getWindowSize(), self.__useAdjustedValues)
+
 
 class ATR(technical.EventBasedFilter):
     """Average True Range filter as described in http://stockcharts.com/school/doku.php?id=chart_school:technical_indicators:average_true_range_atr
@@ -0,0 +1,397 @@
+"""
+Vectorized versions of the technical filters.
+
+These functions calculate an indicator over a whole history in one pass, instead of one value at a time like the
+event based filters do. The results match the ones from the event based filters, with NaN in place of None.
+
+None values in the input (NaN in numpy arrays) are skipped just like the event based filters skip them, so the
+result at those positions is the same as the previous one.
+"""
+
+import numpy as np
+from numpy.lib import stride_tricks
+from scipy import signal
+
+from skywalker import dataseries
+from skywalker.utils import collections
+from skywalker.utils import dt
+
+# Maximum number of elements to materialize at once when applying a function over rolling windows.
+ROLLING_CHUNK_SIZE = 1024 * 256
+
+
+def to_array(values):
+    """Returns a float numpy.array with the values from a :class:`skywalker.dataseries.DataSeries`, a
+    :class:`skywalker.utils.collections.NumPyDeque`, a sequence or a numpy.array. None values are converted to NaN."""
+    if isinstance(values, collections.NumPyDeque):
+        values = values.data()
+    if isinstance(values, np.ndarray):
+        return values.astype(float)
+    if isinstance(values, dataseries.DataSeries):
+        values = values[0:]
+    # numpy converts None to NaN when building float arrays.
+    return np.array(values, dtype=float)
+
+
+def to_list(values):
+    """Converts a numpy.array into a list with NaN values replaced by None."""
+    return [None if value != value else value for value in values.tolist()]
+
+
+def _skip_none(values, func):
+    # Apply func only over the values that are not missing, and then map the results back to every position,
+    # repeating the last result where values are missing.
+    valid = ~np.isnan(values)
+    if valid.all():
+        return func(values)
+    ret = np.empty(len(values))
+    ret.fill(np.nan)
+    compressed = values[valid]
+    if len(compressed):
+        results = func(compressed)
+        positions = np.cumsum(valid) - 1
+        started = positions >= 0
+        ret[started] = results[positions[started]]
+    return ret
+
+
+def _empty_like(values):
+    ret = np.empty(len(values))
+    ret.fill(np.nan)
+    return ret
+
+
+def _rolling_windows(values, period):
+    # A (len(values) - period + 1, period) view with one window per row.
+    stride = values.strides[0]
+    return stride_tricks.as_strided(values, shape=(len(values) - period + 1, period), strides=(stride, stride))
+
+
+def _rolling_apply(values, period, func):
+    # func receives a 2D array with one window per row and returns one value per row.
+    values = np.ascontiguousarray(values)
+    ret = _empty_like(values)
+    if len(values) < period:
+        return ret
+    windows = _rolling_windows(values, period)
+    chunkSize = max(1, ROLLING_CHUNK_SIZE // period)
+    for begin in xrange(0, len(windows), chunkSize):
+        end = min(begin + chunkSize, len(windows))
+        ret[begin + period - 1:end + period - 1] = func(windows[begin:end])
+    return ret
+
+
+def _sma(values, period):
+    ret = _empty_like(values)
+    if len(values) >= period:
+        # Offset by the first value to reduce the magnitude of the cumulative sums.
+        accum = np.cumsum(np.concatenate([[0], values - values[0]]))
+        ret[period - 1:] = (accum[period:] - accum[:-period]) / float(period) + values[0]
+    return ret
+
+
+# Exponential smoothing seeded with the mean of the first period values:
+# ret[i] = ret[i-1] + (values[i] - ret[i-1]) * multiplier
+def _smooth(values, period, multiplier, seed=None):
+    ret = _empty_like(values)
+    if len(values) >= period:
+        if seed is None:
+            seed = values[0:period].mean()
+        ret[period - 1] = seed
+        if len(values) > period:
+            ret[period:] = signal.lfilter(
+                [multiplier], [1, multiplier - 1], values[period:], zi=[(1 - multiplier) * seed]
+            )[0]
+    return ret
+
+
+def sma(values, period):
+    """Simple moving average. See :class:`skywalker.technical.ma.SMA`."""
+    assert (period > 0)
+    return _skip_none(to_array(values), lambda values: _sma(values, period))
+
+
+def ema(values, period):
+    """Exponential moving average. See :class:`skywalker.technical.ma.EMA`."""
+    assert (period > 1)
+    multiplier = 2.0 / (period + 1)
+    return _skip_none(to_array(values), lambda values: _smooth(values, period, multiplier))
+
+
+def wma(values, weights):
+    """Weighted moving average. See :class:`skywalker.technical.ma.WMA`."""
+    assert (len(weights) > 0)
+    weights = np.asarray(weights, dtype=float)
+
+    def calc(values):
+        ret = _empty_like(values)
+        if len(values) >= len(weights):
+            ret[len(weights) - 1:] = np.convolve(values, weights[::-1], "valid") / float(weights.sum())
+        return ret
+    return _skip_none(to_array(values), calc)
+
+
+def stddev(values, period, ddof=0):
+    """Standard deviation. See :class:`skywalker.technical.stats.StdDev`."""
+    assert (period > 0)
+    return _skip_none(
+        to_array(values),
+        lambda values: _rolling_apply(values, period, lambda windows: windows.std(axis=1, ddof=ddof))
+    )
+
+
+def zscore(values, period, ddof=0):
+    """Z-Score. See :class:`skywalker.technical.stats.ZScore`."""
+    assert (period > 1)
+
+    def calc(windows):
+        return (windows[:, -1] - windows.mean(axis=1)) / windows.std(axis=1, ddof=ddof)
+    return _skip_none(to_array(values), lambda values: _rolling_apply(values, period, calc))
+
+
+def high(values, period):
+    """Highest value. See :class:`skywalker.technical.highlow.High`."""
+    return _skip_none(
+        to_array(values), lambda values: _rolling_apply(values, period, lambda windows: windows.max(axis=1))
+    )
+
+
+def low(values, period):
+    """Lowest value. See :class:`skywalker.technical.highlow.Low`."""
+    return _skip_none(
+        to_array(values), lambda values: _rolling_apply(values, period, lambda windows: windows.min(axis=1))
+    )
+
+
+def rsi(values, period):
+    """Relative Strength Index. See :class:`skywalker.technical.rsi.RSI`."""
+    assert (period > 1)
+
+    def calc(values):
+        ret = _empty_like(values)
+        if len(values) < period + 1:
+            return ret
+        changes = np.diff(values)
+        gains = np.where(changes < 0, 0, changes)
+        losses = np.where(changes < 0, -changes, 0)
+        multiplier = 1.0 / period
+        avgGain = _smooth(gains, period, multiplier)[period - 1:]
+        avgLoss = _smooth(losses, period, multiplier)[period - 1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret[period:] = np.where(avgLoss == 0, 100, 100 - 100 / (1 + avgGain / avgLoss))
+        return ret
+    return _skip_none(to_array(values), calc)
+
+
+def macd(values, fastEMA, slowEMA, signalEMA):
+    """Moving Average Convergence-Divergence. See :class:`skywalker.technical.macd.MACD`.
+
+    :rtype: A tuple with the MACD, signal and histogram numpy.arrays.
+    """
+    assert (fastEMA > 0)
+    assert (slowEMA > 0)
+    assert (fastEMA < slowEMA)
+    assert (signalEMA > 0)
+
+    values = to_array(values)
+    # The fast EMA skips the first values so that both EMAs calculate their first value at the same time.
+    skip = slowEMA - fastEMA
+    slowValues = _skip_none(values, lambda values: _smooth(values, slowEMA, 2.0 / (slowEMA + 1)))
+    fastValues = _empty_like(values)
+    fastValues[skip:] = _skip_none(values[skip:], lambda values: _smooth(values, fastEMA, 2.0 / (fastEMA + 1)))
+    diff = fastValues - slowValues
+
+    signalValues = _skip_none(diff, lambda values: _smooth(values, signalEMA, 2.0 / (signalEMA + 1)))
+    macdValues = np.where(np.isnan(signalValues), np.nan, diff)
+    return macdValues, signalValues, macdValues - signalValues
+
+
+def bollinger_bands(values, period, numStdDev):
+    """Bollinger Bands. See :class:`skywalker.technical.bollinger.BollingerBands`.
+
+    :rtype: A tuple with the upper, middle and lower band numpy.arrays.
+    """
+    values = to_array(values)
+    middle = sma(values, period)
+    stdDev = stddev(values, period)
+    upper = middle + stdDev * numStdDev
+    lower = middle + stdDev * numStdDev * -1
+    # Bands are not calculated for missing values.
+    upper[np.isnan(values)] = np.nan
+    lower[np.isnan(values)] = np.nan
+    return upper, middle, lower
+
+
+def bar_columns(bars, useAdjustedValues=False):
+    """Returns the high, low and close numpy.arrays for a set of bars.
+
+    :param bars: A :class:`skywalker.dataseries.bards.BarDataSeries`, a
+        :class:`skywalker.barfeed.columnar.ColumnarBars` or a sequence of :class:`skywalker.bar.Bar`.
+    :param useAdjustedValues: True to use adjusted Low/High/Close values.
+    """
+    if hasattr(bars, "getColumn"):
+        high_ = bars.getColumn("high")
+        low_ = bars.getColumn("low")
+        close = bars.getColumn("close")
+        if useAdjustedValues:
+            adjClose = bars.getColumn("adj_close")
+            if adjClose is None:
+                raise Exception("Adjusted close is missing")
+            ratio = adjClose / close
+            return high_ * ratio, low_ * ratio, adjClose
+        return high_, low_, close
+
+    if isinstance(bars, dataseries.DataSeries):
+        bars = bars[0:]
+    high_ = np.array([bar_.getHigh(useAdjustedValues) for bar_ in bars], dtype=float)
+    low_ = np.array([bar_.getLow(useAdjustedValues) for bar_ in bars], dtype=float)
+    close = np.array([bar_.getClose(useAdjustedValues) for bar_ in bars], dtype=float)
+    return high_, low_, close
+
+
+def atr(bars, period, useAdjustedValues=False):
+    """Average True Range. See :class:`skywalker.technical.atr.ATR`.
+
+    :param bars: The bars. See :func:`bar_columns`.
+    """
+    assert (period > 1)
+    high_, low_, close = bar_columns(bars, useAdjustedValues)
+    trueRange = high_ - low_
+    if len(trueRange) > 1:
+        prevClose = close[:-1]
+        trueRange[1:] = np.maximum(
+            np.maximum(trueRange[1:], np.abs(high_[1:] - prevClose)), np.abs(low_[1:] - prevClose)
+        )
+    return _smooth(trueRange, period, 1.0 / period)
+
+
+def stochastic_oscillator(bars, period, dSMAPeriod=3, useAdjustedValues=False):
+    """Fast Stochastic Oscillator. See :class:`skywalker.technical.stoch.StochasticOscillator`.
+
+    :param bars: The bars. See :func:`bar_columns`.
+    :rtype: A tuple with the %K and %D numpy.arrays.
+    """
+    assert (period > 1)
+    assert dSMAPeriod > 1, "dSMAPeriod must be > 1"
+    high_, low_, close = bar_columns(bars, useAdjustedValues)
+    highestHigh = _rolling_apply(high_, period, lambda windows: windows.max(axis=1))
+    lowestLow = _rolling_apply(low_, period, lambda windows: windows.min(axis=1))
+    closeDelta = close - lowestLow
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = np.where(closeDelta == 0, 0.0, closeDelta / (highestHigh - lowestLow) * 100)
+    k[np.isnan(lowestLow)] = np.nan
+    return k, sma(k, dSMAPeriod)
+
+
+def _rolling_lsreg(x, values, windowSize):
+    # Returns the slope and intercept for the regression over each window.
+    def calc(windows):
+        xWindows = windows[:, :windowSize]
+        yWindows = windows[:, windowSize:]
+        xMean = xWindows.mean(axis=1)
+        yMean = yWindows.mean(axis=1)
+        xDev = xWindows - xMean[:, np.newaxis]
+        slope = (xDev * (yWindows - yMean[:, np.newaxis])).sum(axis=1) / (xDev * xDev).sum(axis=1)
+        return np.column_stack([slope, yMean - slope * xMean])
+
+    slope = _empty_like(values)
+    intercept = _empty_like(values)
+    if len(values) >= windowSize:
+        xWindows = _rolling_windows(np.ascontiguousarray(x), windowSize)
+        yWindows = _rolling_windows(np.ascontiguousarray(values), windowSize)
+        chunkSize = max(1, ROLLING_CHUNK_SIZE // windowSize)
+        for begin in xrange(0, len(xWindows), chunkSize):
+            end = min(begin + chunkSize, len(xWindows))
+            res = calc(np.hstack([xWindows[begin:end], yWindows[begin:end]]))
+            slope[begin + windowSize - 1:end + windowSize - 1] = res[:, 0]
+            intercept[begin + windowSize - 1:end + windowSize - 1] = res[:, 1]
+    return slope, intercept
+
+
+def least_squares_regression_coefficients(values, dateTimes, windowSize):
+    """Returns the slope and intercept numpy.arrays for the regression over each window, using timestamps as x.
+    See :class:`skywalker.technical.linreg.LeastSquaresRegression`."""
+    assert (windowSize > 1)
+    values = to_array(values)
+    if len(dateTimes) != len(values):
+        raise Exception("values and dateTimes must have the same length")
+    timestamps = np.array([dt.datetime_to_timestamp(dateTime) for dateTime in dateTimes], dtype=float)
+    valid = ~np.isnan(values)
+
+    slope = _empty_like(values)
+    intercept = _empty_like(values)
+    compressedSlope, compressedIntercept = _rolling_lsreg(timestamps[valid], values[valid], windowSize)
+    positions = np.cumsum(valid) - 1
+    started = positions >= 0
+    slope[started] = compressedSlope[positions[started]]
+    intercept[started] = compressedIntercept[positions[started]]
+    # Each value is calculated at the timestamp of the last value in the window.
+    lastTimestamp = _empty_like(values)
+    lastTimestamp[started] = timestamps[valid][positions[started]]
+    return slope, intercept, lastTimestamp
+
+
+def least_squares_regression(values, dateTimes, windowSize):
+    """Least-squares regression. See :class:`skywalker.technical.linreg.LeastSquaresRegression`."""
+    slope, intercept, lastTimestamp = least_squares_regression_coefficients(values, dateTimes, windowSize)
+    return slope * lastTimestamp + intercept
+
+
+def slope(values, period):
+    """Slope of a least-squares regression line. See :class:`skywalker.technical.linreg.Slope`."""
+    x = np.arange(period, dtype=float)
+    xDev = x - x.mean()
+
+    def calc(values):
+        ret = _empty_like(values)
+        if len(values) >= period:
+            ret[period - 1:] = np.convolve(values, xDev[::-1], "valid") / (xDev * xDev).sum()
+        return ret
+    return _skip_none(to_array(values), calc)
+
+
+def hurst_exponent(values, period, minLags=2, maxLags=20, logValues=True):
+    """Hurst exponent. See :class:`skywalker.technical.hurst.HurstExponent`."""
+    assert period > 0, "period must be > 0"
+    assert minLags >= 2, "minLags must be >= 2"
+    assert maxLags > minLags, "maxLags must be > minLags"
+
+    values = to_array(values)
+    if logValues:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.log10(values)
+
+    lags = np.arange(minLags, maxLags)
+    logLags = np.log10(lags)
+    logLagsDev = logLags - logLags.mean()
+
+    def calc(values):
+        ret = _empty_like(values)
+        if len(values) < period:
+            return ret
+        windowCount = len(values) - period + 1
+        logTau = np.empty((windowCount, len(lags)))
+        logTau.fill(np.nan)
+        for i, lag in enumerate(lags):
+            count = period - lag
+            if count <= 0:
+                continue
+            # The differences for the window ending at position t are diffs[t - period + 1:t - lag + 1].
+            diffs = values[lag:] - values[:-lag]
+            accum = np.concatenate([[0], np.cumsum(diffs)])
+            accumSq = np.concatenate([[0], np.cumsum(diffs * diffs)])
+            total = accum[count:count + windowCount] - accum[:windowCount]
+            totalSq = accumSq[count:count + windowCount] - accumSq[:windowCount]
+            variance = np.maximum(totalSq / count - (total / count) ** 2, 0)
+            if count == 1:
+                # Avoid rounding errors, the variance of a single difference is 0.
+                variance[:] = 0
+            with np.errstate(divide="ignore"):
+                logTau[:, i] = np.log10(np.sqrt(np.sqrt(variance)))
+        # Slope of the linear fit to the double-log graph.
+        hurst = logTau.dot(logLagsDev) / (logLagsDev * logLagsDev).sum() * 2
+        # Like numpy.polyfit, it is NaN if a variance is 0.
+        hurst[np.isinf(hurst)] = np.nan
+        ret[period - 1:] = hurst
+        return ret
+    return _skip_none(values, calc)
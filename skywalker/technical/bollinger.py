@@ -47,6 +47,13 @@ class BollingerBands(object):
         # It is important to subscribe after sma and stddev since we'll use those values.
         dataSeries.getNewValueEvent().subscribe(self.__onNewValue)
 
+    def precompute(self, values, dateTimes=None):
+        """Calculates the middle band and the standard deviation in one pass, using the full history of the
+        DataSeries being filtered. See :meth:`pyalgotrade.technical.EventBasedFilter.precompute`.
+        """
+        self.__sma.precompute(values, dateTimes)
+        self.__stdDev.precompute(values, dateTimes)
+
     def __onNewValue(self, dataSeries, dateTime, value):
         upperValue = None
         lowerValue = None
@@ -19,6 +19,14 @@
 """
 
 
+import numpy as np
+
+from skywalker.technical import batch
+
+# Ranges up to this size are checked with a plain loop, since that is faster than numpy for a few values.
+SMALL_RANGE_SIZE = 16
+
+
 def compute_diff(values1, values2):
     assert (len(values1) == len(values2))
     ret = []
@@ -47,22 +55,92 @@ def _get_stripped(values1, values2, alignLeft):
     return values1, values2
 
 
-def _cross_impl(values1, values2, start, end, signCheck):
-    # Get both set of values.
-    values1, values2 = _get_stripped(values1[start:end], values2[start:end], start > 0)
+# Differences equal to 0 are skipped, so a cross is a change of sign between a difference and the previous non zero
+# one. A missing difference (None or NaN) can't be the previous one, and it counts as a non positive one, so a
+# positive difference followed by a missing one is a cross below.
+def _cross_events(diffs, above):
+    # diffs is a 2D numpy.array with one row per pair of series. Returns a boolean array with True where a cross
+    # happened.
+    rows, cols = diffs.shape
+    ret = np.zeros(diffs.shape, dtype=bool)
+    if cols < 2:
+        return ret
+    nonZero = diffs != 0
+    # Position of the last non zero difference up to each position, or -1.
+    lastNonZero = np.where(nonZero, np.arange(cols), -1)
+    np.maximum.accumulate(lastNonZero, axis=1, out=lastNonZero)
+    prevPos = lastNonZero[:, :-1]
+    hasPrev = prevPos >= 0
+    prev = diffs[np.arange(rows)[:, np.newaxis], np.maximum(prevPos, 0)]
+    curr = diffs[:, 1:]
+    with np.errstate(invalid="ignore"):
+        if above:
+            crossed = (prev < 0) & (curr > 0)
+        else:
+            crossed = (prev > 0) & ~(curr > 0)
+    ret[:, 1:] = nonZero[:, 1:] & hasPrev & crossed
+    return ret
+
 
-    # Compute differences and check sign changes.
+def _cross_positions(diffs, above):
+    # Like _cross_events but for a 1D numpy.array, returning the positions.
+    positions = np.flatnonzero(diffs != 0)
+    nonZero = diffs[positions]
+    prev = nonZero[:-1]
+    curr = nonZero[1:]
+    with np.errstate(invalid="ignore"):
+        if above:
+            crossed = (prev < 0) & (curr > 0)
+        else:
+            crossed = (prev > 0) & ~(curr > 0)
+    return positions[1:][crossed]
+
+
+def _count_crosses(values1, values2, above):
     ret = 0
-    diffs = compute_diff(values1, values2)
-    diffs = filter(lambda x: x != 0, diffs)
     prevDiff = None
-    for diff in diffs:
-        if prevDiff is not None and not signCheck(prevDiff) and signCheck(diff):
-            ret += 1
+    for i in xrange(len(values1)):
+        v1 = values1[i]
+        v2 = values2[i]
+        diff = None
+        if v1 is not None and v2 is not None:
+            diff = v1 - v2
+            if diff == 0:
+                continue
+            elif diff != diff:
+                diff = None
+        if prevDiff is not None:
+            if above:
+                if prevDiff < 0 and diff is not None and diff > 0:
+                    ret += 1
+            elif prevDiff > 0 and (diff is None or diff < 0):
+                ret += 1
         prevDiff = diff
     return ret
 
 
+def _cross_impl(values1, values2, start, end, above):
+    # Get both set of values.
+    values1, values2 = _get_stripped(values1[start:end], values2[start:end], start > 0)
+
+    if len(values1) <= SMALL_RANGE_SIZE:
+        return _count_crosses(values1, values2, above)
+    values = np.array([values1, values2], dtype=float)
+    return len(_cross_positions(values[0] - values[1], above))
+
+
+def _cross_events_impl(values1, values2, above):
+    values1 = batch.to_array(values1)
+    values2 = batch.to_array(values2)
+    if values1.ndim == 1 and values2.ndim == 1:
+        values1, values2 = _get_stripped(values1, values2, False)
+        return _cross_positions(values1 - values2, above)
+    diffs = values1 - values2
+    if diffs.ndim != 2:
+        raise Exception("Values must be 1D or 2D")
+    return np.nonzero(_cross_events(diffs, above))
+
+
 # Note:
 # Up to version 0.12 CrossAbove and CrossBelow were DataSeries.
 # In version 0.13 SequenceDataSeries was refactored to support specifying a limit to the amount
@@ -94,7 +172,7 @@ def cross_above(values1, values2, start=-2, end=None):
     .. note::
         The default start and end values check for cross above conditions over the last 2 values.
     """
-    return _cross_impl(values1, values2, start, end, lambda x: x > 0)
+    return _cross_impl(values1, values2, start, end, True)
 
 
 def cross_below(values1, values2, start=-2, end=None):
@@ -114,4 +192,36 @@ def cross_below(values1, values2, start=-2, end=None):
     .. note::
         The default start and end values check for cross below conditions over the last 2 values.
     """
-    return _cross_impl(values1, values2, start, end, lambda x: x < 0)
+    return _cross_impl(values1, values2, start, end, False)
+
+
+def cross_above_events(values1, values2):
+    """Finds all the positions where values1 crossed above values2, in one pass. The rules are the same as in
+    :func:`cross_above`, so the number of positions is what cross_above(values1, values2, 0) returns.
+
+    :param values1: The values that cross. A :class:`pyalgotrade.dataseries.DataSeries`, a sequence, a numpy.array or
+        a 2D numpy.array with one row per series, to check many pairs at once.
+    :param values2: The values being crossed. Same as values1, or anything that can be broadcast against it.
+    :rtype: A numpy.array with the positions, or a tuple with the rows and the positions for 2D values.
+
+    .. note::
+        1D values with different lengths are aligned on the last value, like :func:`cross_above` does with the default
+        range. Positions are relative to the shortest.
+    """
+    return _cross_events_impl(values1, values2, True)
+
+
+def cross_below_events(values1, values2):
+    """Finds all the positions where values1 crossed below values2, in one pass. The rules are the same as in
+    :func:`cross_below`, so the number of positions is what cross_below(values1, values2, 0) returns.
+
+    :param values1: The values that cross. A :class:`pyalgotrade.dataseries.DataSeries`, a sequence, a numpy.array or
+        a 2D numpy.array with one row per series, to check many pairs at once.
+    :param values2: The values being crossed. Same as values1, or anything that can be broadcast against it.
+    :rtype: A numpy.array with the positions, or a tuple with the rows and the positions for 2D values.
+
+    .. note::
+        1D values with different lengths are aligned on the last value, like :func:`cross_below` does with the default
+        range. Positions are relative to the shortest.
+    """
+    return _cross_events_impl(values1, values2, False)
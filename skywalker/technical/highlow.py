@@ -19,23 +19,33 @@
 """
 
 from skywalker import technical
+from skywalker.technical import batch
+from skywalker.utils import collections
 
 
 class HighLowEventWindow(technical.EventWindow):
     def __init__(self, windowSize, useMin):
         super(HighLowEventWindow, self).__init__(windowSize)
         self.__useMin = useMin
+        self.__extreme = collections.MonotonicDeque(windowSize, useMin)
+
+    def onNewValue(self, dateTime, value):
+        super(HighLowEventWindow, self).onNewValue(dateTime, value)
+        if value is not None:
+            self.__extreme.append(float(value))
 
     def getValue(self):
         ret = None
         if self.windowFull():
-            values = self.getValues()
-            if self.__useMin:
-                ret = values.min()
-            else:
-                ret = values.max()
+            ret = self.__extreme.getValue()
         return ret
 
+    def getBatchValues(self, values, dateTimes=None):
+        if self.__useMin:
+            return batch.low(values, self.getWindowSize())
+        else:
+            return batch.high(values, self.getWindowSize())
+
 
 class High(technical.EventBasedFilter):
     """This filter calculates the highest value.
@@ -18,29 +18,75 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
+import collections
+
 import numpy as np
 
 from skywalker import technical
+from skywalker.technical import batch
+
+
+# Based on Tom Starke's code for the Hurst Exponent.
+class HurstLags(object):
+    """Calculates the Hurst exponent over windows of a fixed size, caching everything that only depends on the window
+    size and the lags.
+
+    The differences for all the lags are calculated at once, from a (lags, windowSize) matrix of positions, and the
+    slope of the fit to the double-log graph is the dot product with the centered log lags.
+
+    :param windowSize: The number of values in each window.
+    :type windowSize: int.
+    :param minLags: The minimum number of lags to use.
+    :type minLags: int.
+    :param maxLags: The maximum number of lags to use (not included).
+    :type maxLags: int.
+    """
+
+    def __init__(self, windowSize, minLags, maxLags):
+        self.__windowSize = windowSize
+        lags = np.arange(minLags, maxLags)
+        # positions[i, j] is the position of the value lags[i] positions after j, and valid flags the ones inside the
+        # window.
+        positions = np.arange(windowSize)[np.newaxis, :] + lags[:, np.newaxis]
+        self.__valid = positions < windowSize
+        self.__positions = np.minimum(positions, windowSize - 1)
+        self.__counts = self.__valid.sum(axis=1)
+        logLags = np.log10(lags)
+        logLagsDev = logLags - logLags.mean()
+        self.__slopeWeights = logLagsDev / (logLagsDev * logLagsDev).sum()
+
+    def getValue(self, values):
+        """Returns the Hurst exponent for a window of values."""
+        diffs = values[self.__positions] - values[np.newaxis, :self.__windowSize]
+        diffs *= self.__valid
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = diffs.sum(axis=1) / self.__counts
+            devs = (diffs - means[:, np.newaxis]) * self.__valid
+            variances = (devs * devs).sum(axis=1) / self.__counts
+            logTau = np.log10(np.sqrt(np.sqrt(variances)))
+        # Slope of the linear fit to the double-log graph. Like numpy.polyfit, it is NaN if a variance is 0.
+        ret = logTau.dot(self.__slopeWeights) * 2
+        if np.isinf(ret):
+            ret = np.nan
+        return ret
+
+
+# The HurstLags for the last window sizes used by hurst_exp, least recently used first. Each one holds two
+# (lags, windowSize) matrices, so only a few are kept.
+_hurstLagsCache = collections.OrderedDict()
+_hurstLagsCacheSize = 8
 
 
-# Code Tom Starke for the Hurst Exponent.
 def hurst_exp(p, minLags, maxLags):
-    tau = []
-    lagvec = []
-
-    #  Step through the different lags
-    for lag in range(minLags, maxLags):
-        #  produce price difference with lag
-        pp = np.subtract(p[lag:], p[:-lag])
-        #  Write the different lags into a vector
-        lagvec.append(lag)
-        #  Calculate the variance of the differnce vector
-        tau.append(np.sqrt(np.std(pp)))
-    # linear fit to double-log graph (gives power)
-    m = np.polyfit(np.log10(lagvec), np.log10(tau), 1)
-    # calculate hurst
-    hurst = m[0] * 2
-    return hurst
+    p = np.asarray(p, dtype=float)
+    key = (len(p), minLags, maxLags)
+    hurstLags = _hurstLagsCache.pop(key, None)
+    if hurstLags is None:
+        hurstLags = HurstLags(len(p), minLags, maxLags)
+        if len(_hurstLagsCache) >= _hurstLagsCacheSize:
+            _hurstLagsCache.popitem(last=False)
+    _hurstLagsCache[key] = hurstLags
+    return hurstLags.getValue(p)
 
 
 class HurstExponentEventWindow(technical.EventWindow):
@@ -49,6 +95,7 @@ class HurstExponentEventWindow(technical.EventWindow):
         self.__minLags = minLags
         self.__maxLags = maxLags
         self.__logValues = logValues
+        self.__hurstLags = HurstLags(period, minLags, maxLags)
 
     def onNewValue(self, dateTime, value):
         if value is not None and self.__logValues:
@@ -58,9 +105,12 @@ class HurstExponentEventWindow(technical.EventWindow):
     def getValue(self):
         ret = None
         if self.windowFull():
-            ret = hurst_exp(self.getValues(), self.__minLags, self.__maxLags)
+            ret = self.__hurstLags.getValue(self.getValues())
         return ret
 
+    def getBatchValues(self, values, dateTimes=None):
+        return batch.hurst_exponent(values, self.getWindowSize(), self.__minLags, self.__maxLags, self.__logValues)
+
 
 class HurstExponent(technical.EventBasedFilter):
     """Hurst exponent filter.
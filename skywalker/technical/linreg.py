@@ -22,6 +22,7 @@ import numpy as np
 from scipy import stats
 
 from skywalker import technical
+from skywalker.technical import batch
 from skywalker.utils import collections
 from skywalker.utils import dt
 
@@ -35,39 +36,141 @@ def lsreg(x, y):
     return res[0], res[1]
 
 
+class RollingLeastSquares(object):
+    """Least-squares regression over the last windowSize points, updated in O(1) as points enter and leave the window.
+
+    Sums are kept over the deviations from an origin near the window mean, to avoid the precision loss of squaring big
+    values like timestamps. The origin is moved, and the sums recalculated, every windowSize points so that rounding
+    errors don't build up. That keeps the cost per point O(1) amortized. A NaN turns the sums into NaN, so they are also
+    recalculated once the last NaN leaves the window.
+
+    :param windowSize: The number of points in the window. Must be greater than 1.
+    :type windowSize: int.
+    """
+
+    def __init__(self, windowSize):
+        assert (windowSize > 1)
+        self.__windowSize = windowSize
+        self.__x = collections.NumPyDeque(windowSize)
+        self.__y = collections.NumPyDeque(windowSize)
+        self.__updates = 0
+        # The number of points to append before the last NaN leaves the window.
+        self.__nanLeft = 0
+        self.__xOrigin = 0.0
+        self.__yOrigin = 0.0
+        self.__sx = 0.0
+        self.__sy = 0.0
+        self.__sxx = 0.0
+        self.__sxy = 0.0
+
+    def __len__(self):
+        return len(self.__x)
+
+    def getX(self):
+        return self.__x
+
+    def getY(self):
+        return self.__y
+
+    def windowFull(self):
+        return len(self.__x) == self.__windowSize
+
+    def append(self, x, y):
+        nanLeft = self.__nanLeft
+        if x != x or y != y:
+            self.__nanLeft = self.__windowSize
+        elif self.__nanLeft:
+            self.__nanLeft -= 1
+
+        if self.windowFull():
+            oldX = self.__x[0] - self.__xOrigin
+            oldY = self.__y[0] - self.__yOrigin
+            self.__sx -= oldX
+            self.__sy -= oldY
+            self.__sxx -= oldX * oldX
+            self.__sxy -= oldX * oldY
+        self.__x.append(x)
+        self.__y.append(y)
+
+        self.__updates += 1
+        if self.__updates >= self.__windowSize or len(self.__x) == 1 or (nanLeft and not self.__nanLeft):
+            self.__recalculate()
+        else:
+            x = x - self.__xOrigin
+            y = y - self.__yOrigin
+            self.__sx += x
+            self.__sy += y
+            self.__sxx += x * x
+            self.__sxy += x * y
+
+    def __recalculate(self):
+        x = self.__x.data()
+        y = self.__y.data()
+        self.__xOrigin = x.mean()
+        self.__yOrigin = y.mean()
+        x = x - self.__xOrigin
+        y = y - self.__yOrigin
+        self.__sx = x.sum()
+        self.__sy = y.sum()
+        self.__sxx = np.dot(x, x)
+        self.__sxy = np.dot(x, y)
+        self.__updates = 0
+
+    def getSlope(self):
+        """Returns the slope of the regression line, or None if the window is not full."""
+        ret = None
+        if self.windowFull():
+            n = self.__windowSize
+            den = self.__sxx - self.__sx * self.__sx / n
+            if den:
+                ret = (self.__sxy - self.__sx * self.__sy / n) / den
+            else:
+                ret = np.nan
+        return ret
+
+    def getValueAt(self, x):
+        """Returns the value of the regression line at x, or None if the window is not full."""
+        ret = None
+        slope = self.getSlope()
+        if slope is not None:
+            n = self.__windowSize
+            # The line goes through the means, which are close to the origin.
+            ret = self.__sy / n + slope * (x - self.__xOrigin - self.__sx / n) + self.__yOrigin
+        return ret
+
+
 class LeastSquaresRegressionWindow(technical.EventWindow):
     def __init__(self, windowSize):
         assert (windowSize > 1)
         super(LeastSquaresRegressionWindow, self).__init__(windowSize)
-        self.__timestamps = collections.NumPyDeque(windowSize)
+        self.__regression = RollingLeastSquares(windowSize)
 
     def onNewValue(self, dateTime, value):
         technical.EventWindow.onNewValue(self, dateTime, value)
         if value is not None:
             timestamp = dt.datetime_to_timestamp(dateTime)
-            if len(self.__timestamps):
-                assert (timestamp > self.__timestamps[-1])
-            self.__timestamps.append(timestamp)
-
-    def __getValueAtImpl(self, timestamp):
-        ret = None
-        if self.windowFull():
-            a, b = lsreg(self.__timestamps.data(), self.getValues())
-            ret = a * timestamp + b
-        return ret
+            timestamps = self.__regression.getX()
+            if len(timestamps):
+                assert (timestamp > timestamps[-1])
+            self.__regression.append(timestamp, value)
 
     def getTimeStamps(self):
-        return self.__timestamps
+        return self.__regression.getX()
 
     def getValueAt(self, dateTime):
-        return self.__getValueAtImpl(dt.datetime_to_timestamp(dateTime))
+        return self.__regression.getValueAt(dt.datetime_to_timestamp(dateTime))
 
     def getValue(self):
         ret = None
         if self.windowFull():
-            ret = self.__getValueAtImpl(self.__timestamps.data()[-1])
+            ret = self.__regression.getValueAt(self.__regression.getX()[-1])
         return ret
 
+    def getBatchValues(self, values, dateTimes=None):
+        if dateTimes is None:
+            raise Exception("dateTimes are required to calculate the regression")
+        return batch.least_squares_regression(values, dateTimes, self.getWindowSize())
+
 
 class LeastSquaresRegression(technical.EventBasedFilter):
     """Calculates values based on a least-squares regression.
@@ -84,6 +187,22 @@ class LeastSquaresRegression(technical.EventBasedFilter):
 
     def __init__(self, dataSeries, windowSize, maxLen=None):
         super(LeastSquaresRegression, self).__init__(dataSeries, LeastSquaresRegressionWindow(windowSize), maxLen)
+        self.__coefficients = None
+
+    def precompute(self, values, dateTimes=None):
+        """Calculates the regression for every window in one pass.
+        See :meth:`pyalgotrade.technical.EventBasedFilter.precompute`.
+
+        .. note::
+            dateTimes are required for this filter.
+        """
+        if dateTimes is None:
+            raise Exception("dateTimes are required to calculate the regression")
+        slope, intercept, lastTimestamp = batch.least_squares_regression_coefficients(
+            values, dateTimes, self.getEventWindow().getWindowSize()
+        )
+        self.setPrecomputedValues(slope * lastTimestamp + intercept, dateTimes)
+        self.__coefficients = (slope, intercept)
 
     def getValueAt(self, dateTime):
         """Calculates the value at a given time based on the regression line.
@@ -92,21 +211,47 @@ class LeastSquaresRegression(technical.EventBasedFilter):
             Will return None if there are not enough values in the underlying DataSeries.
         :type dateTime: :class:`datetime.datetime`.
         """
-        return self.getEventWindow().getValueAt(dateTime)
+        if self.__coefficients is None:
+            return self.getEventWindow().getValueAt(dateTime)
+
+        ret = None
+        pos = self.getPrecomputedValues().getPosition()
+        if pos >= 0:
+            slope, intercept = self.__coefficients
+            ret = slope[pos] * dt.datetime_to_timestamp(dateTime) + intercept[pos]
+            if ret != ret:
+                ret = None
+        return ret
 
 
 class SlopeEventWindow(technical.EventWindow):
     def __init__(self, windowSize):
         super(SlopeEventWindow, self).__init__(windowSize)
-        self.__x = np.asarray(range(windowSize))
+        self.__regression = None
+        # The slope doesn't depend on where x starts, so values are numbered as they arrive.
+        self.__count = 0
+        if windowSize > 1:
+            self.__regression = RollingLeastSquares(windowSize)
+
+    def onNewValue(self, dateTime, value):
+        super(SlopeEventWindow, self).onNewValue(dateTime, value)
+        if value is not None and self.__regression is not None:
+            self.__regression.append(self.__count, value)
+            self.__count += 1
 
     def getValue(self):
         ret = None
         if self.windowFull():
-            y = self.getValues()
-            ret = lsreg(self.__x, y)[0]
+            if self.__regression is not None:
+                ret = self.__regression.getSlope()
+            else:
+                # The slope is not defined for a single value.
+                ret = np.nan
         return ret
 
+    def getBatchValues(self, values, dateTimes=None):
+        return batch.slope(values, self.getWindowSize())
+
 
 class Slope(technical.EventBasedFilter):
     """The Slope filter calculates the slope of a least-squares regression line.
@@ -148,6 +293,19 @@ class TrendEventWindow(SlopeEventWindow):
                 ret = None
         return ret
 
+    def getBatchValues(self, values, dateTimes=None):
+        ret = []
+        for value in batch.to_list(super(TrendEventWindow, self).getBatchValues(values, dateTimes)):
+            if value is not None:
+                if value > self.__positiveThreshold:
+                    value = True
+                elif value < self.__negativeThreshold:
+                    value = False
+                else:
+                    value = None
+            ret.append(value)
+        return ret
+
 
 class Trend(technical.EventBasedFilter):
     def __init__(self, dataSeries, trendDays, positiveThreshold=0, negativeThreshold=0, maxLen=None):
@@ -21,6 +21,7 @@
 import numpy as np
 
 from skywalker import technical
+from skywalker.technical import batch
 
 
 # This is the formula I'm using to calculate the averages based on previous ones.
@@ -64,6 +65,9 @@ class SMAEventWindow(technical.EventWindow):
     def getValue(self):
         return self.__value
 
+    def getBatchValues(self, values, dateTimes=None):
+        return batch.sma(values, self.getWindowSize())
+
 
 class SMA(technical.EventBasedFilter):
     """Simple Moving Average filter.
@@ -102,6 +106,9 @@ class EMAEventWindow(technical.EventWindow):
     def getValue(self):
         return self.__value
 
+    def getBatchValues(self, values, dateTimes=None):
+        return batch.ema(values, self.getWindowSize())
+
 
 class EMA(technical.EventBasedFilter):
     """Exponential Moving Average filter.
@@ -134,6 +141,9 @@ class WMAEventWindow(technical.EventWindow):
             ret = accum / float(weightSum)
         return ret
 
+    def getBatchValues(self, values, dateTimes=None):
+        return batch.wma(values, self.__weights)
+
 
 class WMA(technical.EventBasedFilter):
     """Weighted Moving Average filter.
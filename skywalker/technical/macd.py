@@ -19,6 +19,8 @@
 """
 
 from skywalker import dataseries
+from skywalker import technical
+from skywalker.technical import batch
 from skywalker.technical import ma
 
 
@@ -57,8 +59,27 @@ class MACD(dataseries.SequenceDataSeries):
         self.__signalEMAWindow = ma.EMAEventWindow(signalEMA)
         self.__signal = dataseries.SequenceDataSeries(maxLen)
         self.__histogram = dataseries.SequenceDataSeries(maxLen)
+        self.__fastEMA = fastEMA
+        self.__slowEMA = slowEMA
+        self.__signalEMA = signalEMA
+        self.__precomputed = None
         dataSeries.getNewValueEvent().subscribe(self.__onNewValue)
 
+    def precompute(self, values, dateTimes=None):
+        """Calculates the MACD, signal and histogram in one pass, using the full history of the DataSeries being
+        filtered. See :meth:`pyalgotrade.technical.EventBasedFilter.precompute`.
+        """
+        if len(self) > 0:
+            raise Exception("Values can't be precomputed once the filter has values")
+        macdValues, signalValues, histogramValues = batch.macd(
+            values, self.__fastEMA, self.__slowEMA, self.__signalEMA
+        )
+        self.__precomputed = (
+            technical.PrecomputedValues(macdValues, dateTimes),
+            technical.PrecomputedValues(signalValues, dateTimes),
+            technical.PrecomputedValues(histogramValues, dateTimes),
+        )
+
     def getSignal(self):
         """Returns a :class:`pyalgotrade.dataseries.DataSeries` with the EMA over the MACD."""
         return self.__signal
@@ -68,6 +89,12 @@ class MACD(dataseries.SequenceDataSeries):
         return self.__histogram
 
     def __onNewValue(self, dataSeries, dateTime, value):
+        if self.__precomputed is not None:
+            self.appendWithDateTime(dateTime, self.__precomputed[0].next(dateTime))
+            self.__signal.appendWithDateTime(dateTime, self.__precomputed[1].next(dateTime))
+            self.__histogram.appendWithDateTime(dateTime, self.__precomputed[2].next(dateTime))
+            return
+
         diff = None
         macdValue = None
         signalValue = None
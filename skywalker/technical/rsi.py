@@ -19,6 +19,7 @@
 """
 
 from skywalker import technical
+from skywalker.technical import batch
 
 
 # RSI = 100 - 100 / (1 + RS)
@@ -123,6 +124,9 @@ class RSIEventWindow(technical.EventWindow):
     def getValue(self):
         return self.__value
 
+    def getBatchValues(self, values, dateTimes=None):
+        return batch.rsi(values, self.__period)
+
 
 class RSI(technical.EventBasedFilter):
     """Relative Strength Index filter as described in http://stockcharts.com/school/doku.php?id=chart_school:technical_indicators:relative_strength_index_rsi.
@@ -19,6 +19,7 @@
 """
 
 from skywalker import technical
+from skywalker.technical import batch
 
 
 class StdDevEventWindow(technical.EventWindow):
@@ -33,6 +34,9 @@ class StdDevEventWindow(technical.EventWindow):
             ret = self.getValues().std(ddof=self.__ddof)
         return ret
 
+    def getBatchValues(self, values, dateTimes=None):
+        return batch.stddev(values, self.getWindowSize(), self.__ddof)
+
 
 class StdDev(technical.EventBasedFilter):
     """Standard deviation filter.
@@ -69,6 +73,9 @@ class ZScoreEventWindow(technical.EventWindow):
             ret = (lastValue - mean) / float(std)
         return ret
 
+    def getBatchValues(self, values, dateTimes=None):
+        return batch.zscore(values, self.getWindowSize(), self.__ddof)
+
 
 class ZScore(technical.EventBasedFilter):
     """Z-Score filter.
@@ -20,7 +20,9 @@
 
 from skywalker import technical
 from skywalker.dataseries import bards
+from skywalker.technical import batch
 from skywalker.technical import ma
+from skywalker.utils import collections
 
 
 def get_low_high_values(useAdjusted, bars):
@@ -39,11 +41,20 @@ class SOEventWindow(technical.EventWindow):
         assert (period > 1)
         super(SOEventWindow, self).__init__(period, dtype=object)
         self.__useAdjusted = useAdjustedValues
+        self.__lowestLow = collections.MonotonicDeque(period, True)
+        self.__highestHigh = collections.MonotonicDeque(period, False)
+
+    def onNewValue(self, dateTime, value):
+        super(SOEventWindow, self).onNewValue(dateTime, value)
+        if value is not None:
+            self.__lowestLow.append(value.getLow(self.__useAdjusted))
+            self.__highestHigh.append(value.getHigh(self.__useAdjusted))
 
     def getValue(self):
         ret = None
         if self.windowFull():
-            lowestLow, highestHigh = get_low_high_values(self.__useAdjusted, self.getValues())
+            lowestLow = self.__lowestLow.getValue()
+            highestHigh = self.__highestHigh.getValue()
             currentClose = self.getValues()[-1].getClose(self.__useAdjusted)
             closeDelta = currentClose - lowestLow
             if closeDelta:
@@ -52,6 +63,9 @@ class SOEventWindow(technical.EventWindow):
                 ret = 0.0
         return ret
 
+    def getBatchValues(self, values, dateTimes=None):
+        return batch.stochastic_oscillator(values, self.getWindowSize(), useAdjustedValues=self.__useAdjusted)[0]
+
 
 class StochasticOscillator(technical.EventBasedFilter):
     """Fast Stochastic Oscillator filter as described in
@@ -79,6 +93,19 @@ class StochasticOscillator(technical.EventBasedFilter):
 
         super(StochasticOscillator, self).__init__(barDataSeries, SOEventWindow(period, useAdjustedValues), maxLen)
         self.__d = ma.SMA(self, dSMAPeriod, maxLen)
+        self.__dSMAPeriod = dSMAPeriod
+        self.__useAdjustedValues = useAdjustedValues
+
+    def precompute(self, values, dateTimes=None):
+        """Calculates %K and %D in one pass from all the bars. See :meth:`pyalgotrade.technical.EventBasedFilter.precompute`.
+
+        :param values: All the bars. See :func:`pyalgotrade.technical.batch.bar_columns`.
+        """
+        k, d = batch.stochastic_oscillator(
+            values, self.getEventWindow().getWindowSize(), self.__dSMAPeriod, self.__useAdjustedValues
+        )
+        self.setPrecomputedValues(k, dateTimes)
+        self.__d.setPrecomputedValues(d, dateTimes)
 
     def getD(self):
         """Returns a :class:`pyalgotrade.dataseries.DataSeries` with the %D values."""
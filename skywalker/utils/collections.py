@@ -57,50 +57,54 @@ def intersect(values1, values2, skipNone=False):
 
 
 # Like a collections.deque but using a numpy.array.
+# Values are kept in a circular buffer that is mirrored in an array twice as big, so that appending is O(1) and
+# data() can always return a contiguous view.
 class NumPyDeque(object):
     def __init__(self, maxLen, dtype=float):
         assert maxLen > 0, "Invalid maximum length"
 
-        self.__values = np.empty(maxLen, dtype=dtype)
+        self.__values = np.empty(maxLen * 2, dtype=dtype)
         self.__maxLen = maxLen
-        self.__nextPos = 0
+        self.__start = 0
+        self.__len = 0
 
     def getMaxLen(self):
         return self.__maxLen
 
     def append(self, value):
-        if self.__nextPos < self.__maxLen:
-            self.__values[self.__nextPos] = value
-            self.__nextPos += 1
+        if self.__len < self.__maxLen:
+            pos = self.__len
+            self.__len += 1
         else:
-            # Shift items to the left and put the last value.
-            # I'm not using np.roll to avoid creating a new array.
-            self.__values[0:-1] = self.__values[1:]
-            self.__values[self.__nextPos - 1] = value
+            # Overwrite the oldest value.
+            pos = self.__start
+            self.__start += 1
+            if self.__start == self.__maxLen:
+                self.__start = 0
+        self.__values[pos] = value
+        self.__values[pos + self.__maxLen] = value
 
     def data(self):
-        # If all values are not initialized, return a portion of the array.
-        if self.__nextPos < self.__maxLen:
-            ret = self.__values[0:self.__nextPos]
-        else:
-            ret = self.__values
-        return ret
+        return self.__values[self.__start:self.__start + self.__len]
 
     def resize(self, maxLen):
         assert maxLen > 0, "Invalid maximum length"
 
         # Create empty, copy last values and swap.
-        values = np.empty(maxLen, dtype=self.__values.dtype)
-        lastValues = self.__values[0:self.__nextPos]
-        values[0:min(maxLen, len(lastValues))] = lastValues[-1 * min(maxLen, len(lastValues)):]
+        lastValues = self.data()
+        size = min(maxLen, len(lastValues))
+        values = np.empty(maxLen * 2, dtype=self.__values.dtype)
+        if size:
+            values[0:size] = lastValues[-1 * size:]
+            values[maxLen:maxLen + size] = lastValues[-1 * size:]
         self.__values = values
 
         self.__maxLen = maxLen
-        if self.__nextPos >= self.__maxLen:
-            self.__nextPos = self.__maxLen
+        self.__start = 0
+        self.__len = size
 
     def __len__(self):
-        return self.__nextPos
+        return self.__len
 
     def __getitem__(self, key):
         return self.data()[key]
@@ -109,33 +113,115 @@ class NumPyDeque(object):
 # I'm not using collections.deque because:
 # 1: Random access is slower.
 # 2: Slicing is not supported.
+#
+# Discarded values are not removed one at a time. The list is compacted once they take as much room as the live
+# values (or when data() is called), so appending is O(1) amortized.
 class ListDeque(object):
     def __init__(self, maxLen):
         assert maxLen > 0, "Invalid maximum length"
 
         self.__values = []
+        # Position of the first live value.
+        self.__start = 0
         self.__maxLen = maxLen
 
     def getMaxLen(self):
         return self.__maxLen
 
+    def __compact(self):
+        if self.__start:
+            del self.__values[0:self.__start]
+            self.__start = 0
+
     def append(self, value):
         self.__values.append(value)
         # Check bounds
-        if len(self.__values) > self.__maxLen:
-            self.__values.pop(0)
+        if len(self.__values) - self.__start > self.__maxLen:
+            self.__start += 1
+            if self.__start >= self.__maxLen:
+                self.__compact()
 
     def data(self):
+        self.__compact()
         return self.__values
 
     def resize(self, maxLen):
         assert maxLen > 0, "Invalid maximum length"
 
+        self.__compact()
         self.__maxLen = maxLen
         self.__values = self.__values[-1 * maxLen:]
 
     def __len__(self):
-        return len(self.__values)
+        return len(self.__values) - self.__start
 
     def __getitem__(self, key):
-        return self.__values[key]
+        if self.__start == 0:
+            return self.__values[key]
+        elif isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            return self.__values[start + self.__start:stop + self.__start:step]
+        else:
+            if key < 0:
+                key += len(self)
+            if key < 0 or key >= len(self):
+                raise IndexError("list index out of range")
+            return self.__values[key + self.__start]
+
+
+# Keeps the min (or max) of the last windowSize values appended, in amortized O(1) per value.
+# Only the values that could still become the min/max are kept, in order, along with their position, so the first one
+# is the current min/max. It is dropped once it falls out of the window.
+# Like numpy.min/numpy.max, the result is NaN while there is a NaN in the window.
+class MonotonicDeque(object):
+    def __init__(self, windowSize, useMin):
+        assert windowSize > 0, "Invalid window size"
+
+        self.__windowSize = windowSize
+        self.__useMin = useMin
+        self.__positions = []
+        self.__values = []
+        # Position of the first live entry. Dropped entries are removed in bulk to keep appending O(1).
+        self.__start = 0
+        self.__count = 0
+        self.__lastNaN = None
+
+    def getWindowSize(self):
+        return self.__windowSize
+
+    def append(self, value):
+        position = self.__count
+        self.__count += 1
+        if value != value:
+            self.__lastNaN = position
+        else:
+            values = self.__values
+            positions = self.__positions
+            # Drop the values that can't be the min/max anymore.
+            if self.__useMin:
+                while len(values) > self.__start and values[-1] >= value:
+                    values.pop()
+                    positions.pop()
+            else:
+                while len(values) > self.__start and values[-1] <= value:
+                    values.pop()
+                    positions.pop()
+            values.append(value)
+            positions.append(position)
+
+        # Drop the first value if it fell out of the window.
+        if len(self.__values) > self.__start and self.__positions[self.__start] <= position - self.__windowSize:
+            self.__start += 1
+            if self.__start * 2 >= len(self.__values):
+                del self.__values[:self.__start]
+                del self.__positions[:self.__start]
+                self.__start = 0
+
+    def getValue(self):
+        """Returns the min/max of the values in the window, or None if no values were appended."""
+        ret = None
+        if self.__lastNaN is not None and self.__lastNaN > self.__count - 1 - self.__windowSize:
+            ret = float("nan")
+        elif len(self.__values) > self.__start:
+            ret = self.__values[self.__start]
+        return ret